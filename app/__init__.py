@@ -1,26 +1,78 @@
 from flask import Flask
 from app.config import Config, configure_logging
-from .views import webhook_blueprint
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from app.services.webhook_queue import WebhookQueue
+from app.services.dedup import WebhookDeduplicator
+from app.services.graph_client import GraphAPIClient
+from app.services.media_store import MediaStore
+from app.services.adr_pool import AdrIngestionPool
+from app.services.session_registry import ActiveSessionRegistry
+from app.services.user_cache import UserAliasCache
+from app.services.training_archive import TrainingArchive
+from app.services.outbound import OutboundDispatcher
+from app.services.thread_store import ThreadStore
+from app.services.conversation_mailbox import ConversationMailbox
+from app.services.assistant_runner import AssistantRunner
+from app.services.run_leases import RunLeaseStore
 
 db = SQLAlchemy()
 migrate = Migrate()
+webhook_queue = WebhookQueue()
+webhook_dedup = WebhookDeduplicator()
+graph_client = GraphAPIClient()
+media_store = MediaStore()
+adr_pool = AdrIngestionPool()
+session_registry = ActiveSessionRegistry()
+user_alias_cache = UserAliasCache()
+training_archive = TrainingArchive()
+outbound = OutboundDispatcher()
+thread_store = ThreadStore()
+conversation_mailbox = ConversationMailbox()
+assistant_runner = AssistantRunner()
+run_leases = RunLeaseStore()
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
 
     # Load configurations and logging settings
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
     configure_logging()
 
 
     db.init_app(app)
     migrate.init_app(app, db)
+    webhook_dedup.init_app(app)
+    graph_client.init_app(app)
+    media_store.init_app(app)
+    adr_pool.init_app(app)
+    session_registry.init_app(app)
+    user_alias_cache.init_app(app)
+    training_archive.init_app(app)
+    thread_store.init_app(app)
+    run_leases.init_app(app)
 
     # Import and register blueprints, if any
+    # (imported here because the views pull in modules that need `db`)
+    from .views import webhook_blueprint, handle_webhook_body
     app.register_blueprint(webhook_blueprint)
 
+    if app.config['WEBHOOK_QUEUE_ENABLED']:
+        webhook_queue.init_app(app)
+        if app.config['WEBHOOK_WORKERS'] > 0:
+            webhook_queue.start_workers(app, handle_webhook_body, app.config['WEBHOOK_WORKERS'])
+
+    outbound.init_app(app)
+    if app.config['OUTBOUND_WORKERS'] > 0:
+        outbound.start_workers(app, app.config['OUTBOUND_WORKERS'])
+
+    conversation_mailbox.init_app(app, leases=run_leases)
+    if app.config['ASSISTANT_REPLIES_ENABLED']:
+        # The OpenAI client is only created when replies are on
+        from app.services.openai_service import client, reply_to_conversation
+        assistant_runner.init_app(app, client)
+        conversation_mailbox.handler = reply_to_conversation
+
     from app.models import models
 
     @app.shell_context_processor
@@ -17,12 +17,97 @@ class Config:
     VERSION = os.getenv("VERSION")
     PHONE_NUMBER_ID = os.getenv("PHONE_NUMBER_ID")
     VERIFY_TOKEN = os.getenv("VERIFY_TOKEN")
+    # Bearer token for GET /metrics, the endpoint answers 403 while it's unset
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+    # Graph API client
+    GRAPH_API_BASE_URL = os.getenv("GRAPH_API_BASE_URL") or 'https://graph.facebook.com'
+    GRAPH_API_TIMEOUT = float(os.getenv("GRAPH_API_TIMEOUT", 10))
+    GRAPH_API_POOL_CONNECTIONS = int(os.getenv("GRAPH_API_POOL_CONNECTIONS", 4))
+    GRAPH_API_POOL_SIZE = int(os.getenv("GRAPH_API_POOL_SIZE", 16))
+    GRAPH_API_MAX_RETRIES = int(os.getenv("GRAPH_API_MAX_RETRIES", 3))
+    GRAPH_API_BACKOFF_FACTOR = float(os.getenv("GRAPH_API_BACKOFF_FACTOR", 0.5))
+
+    # Outbound message dispatcher: per phone number throughput tier, retries and dead letters
+    # (relative paths live in the Flask instance folder)
+    OUTBOUND_RATE_PER_SECOND = float(os.getenv("OUTBOUND_RATE_PER_SECOND", 80))
+    OUTBOUND_BURST = float(os.getenv("OUTBOUND_BURST", 80))
+    OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", 4))
+    OUTBOUND_MAX_ATTEMPTS = int(os.getenv("OUTBOUND_MAX_ATTEMPTS", 5))
+    OUTBOUND_BACKOFF_BASE = float(os.getenv("OUTBOUND_BACKOFF_BASE", 0.5))
+    OUTBOUND_BACKOFF_MAX = float(os.getenv("OUTBOUND_BACKOFF_MAX", 30))
+    OUTBOUND_QUEUE_MAX_DEPTH = int(os.getenv("OUTBOUND_QUEUE_MAX_DEPTH", 10000))
+    OUTBOUND_DEAD_LETTER_PATH = os.getenv("OUTBOUND_DEAD_LETTER_PATH") or 'outbound_dead_letters.db'
+    # Requests in flight for async broadcasts (app.utils.broadcast), which share the same rate limit
+    BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", 32))
+
+    # OpenAI assistant runs: adaptive polling interval, deadline and the threads replies run on
+    OPENAI_ASSISTANT_ID = os.getenv("OPENAI_ASSISTANT_ID")
+    OPENAI_RUN_TIMEOUT = float(os.getenv("OPENAI_RUN_TIMEOUT", 60))
+    OPENAI_POLL_INITIAL_INTERVAL = float(os.getenv("OPENAI_POLL_INITIAL_INTERVAL", 0.1))
+    OPENAI_POLL_MAX_INTERVAL = float(os.getenv("OPENAI_POLL_MAX_INTERVAL", 2))
+    OPENAI_WORKERS = int(os.getenv("OPENAI_WORKERS", 4))
+    # Reply to text messages with the assistant. Messages of a conversation within the debounce
+    # window are answered by one run, capped at the max delay after the first one
+    ASSISTANT_REPLIES_ENABLED = os.getenv("ASSISTANT_REPLIES_ENABLED", "false").lower() == "true"
+    ASSISTANT_DEBOUNCE_SECONDS = float(os.getenv("ASSISTANT_DEBOUNCE_SECONDS", 1.5))
+    ASSISTANT_MAX_DELAY_SECONDS = float(os.getenv("ASSISTANT_MAX_DELAY_SECONDS", 10))
+    # Database lease a process holds on a conversation while it replies, longer than a run can take
+    ASSISTANT_RUN_LEASE_SECONDS = float(os.getenv("ASSISTANT_RUN_LEASE_SECONDS", 180))
+
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         f'sqlite:///{basedir / "app.db"}'
     
     # Paths and other variables
     DOWNLOAD_DATA_PATH = os.getenv("DOWNLOAD_DATA_PATH") or 'data'
     TEMPORARY_DATAFRAME_TRAINING_FILE = os.getenv("TEMPORARY_DATAFRAME_TRAINING") or 'training_data.csv'
+    ADR_CSV_CHUNK_SIZE = int(os.getenv("ADR_CSV_CHUNK_SIZE", 50000))
+    ADR_INSERT_CHUNK_SIZE = int(os.getenv("ADR_INSERT_CHUNK_SIZE", 5000))
+    # Parquet copy of training_details partitioned by athlete and month, relative paths live under DOWNLOAD_DATA_PATH
+    TRAINING_ARCHIVE_ENABLED = os.getenv("TRAINING_ARCHIVE_ENABLED", "true").lower() == "true"
+    TRAINING_ARCHIVE_PATH = os.getenv("TRAINING_ARCHIVE_PATH") or 'training_archive'
+    # Load-velocity profile, 1RM and velocity loss report after every ADR upload
+    VBT_ANALYTICS_ENABLED = os.getenv("VBT_ANALYTICS_ENABLED", "true").lower() == "true"
+    # Only this many days of the uploaded exercises are read for the report
+    VBT_ANALYTICS_WINDOW_DAYS = int(os.getenv("VBT_ANALYTICS_WINDOW_DAYS", 90))
+    TRAINING_EXPORT_BATCH_SIZE = int(os.getenv("TRAINING_EXPORT_BATCH_SIZE", 10000))
+    # Process pool for ADR preprocessing (0 runs it inline); bigger exports are streamed in chunks instead
+    ADR_POOL_WORKERS = int(os.getenv("ADR_POOL_WORKERS", 2))
+    ADR_POOL_MAX_FILE_BYTES = int(os.getenv("ADR_POOL_MAX_FILE_BYTES", 50 * 1024 * 1024))
+    # Uploads within this many hours of a session's start are grouped into it
+    TRAINING_SESSION_WINDOW_HOURS = float(os.getenv("TRAINING_SESSION_WINDOW_HOURS", 3))
+    # Alias -> user id cache for ADR uploads, unknown aliases are remembered for less time
+    USER_ALIAS_CACHE_SIZE = int(os.getenv("USER_ALIAS_CACHE_SIZE", 10000))
+    USER_ALIAS_CACHE_TTL = float(os.getenv("USER_ALIAS_CACHE_TTL", 3600))
+    USER_ALIAS_NEGATIVE_TTL = float(os.getenv("USER_ALIAS_NEGATIVE_TTL", 60))
+    # wa_id -> assistant thread id, kept in the database with the hot conversations in memory
+    THREAD_STORE_CACHE_SIZE = int(os.getenv("THREAD_STORE_CACHE_SIZE", 10000))
+    MEDIA_MAX_BYTES = int(os.getenv("MEDIA_MAX_BYTES", 100 * 1024 * 1024))
+    MEDIA_DOWNLOAD_CHUNK_SIZE = int(os.getenv("MEDIA_DOWNLOAD_CHUNK_SIZE", 64 * 1024))
+
+    # Content-addressed media cache, relative paths live under DOWNLOAD_DATA_PATH
+    MEDIA_CACHE_PATH = os.getenv("MEDIA_CACHE_PATH") or 'media_cache'
+    MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+
+    # Webhook ingestion queue (relative paths live in the Flask instance folder)
+    WEBHOOK_QUEUE_ENABLED = os.getenv("WEBHOOK_QUEUE_ENABLED", "true").lower() == "true"
+    WEBHOOK_QUEUE_PATH = os.getenv("WEBHOOK_QUEUE_PATH") or 'webhook_queue.db'
+    WEBHOOK_QUEUE_MAX_DEPTH = int(os.getenv("WEBHOOK_QUEUE_MAX_DEPTH", 10000))
+    WEBHOOK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_QUEUE_MAX_ATTEMPTS", 3))
+    # Claimed webhooks not finished within this many seconds are handed to another worker
+    WEBHOOK_QUEUE_LEASE_SECONDS = float(os.getenv("WEBHOOK_QUEUE_LEASE_SECONDS", 300))
+    WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 4))
+
+    # Message-id dedup for Meta redeliveries
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_CACHE_SIZE = int(os.getenv("DEDUP_CACHE_SIZE", 50000))
+    DEDUP_CACHE_TTL = float(os.getenv("DEDUP_CACHE_TTL", 24 * 3600))
+    # An unfinished claim older than this is taken over (keep it below WEBHOOK_QUEUE_LEASE_SECONDS,
+    # so the queue's retry of a crashed webhook finds the claim stale)
+    DEDUP_CLAIM_TIMEOUT = float(os.getenv("DEDUP_CLAIM_TIMEOUT", 240))
+    # Meta retries deliveries for up to 7 days
+    DEDUP_RETENTION_HOURS = float(os.getenv("DEDUP_RETENTION_HOURS", 7 * 24))
+    DEDUP_PRUNE_INTERVAL = float(os.getenv("DEDUP_PRUNE_INTERVAL", 3600))
 
 
 
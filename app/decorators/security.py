@@ -5,14 +5,15 @@ import hashlib
 import hmac
 
 
-def validate_signature(payload, signature):
+def validate_signature(payload: bytes, signature):
     """
-    Validate the incoming payload's signature against our expected signature
+    Validate the incoming payload's signature against our expected signature.
+    The HMAC is computed over the raw request bytes, exactly as Meta signed them.
     """
     # Use the App Secret to hash the payload
     expected_signature = hmac.new(
         bytes(current_app.config["APP_SECRET"], "latin-1"),
-        msg=payload.encode("utf-8"),
+        msg=payload,
         digestmod=hashlib.sha256,
     ).hexdigest()
 
@@ -30,9 +31,29 @@ def signature_required(f):
         signature = request.headers.get("X-Hub-Signature-256", "")[
             7:
         ]  # Removing 'sha256='
-        if not validate_signature(request.data.decode("utf-8"), signature):
+        if not validate_signature(request.get_data(), signature):
             logging.info("Signature verification failed!")
             return jsonify({"status": "error", "message": "Invalid signature"}), 403
         return f(*args, **kwargs)
 
     return decorated_function
+
+
+def metrics_token_required(f):
+    """
+    Decorator to ensure that requests carry `Authorization: Bearer <METRICS_TOKEN>`.
+    The endpoint stays closed while METRICS_TOKEN isn't configured.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = current_app.config.get("METRICS_TOKEN")
+        if not expected:
+            return jsonify({"status": "error", "message": "Metrics are disabled"}), 403
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(token.encode(), expected.encode()):
+            logging.info("Metrics token verification failed!")
+            return jsonify({"status": "error", "message": "Invalid token"}), 401
+        return f(*args, **kwargs)
+
+    return decorated_function
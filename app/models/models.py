@@ -37,7 +37,7 @@ class User(db.Model):
     # Nuevos Campos Opcionales
     name: so.Mapped[Optional[str]] = so.mapped_column(sa.String(50), nullable=True)
     surname: so.Mapped[Optional[str]] = so.mapped_column(sa.String(50), nullable=True)
-    alias: so.Mapped[Optional[str]] = so.mapped_column(sa.String(50), nullable=True)
+    alias: so.Mapped[Optional[str]] = so.mapped_column(sa.String(50), index=True, nullable=True)
 
     # Relationships
     training_sessions: so.Mapped[List['TrainingSession']] = so.relationship(
@@ -50,6 +50,10 @@ class User(db.Model):
 # should probs add a completed column to check off when session is done.
 class TrainingSession(db.Model):
     __tablename__ = 'training_sessions'
+    __table_args__ = (
+        # Open session lookup: a user's sessions started within the session window
+        sa.Index('ix_training_sessions_user_id_created_at', 'user_id', 'created_at'),
+    )
 
     id: so.Mapped[int] = so.mapped_column(primary_key=True, autoincrement=True)
     user_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey('users.id'), nullable=False)
@@ -71,9 +75,15 @@ class TrainingSession(db.Model):
 
 class TrainingDetail(db.Model):
     __tablename__ = 'training_details'
+    __table_args__ = (
+        # A rep is stored once per athlete, uploads rely on it for dedup
+        sa.Index('ix_training_details_atleta_id_hash_id', 'atleta_id', 'hash_id', unique=True),
+        # Exports and analytics: one athlete's history of an exercise over a date range
+        sa.Index('ix_training_details_atleta_id_ejercicio_timestamp', 'atleta_id', 'ejercicio', 'timestamp'),
+    )
 
     id: so.Mapped[int] = so.mapped_column(primary_key=True, autoincrement=True)
-    session_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey('training_sessions.id'), nullable=False)
+    session_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey('training_sessions.id'), index=True, nullable=False)
     timestamp: so.Mapped[datetime] = so.mapped_column(sa.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
     serie: so.Mapped[int] = so.mapped_column(sa.Integer, nullable=False)
     rep: so.Mapped[int] = so.mapped_column(sa.Integer, nullable=False)
@@ -87,7 +97,7 @@ class TrainingDetail(db.Model):
     ejercicio: so.Mapped[str] = so.mapped_column(sa.String(255), nullable=False)
     ecuacion: so.Mapped[Optional[str]] = so.mapped_column(sa.String(255), nullable=True)
     atleta_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey('users.id'), nullable=False)
-    hash_id: so.Mapped[str] = so.mapped_column(sa.String(255), nullable=True)
+    hash_id: so.Mapped[str] = so.mapped_column(sa.String(255), index=True, nullable=True)
     created_at: so.Mapped[datetime] = so.mapped_column(
         sa.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True
     )
@@ -98,3 +108,39 @@ class TrainingDetail(db.Model):
     # Relationships
     session: so.Mapped['TrainingSession'] = so.relationship('TrainingSession', back_populates='training_details')
     atleta: so.Mapped['User'] = so.relationship('User')
+
+
+# Webhook message/status ids that are being or were already handled, so Meta redeliveries are skipped
+class ProcessedWebhookEvent(db.Model):
+    __tablename__ = 'processed_webhook_events'
+
+    event_key: so.Mapped[str] = so.mapped_column(sa.String(255), primary_key=True)
+    # 'in_progress' while a worker handles the event, 'done' once it succeeded
+    status: so.Mapped[str] = so.mapped_column(sa.String(16), nullable=False, server_default='done')
+    # Claim time while in progress, completion time once done
+    processed_at: so.Mapped[datetime] = so.mapped_column(
+        sa.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True, nullable=False
+    )
+
+
+# OpenAI Assistants thread of each WhatsApp conversation
+class AssistantThread(db.Model):
+    __tablename__ = 'assistant_threads'
+
+    wa_id: so.Mapped[str] = so.mapped_column(sa.String(32), primary_key=True)
+    thread_id: so.Mapped[str] = so.mapped_column(sa.String(64), nullable=False)
+    created_at: so.Mapped[datetime] = so.mapped_column(
+        sa.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+    updated_at: so.Mapped[datetime] = so.mapped_column(
+        sa.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False
+    )
+
+
+# Which process is running the assistant on a conversation, so two processes never run it at once
+class AssistantRunLease(db.Model):
+    __tablename__ = 'assistant_run_leases'
+
+    wa_id: so.Mapped[str] = so.mapped_column(sa.String(32), primary_key=True)
+    owner: so.Mapped[str] = so.mapped_column(sa.String(64), nullable=False)
+    expires_at: so.Mapped[datetime] = so.mapped_column(sa.DateTime(timezone=True), nullable=False)
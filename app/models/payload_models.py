@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, ValidationError
-from typing import List, Literal, Union, Annotated, Tuple
-import json
+from pydantic import BaseModel, Field, ValidationError, Discriminator, Tag
+from typing import List, Literal, Union, Annotated, Tuple, Optional, ClassVar, Iterator
+from dataclasses import dataclass
 import logging
 
 
@@ -90,10 +90,67 @@ class ChangeStatuses(BaseModel):
     field: Literal['messages']  # 'field' remains 'messages' for statuses as per payload
     value: ValueStatuses
 
-# Union of Change Types Without Discriminator
+# Union of Change Types, kept plain so it can be used with isinstance
 Change = Union[ChangeMessages, ChangeStatuses]
 
 
+def change_discriminator(change) -> str:
+    """
+    Both change variants share field='messages', so pick the variant by sniffing
+    whether the value carries 'statuses'. Saves pydantic from validating a
+    status webhook as ChangeMessages first and falling back.
+    """
+    if isinstance(change, dict):
+        value = change.get('value')
+        return 'statuses' if isinstance(value, dict) and 'statuses' in value else 'messages'
+    return 'statuses' if isinstance(change, ChangeStatuses) else 'messages'
+
+
+DiscriminatedChange = Annotated[
+    Union[Annotated[ChangeMessages, Tag('messages')], Annotated[ChangeStatuses, Tag('statuses')]],
+    Discriminator(change_discriminator),
+]
+
+
+
+# ---------------------------
+# Webhook Events
+# ---------------------------
+
+# One event per message or status, so a batched POST can be fanned out in one pass
+@dataclass(frozen=True)
+class WebhookEvent:
+    type: ClassVar[str] = 'unknown'
+    entry_id: str
+    metadata: Metadata
+
+@dataclass(frozen=True)
+class TextEvent(WebhookEvent):
+    type: ClassVar[str] = 'text'
+    message: TextMessage
+    contact: Optional[Contact] = None
+
+    @property
+    def body(self) -> str:
+        return self.message.text.body
+
+@dataclass(frozen=True)
+class DocumentEvent(WebhookEvent):
+    type: ClassVar[str] = 'document'
+    message: DocumentMessage
+    contact: Optional[Contact] = None
+
+    @property
+    def document(self) -> DocumentMessageContent:
+        return self.message.document
+
+@dataclass(frozen=True)
+class StatusEvent(WebhookEvent):
+    type: ClassVar[str] = 'status'
+    status: Status
+
+MESSAGE_EVENT_TYPES = {'text': TextEvent, 'document': DocumentEvent}
+
 
 # ---------------------------
 # Webhook Models
@@ -102,13 +159,39 @@ Change = Union[ChangeMessages, ChangeStatuses]
 
 class Entry(BaseModel):
     id: str
-    changes: List[Change]
+    changes: List[DiscriminatedChange]
 
 class WebhookPayload(BaseModel):
     object: str
     entry: List[Entry]
 
 
+    def iter_changes(self) -> Iterator[Tuple[str, Change]]:
+        for entry in self.entry:
+            for change in entry.changes:
+                yield entry.id, change
+
+    def iter_events(self) -> Iterator[WebhookEvent]:
+        """
+        Yields a typed event for every message and status in the payload,
+        across all entries and changes, in delivery order.
+        """
+        for entry_id, change in self.iter_changes():
+            value = change.value
+            if isinstance(change, ChangeStatuses):
+                for status in value.statuses:
+                    yield StatusEvent(entry_id=entry_id, metadata=value.metadata, status=status)
+            else:
+                contacts = {contact.wa_id: contact for contact in value.contacts}
+                for message in value.messages:
+                    event_class = MESSAGE_EVENT_TYPES[message.type]
+                    yield event_class(
+                        entry_id=entry_id,
+                        metadata=value.metadata,
+                        message=message,
+                        contact=contacts.get(message.from_),
+                    )
+
     def get_changes(self) -> Change:
         changes = self.entry[0].changes[0]
         return changes
@@ -205,24 +288,23 @@ class WebhookPayload(BaseModel):
 
         
 
-def parse_webhook_payload(payload: str) -> WebhookPayload:
+def parse_webhook_payload(payload: Union[str, bytes]) -> WebhookPayload:
     """
     Parses the JSON webhook payload into a WebhookPayload object.
 
+    The raw body is validated in pydantic's JSON mode, so it is decoded exactly
+    once and no intermediate dict is built.
+
     Args:
-        payload (str): The JSON string payload received from the webhook.
+        payload (Union[str, bytes]): The JSON payload received from the webhook, ideally the raw request bytes.
 
     Returns:
         Optional[WebhookPayload]: The parsed payload object if successful, else None.
     """
     try:
-        payload_dict = json.loads(payload)
-        webhook_payload = WebhookPayload(**payload_dict)
+        webhook_payload = WebhookPayload.model_validate_json(payload)
         return webhook_payload
     except ValidationError as e:
         print("Validation failed!")
         print(e.json())
         return None
-    
-    
-
@@ -0,0 +1,159 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class OrderedTurns:
+    """
+    Per-key tickets: holders of the same key run one at a time, in the order
+    they took their ticket. Different keys never wait on each other.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._issued = {}
+        self._serving = {}
+
+    def take(self, key) -> int:
+        with self._cond:
+            ticket = self._issued.get(key, 0)
+            self._issued[key] = ticket + 1
+            self._serving.setdefault(key, 0)
+            return ticket
+
+    @contextmanager
+    def turn(self, key, ticket: int):
+        """Blocks until every earlier ticket for `key` finished, successfully or not."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._serving[key] == ticket)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._serving[key] = ticket + 1
+                if self._serving[key] == self._issued[key]:
+                    # Nobody else is waiting on this key, don't keep it around
+                    del self._serving[key], self._issued[key]
+                self._cond.notify_all()
+
+
+class AdrIngestionPool:
+    """
+    Runs ADR preprocessing in a pool of worker processes.
+
+    The pandas pipeline is CPU bound, so several exports forwarded at once are
+    preprocessed in parallel, off the webhook threads and outside the GIL. The
+    workers send back `frame_to_columns` payloads and the database writes stay
+    in the calling thread, in upload order per sender, so consecutive exports
+    of one athlete land in the same training session.
+
+    With `ADR_POOL_WORKERS = 0` everything runs inline, in the same order.
+    """
+
+    def __init__(self, app=None):
+        self.workers = 0
+        self.max_file_bytes = 0
+        self._executor = None
+        self._lock = threading.Lock()
+        self._turns = OrderedTurns()
+        self._counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'streamed': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.close()
+        self.workers = app.config['ADR_POOL_WORKERS']
+        self.max_file_bytes = app.config['ADR_POOL_MAX_FILE_BYTES']
+        self._counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'streamed': 0}
+        app.extensions['adr_pool'] = self
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned rather than forked: the parent runs queue worker threads and holds DB connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._executor
+
+    def _discard(self, executor):
+        """Drops a broken executor (a worker process died), the next call starts a fresh one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args):
+        """Submits to the pool, replacing it first if it is broken. Returns the future and the executor used."""
+        executor = self._get_executor()
+        try:
+            return executor.submit(fn, *args), executor
+        except BrokenProcessPool:
+            logging.warning('ADR process pool is broken, starting a new one')
+            self._discard(executor)
+            executor = self._get_executor()
+            return executor.submit(fn, *args), executor
+
+    def ingest(self, path: Path, key: str) -> int:
+        """
+        Preprocesses an ADR export in the pool and writes it to training_details.
+
+        Args:
+            path (Path): The downloaded export.
+            key (str): Ordering key, the sender's wa_id. Writes for one key happen in call order.
+
+        Returns:
+            int: Number of new reps stored.
+        """
+        from app.utils.adr_processor import (
+            frame_from_columns, ingest_adr_file, preprocess_adr_columns, process_training_data,
+        )
+
+        ticket = self._turns.take(key)
+        try:
+            # Exports too big to hold in memory at once are streamed in chunks instead
+            streamed = self.max_file_bytes and Path(path).stat().st_size > self.max_file_bytes
+            future = executor = None
+            if self.workers > 0 and not streamed:
+                future, executor = self._submit(preprocess_adr_columns, str(path))
+        except Exception:
+            # The ticket must still be served, or every later upload of this sender waits forever
+            with self._turns.turn(key, ticket):
+                self._count('failed')
+            logging.exception(f'Failed to ingest ADR export {Path(path).name}')
+            raise
+        self._count('streamed' if streamed else 'submitted')
+
+        with self._turns.turn(key, ticket):
+            try:
+                if streamed:
+                    return ingest_adr_file(path)
+                columns = future.result() if future is not None else preprocess_adr_columns(path)
+                inserted = process_training_data(frame_from_columns(columns))
+            except Exception as e:
+                self._count('failed')
+                logging.exception(f'Failed to ingest ADR export {Path(path).name}')
+                if isinstance(e, BrokenProcessPool):
+                    self._discard(executor)
+                raise
+            self._count('completed')
+            return inserted
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {'workers': self.workers, **self._counters}
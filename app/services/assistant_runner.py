@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+# Run states that will not change any more
+RUN_FAILED_STATUSES = {'failed', 'cancelled', 'expired', 'incomplete'}
+
+
+class AssistantRunError(Exception):
+    """An assistant run ended without a reply."""
+
+    def __init__(self, message, run=None):
+        super().__init__(message)
+        self.run = run
+        self.status = getattr(run, 'status', None)
+
+
+class AssistantRunTimeout(AssistantRunError):
+    """The run did not finish before the deadline and was cancelled."""
+
+
+class AssistantRunner:
+    """
+    Runs an OpenAI assistant on conversation threads.
+
+    The assistant is retrieved once and cached. Runs are polled with an
+    adaptive interval, starting short so quick replies are picked up within
+    ~100 ms and growing towards `max_interval` for long runs, and are cancelled
+    once `run_timeout` seconds have passed. Failed, cancelled, expired and
+    incomplete runs raise AssistantRunError; runs that require tool outputs are
+    answered by `tool_handler` or cancelled if there is none.
+
+    Runs block the calling thread; replies run on the conversation mailbox's
+    workers, not on request or webhook threads.
+
+    Args:
+        client: An `openai.OpenAI` client.
+        assistant_id (str): The assistant to run.
+        run_timeout (float): Seconds a run may take before it is cancelled.
+        initial_interval (float): First poll interval in seconds.
+        max_interval (float): Longest poll interval in seconds.
+        tool_handler (Optional[Callable]): Called with the run's tool calls, returns a list of
+            {"tool_call_id", "output"} dicts for `submit_tool_outputs`.
+    """
+
+    def __init__(self, client=None, assistant_id: Optional[str] = None, run_timeout: float = 60,
+                 initial_interval: float = 0.1, max_interval: float = 2.0, tool_handler: Optional[Callable] = None):
+        self.client = client
+        self.assistant_id = assistant_id
+        self.run_timeout = run_timeout
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.tool_handler = tool_handler
+        self._assistant = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, client=None):
+        """Configures the runner from the app config, with `client` as the OpenAI client if given."""
+        if client is not None:
+            self.client = client
+        self.assistant_id = app.config['OPENAI_ASSISTANT_ID']
+        self.run_timeout = app.config['OPENAI_RUN_TIMEOUT']
+        self.initial_interval = app.config['OPENAI_POLL_INITIAL_INTERVAL']
+        self.max_interval = app.config['OPENAI_POLL_MAX_INTERVAL']
+        with self._lock:
+            self._assistant = None
+        app.extensions['assistant_runner'] = self
+
+    @property
+    def assistant(self):
+        """The assistant object, retrieved from the API on first use only."""
+        if self._assistant is None:
+            with self._lock:
+                if self._assistant is None:
+                    self._assistant = self.client.beta.assistants.retrieve(self.assistant_id)
+        return self._assistant
+
+    def wait(self, thread_id: str, run, timeout: Optional[float] = None):
+        """
+        Polls a run until it completes.
+
+        Args:
+            thread_id (str): The run's thread.
+            run: The run, as returned by `runs.create`.
+            timeout (Optional[float]): Deadline in seconds, `run_timeout` by default.
+
+        Returns:
+            The completed run.
+
+        Raises:
+            AssistantRunError: If the run failed, was cancelled, expired or needs tools nobody handles.
+            AssistantRunTimeout: If the run didn't finish in time.
+        """
+        runs = self.client.beta.threads.runs
+        deadline = time.monotonic() + (self.run_timeout if timeout is None else timeout)
+        interval = self.initial_interval
+
+        while True:
+            if run.status == 'completed':
+                return run
+
+            if run.status in RUN_FAILED_STATUSES:
+                last_error = getattr(run, 'last_error', None)
+                detail = f': {last_error.code} {last_error.message}' if last_error else ''
+                raise AssistantRunError(f'Run {run.id} ended with status {run.status}{detail}', run)
+
+            if run.status == 'requires_action':
+                tool_calls = run.required_action.submit_tool_outputs.tool_calls
+                if self.tool_handler is None:
+                    self._cancel(thread_id, run)
+                    raise AssistantRunError(f'Run {run.id} requires {len(tool_calls)} tool outputs and no handler is set', run)
+                run = runs.submit_tool_outputs(run.id, thread_id=thread_id, tool_outputs=self.tool_handler(tool_calls))
+                interval = self.initial_interval
+                continue
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._cancel(thread_id, run)
+                raise AssistantRunTimeout(f'Run {run.id} still {run.status} after {self.run_timeout}s, cancelled', run)
+            time.sleep(min(interval, remaining))
+            interval = min(self.max_interval, interval * 1.5)
+            run = runs.retrieve(run.id, thread_id=thread_id)
+
+    def _cancel(self, thread_id: str, run):
+        try:
+            self.client.beta.threads.runs.cancel(run.id, thread_id=thread_id)
+        except Exception as e:
+            logging.error(f'Failed to cancel run {run.id}: {e}')
+
+    def run(self, thread_id: str, instructions: Optional[str] = None) -> str:
+        """
+        Runs the assistant on the thread and returns the text of its reply.
+
+        Raises:
+            AssistantRunError: If the run failed (see `wait`) or completed without a text reply.
+        """
+        kwargs = {'instructions': instructions} if instructions else {}
+        run = self.client.beta.threads.runs.create(thread_id=thread_id, assistant_id=self.assistant.id, **kwargs)
+        run = self.wait(thread_id, run)
+
+        # Only this run's messages, a newer message on the thread can't be mistaken for the reply
+        messages = self.client.beta.threads.messages.list(thread_id=thread_id, run_id=run.id, order='desc', limit=1)
+        if not messages.data or not messages.data[0].content:
+            raise AssistantRunError(f'Run {run.id} completed without a reply', run)
+        return messages.data[0].content[0].text.value
+
+    def reply(self, thread_id: str, message_body: str) -> str:
+        """Adds a user message to the thread and runs the assistant on it."""
+        self.client.beta.threads.messages.create(thread_id=thread_id, role='user', content=message_body)
+        return self.run(thread_id)
@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+
+@dataclass
+class Conversation:
+    """Messages waiting for a reply in one conversation."""
+    texts: List[str] = field(default_factory=list)
+    futures: List[Future] = field(default_factory=list)
+    name: Optional[str] = None
+    first_at: float = 0.0
+    last_at: float = 0.0
+    running: bool = False
+    timer: Optional[threading.Timer] = None
+
+
+class ConversationMailbox:
+    """
+    One mailbox per wa_id in front of the assistant.
+
+    Messages a user sends in quick succession are coalesced: a conversation is
+    flushed once `debounce` seconds pass without a new message (but at most
+    `max_delay` seconds after the first one), and all its waiting messages go
+    to the handler as one text, i.e. one assistant run and one reply.
+    A conversation never has two runs at a time, since OpenAI rejects a run
+    on a thread with an active run; messages arriving meanwhile wait for the
+    next one. Different conversations run in parallel on `workers` threads.
+
+    The mailbox only sees the messages of its own process. When several
+    processes handle webhooks, give it a `leases` store (a RunLeaseStore):
+    each run then holds a database lease on the wa_id, and a conversation
+    leased by another process is retried after `debounce` seconds, with any
+    newer messages coalesced into it.
+
+    The handler is called inside an app context as `handler(wa_id, text, name)`
+    and its return value resolves the futures of every coalesced message.
+
+    Waiting messages live in memory only. Their webhook events stay claimed
+    in dedup until the run's future is done (see `dynamic_webhook_handler`):
+    `close` cancels the futures of waiting messages, which releases their
+    events, and the claims of a process that died go stale after
+    DEDUP_CLAIM_TIMEOUT, so a redelivery of the message is answered.
+    """
+
+    def __init__(self, app=None, handler: Optional[Callable] = None, leases=None):
+        self.app = None
+        self.handler = handler
+        self.leases = leases
+        self.owner = uuid.uuid4().hex
+        self.debounce = 1.5
+        self.max_delay = 10.0
+        self.lease_seconds = 180.0
+        self.workers = 4
+        self._conversations = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._counters = {'messages': 0, 'runs': 0, 'coalesced': 0, 'failed': 0, 'deferred': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, handler: Optional[Callable] = None, leases=None):
+        self.close()
+        self.app = app
+        if handler is not None:
+            self.handler = handler
+        if leases is not None:
+            self.leases = leases
+        self.debounce = app.config['ASSISTANT_DEBOUNCE_SECONDS']
+        self.max_delay = app.config['ASSISTANT_MAX_DELAY_SECONDS']
+        self.lease_seconds = app.config['ASSISTANT_RUN_LEASE_SECONDS']
+        self.workers = app.config['OPENAI_WORKERS']
+        with self._lock:
+            self._counters = {key: 0 for key in self._counters}
+        app.extensions['conversation_mailbox'] = self
+
+    def post(self, wa_id: str, text: str, name: Optional[str] = None) -> Future:
+        """
+        Queues a message of the conversation.
+
+        Returns:
+            Future: Resolves to the reply of the run that included this message.
+        """
+        future = Future()
+        now = time.monotonic()
+        with self._lock:
+            conversation = self._conversations.get(wa_id)
+            if conversation is None:
+                conversation = self._conversations[wa_id] = Conversation()
+            if not conversation.texts:
+                conversation.first_at = now
+            conversation.texts.append(text)
+            conversation.futures.append(future)
+            conversation.name = name or conversation.name
+            conversation.last_at = now
+            self._counters['messages'] += 1
+            # A running conversation reschedules itself when its run ends
+            if not conversation.running and conversation.timer is None:
+                self._schedule(wa_id, conversation, self.debounce)
+        return future
+
+    def _schedule(self, wa_id: str, conversation: Conversation, delay: float):
+        timer = threading.Timer(max(delay, 0), self._flush, args=(wa_id,))
+        timer.daemon = True
+        conversation.timer = timer
+        timer.start()
+
+    def _due_in(self, conversation: Conversation, now: float) -> float:
+        """Seconds until the waiting messages should run."""
+        return min(conversation.last_at + self.debounce, conversation.first_at + self.max_delay) - now
+
+    def _flush(self, wa_id: str):
+        with self._lock:
+            conversation = self._conversations.get(wa_id)
+            if conversation is None:
+                return
+            conversation.timer = None
+            if conversation.running or not conversation.texts:
+                return
+            wait = self._due_in(conversation, time.monotonic())
+            if wait > 0:
+                # A newer message restarted the window
+                self._schedule(wa_id, conversation, wait)
+                return
+
+            texts, futures, name = conversation.texts, conversation.futures, conversation.name
+            conversation.texts, conversation.futures = [], []
+            conversation.running = True
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='conversation')
+            executor = self._executor
+        executor.submit(self._run, wa_id, texts, futures, name)
+
+    def _run(self, wa_id: str, texts: List[str], futures: List[Future], name: Optional[str]):
+        deferred = False
+        try:
+            with self.app.app_context():
+                if self.leases is not None and not self.leases.acquire(wa_id, self.owner, self.lease_seconds):
+                    deferred = True
+                else:
+                    with self._lock:
+                        self._counters['runs'] += 1
+                        self._counters['coalesced'] += len(texts) - 1
+                    try:
+                        reply = self.handler(wa_id, '\n'.join(texts), name)
+                    finally:
+                        if self.leases is not None:
+                            self.leases.release(wa_id, self.owner)
+        except Exception as e:
+            logging.error(f'Assistant reply for {wa_id} failed ({len(texts)} messages): {e}')
+            with self._lock:
+                self._counters['failed'] += 1
+            for future in futures:
+                future.set_exception(e)
+        else:
+            if not deferred:
+                for future in futures:
+                    future.set_result(reply)
+        finally:
+            with self._lock:
+                conversation = self._conversations.get(wa_id)
+                if conversation is None:  # the mailbox was closed meanwhile
+                    if deferred:
+                        for future in futures:
+                            future.cancel()
+                elif deferred:
+                    # Another process is replying on this conversation, try again with whatever arrives meanwhile
+                    conversation.running = False
+                    conversation.texts = texts + conversation.texts
+                    conversation.futures = futures + conversation.futures
+                    conversation.name = conversation.name or name
+                    self._counters['deferred'] += 1
+                    self._schedule(wa_id, conversation, self.debounce)
+                else:
+                    conversation.running = False
+                    if conversation.texts:
+                        self._schedule(wa_id, conversation, self._due_in(conversation, time.monotonic()))
+                    elif conversation.timer is None:
+                        del self._conversations[wa_id]
+
+    def close(self, wait: bool = True):
+        """Drops waiting messages (their futures are cancelled) and stops the worker threads."""
+        with self._lock:
+            for conversation in self._conversations.values():
+                if conversation.timer is not None:
+                    conversation.timer.cancel()
+                for future in conversation.futures:
+                    future.cancel()
+            self._conversations = {}
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'conversations': len(self._conversations),
+                'waiting': sum(len(conversation.texts) for conversation in self._conversations.values()),
+                'running': sum(conversation.running for conversation in self._conversations.values()),
+                **self._counters,
+            }
@@ -0,0 +1,160 @@
+import logging
+import time
+import sqlalchemy as sa
+from datetime import datetime, timedelta, timezone
+
+from app.utils.cache import TTLCache
+
+
+def event_key(event) -> str:
+    """
+    Key under which an event is remembered. Statuses for the same message id go
+    through sent -> delivered -> read, so the status value is part of the key.
+    """
+    if event.type == 'status':
+        return f'{event.status.id}:{event.status.status}'
+    return event.message.id
+
+
+class WebhookDeduplicator:
+    """
+    Remembers which webhook events were already handled, so Meta redeliveries
+    don't trigger a second media download or ADR ingestion.
+
+    An event is claimed ('in_progress') before its handler runs and marked
+    'done' only once the handler succeeded; a failed handler releases the
+    claim. Claims older than `claim_timeout` belong to a worker that died and
+    can be taken again, so the queue's retry of a crashed webhook isn't
+    skipped as a duplicate.
+
+    Lookups of done events go to an in-process LRU with TTL first; misses fall
+    back to the `processed_webhook_events` table, which survives restarts and
+    is shared between worker processes. Claiming is an INSERT on the primary
+    key, so two workers racing on the same redelivery can't both win. Keys
+    older than `retention` are pruned every `prune_interval` seconds.
+    """
+
+    def __init__(self, app=None):
+        self.cache = TTLCache()
+        self.duplicates = 0
+        self.claim_timeout = timedelta(seconds=240)
+        self.retention = timedelta(days=7)
+        self.prune_interval = 3600.0
+        self._pruned_at = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.cache = TTLCache(maxsize=app.config['DEDUP_CACHE_SIZE'], ttl=app.config['DEDUP_CACHE_TTL'])
+        self.duplicates = 0
+        self.claim_timeout = timedelta(seconds=app.config['DEDUP_CLAIM_TIMEOUT'])
+        self.retention = timedelta(hours=app.config['DEDUP_RETENTION_HOURS'])
+        self.prune_interval = app.config['DEDUP_PRUNE_INTERVAL']
+        self._pruned_at = time.monotonic()
+        app.extensions['webhook_dedup'] = self
+
+    def claim(self, key: str) -> bool:
+        """
+        Marks `key` as in progress. Call `complete` once it was handled, or `release` if handling failed.
+
+        Returns:
+            bool: True if the event is new (or its previous claim went stale) and should be handled,
+            False if it is a duplicate or another worker is handling it.
+        """
+        from app import db
+        from app.models.models import ProcessedWebhookEvent
+
+        self._maybe_prune()
+        if self.cache.get(key) is not None:
+            self.duplicates += 1
+            return False
+
+        now = datetime.now(timezone.utc)
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    sa.insert(ProcessedWebhookEvent).values(event_key=key, status='in_progress', processed_at=now)
+                )
+            return True
+        except sa.exc.IntegrityError:
+            pass
+
+        with db.engine.begin() as connection:
+            # Take over a claim whose worker died without completing or releasing it
+            taken = connection.execute(
+                sa.update(ProcessedWebhookEvent)
+                .where(ProcessedWebhookEvent.event_key == key)
+                .where(ProcessedWebhookEvent.status == 'in_progress')
+                .where(ProcessedWebhookEvent.processed_at < now - self.claim_timeout)
+                .values(processed_at=now)
+            ).rowcount
+            if taken:
+                logging.warning(f'Taking over stale claim of webhook event {key}')
+                return True
+            status = connection.scalar(
+                sa.select(ProcessedWebhookEvent.status).where(ProcessedWebhookEvent.event_key == key)
+            )
+
+        if status == 'done':
+            self.cache.set(key, True)
+        self.duplicates += 1
+        return False
+
+    def complete(self, key: str):
+        """Marks a claimed `key` as handled, later deliveries are skipped."""
+        from app import db
+        from app.models.models import ProcessedWebhookEvent
+
+        with db.engine.begin() as connection:
+            connection.execute(
+                sa.update(ProcessedWebhookEvent)
+                .where(ProcessedWebhookEvent.event_key == key)
+                .values(status='done', processed_at=datetime.now(timezone.utc))
+            )
+        self.cache.set(key, True)
+
+    def release(self, key: str):
+        """Forgets `key` so a redelivery is handled again, e.g. after the handler failed."""
+        from app import db
+        from app.models.models import ProcessedWebhookEvent
+
+        self.cache.pop(key)
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(sa.delete(ProcessedWebhookEvent).where(ProcessedWebhookEvent.event_key == key))
+        except sa.exc.SQLAlchemyError as e:
+            logging.error(f'Could not release dedup key {key}: {e}')
+
+    def prune(self, older_than: datetime) -> int:
+        """Deletes persisted keys processed before `older_than`. Returns the number of rows removed."""
+        from app import db
+        from app.models.models import ProcessedWebhookEvent
+
+        with db.engine.begin() as connection:
+            result = connection.execute(
+                sa.delete(ProcessedWebhookEvent).where(ProcessedWebhookEvent.processed_at < older_than)
+            )
+        return result.rowcount
+
+    def _maybe_prune(self):
+        """Prunes keys past the retention at most once per `prune_interval`, from whichever worker gets there first."""
+        now = time.monotonic()
+        if now - self._pruned_at < self.prune_interval:
+            return
+        self._pruned_at = now
+        try:
+            removed = self.prune(datetime.now(timezone.utc) - self.retention)
+        except sa.exc.SQLAlchemyError as e:
+            logging.error(f'Could not prune dedup keys: {e}')
+            return
+        if removed:
+            logging.info(f'Pruned {removed} dedup keys older than {self.retention}')
+
+    def metrics(self) -> dict:
+        stats = self.cache.stats()
+        return {
+            'cache_hits': stats['hits'],
+            'cache_misses': stats['misses'],
+            'cache_size': stats['size'],
+            'duplicates': self.duplicates,
+        }
@@ -0,0 +1,186 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.retry import Retry
+from urllib3.util.util import reraise
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class GraphAPIError(Exception):
+    """
+    A Graph API call that still failed after the client's own retries.
+
+    Args:
+        message (str): What failed.
+        status_code (Optional[int]): HTTP status, None for timeouts and connection errors.
+        body (Optional[str]): Response body, Graph puts the error details there.
+        retry_after (Optional[float]): Seconds from the Retry-After header, if any.
+        connect_failed (bool): The connection was never established, so Graph never saw the request.
+    """
+
+    def __init__(self, message: str, status_code=None, body=None, retry_after=None, connect_failed=False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+        self.retry_after = retry_after
+        self.connect_failed = connect_failed
+
+    @property
+    def retryable(self) -> bool:
+        """Rate limits, server errors and network failures may succeed later, other 4xx won't."""
+        return self.status_code is None or self.status_code in RETRY_STATUSES
+
+    @property
+    def resendable(self) -> bool:
+        """
+        Whether a non-idempotent call (sending a message) can safely be sent again:
+        only if Graph rejected it unprocessed (429) or never received it. After a
+        5xx or a timeout the message may already have been delivered.
+        """
+        return self.status_code == 429 or self.connect_failed
+
+
+def is_connect_error(error: Exception) -> bool:
+    """Whether a `requests` error happened before a connection to Graph was established."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        # requests wraps urllib3's MaxRetryError, whose reason is the underlying error
+        reason = getattr(error.args[0], 'reason', error.args[0])
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+    return False
+
+
+class GraphRetry(Retry):
+    """
+    urllib3 retry policy for Graph API calls.
+
+    Idempotent requests (GETs, media downloads) are retried on 429/5xx, read
+    errors and connection errors. POSTs are only retried when Graph cannot
+    have acted on them: a 429 (rejected before processing) or a connection
+    that was never established. A 5xx or a read timeout may come after the
+    message was accepted, and resending it would deliver it twice.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method == 'POST':
+            return status_code == 429
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if method == 'POST' and error is not None and not self._is_connection_error(error):
+            raise reraise(type(error), error, _stacktrace)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class GraphAPIClient:
+    """
+    Shared client for the WhatsApp Graph API.
+
+    Wraps a single `requests.Session`, so connections to graph.facebook.com are
+    pooled and kept alive between calls, and the auth header is built once.
+    Failures are retried with jittered exponential backoff (honouring
+    Retry-After), see `GraphRetry` for which ones. Latency is recorded per
+    endpoint label, see `metrics`.
+    """
+
+    def __init__(self, app=None):
+        self.session = None
+        self.base_url = None
+        self.version = None
+        self.timeout = 10
+        self._lock = threading.Lock()
+        self._latency = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self.base_url = config['GRAPH_API_BASE_URL'].rstrip('/')
+        self.version = config['VERSION']
+        self.timeout = config['GRAPH_API_TIMEOUT']
+
+        retry = GraphRetry(
+            total=config['GRAPH_API_MAX_RETRIES'],
+            status_forcelist=RETRY_STATUSES,
+            backoff_factor=config['GRAPH_API_BACKOFF_FACTOR'],
+            backoff_jitter=config['GRAPH_API_BACKOFF_FACTOR'],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=config['GRAPH_API_POOL_CONNECTIONS'],
+            pool_maxsize=config['GRAPH_API_POOL_SIZE'],
+            max_retries=retry,
+        )
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'Authorization': f"Bearer {config['ACCESS_TOKEN']}"})
+
+        if self.session is not None:
+            self.session.close()
+        self.session = session
+        self._latency = {}
+        app.extensions['graph_client'] = self
+
+    def url(self, path: str) -> str:
+        """Builds a versioned Graph API URL. Absolute URLs (e.g. media downloads) are returned unchanged."""
+        if path.startswith(('http://', 'https://')):
+            return path
+        if self.version:
+            return f'{self.base_url}/{self.version}/{path.lstrip("/")}'
+        return f'{self.base_url}/{path.lstrip("/")}'
+
+    def request(self, method: str, path: str, endpoint: str = 'other', **kwargs) -> requests.Response:
+        """
+        Sends a request through the pooled session.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path relative to the versioned Graph API root, or an absolute URL.
+            endpoint (str): Label the latency is recorded under.
+
+        Returns:
+            requests.Response: The final response, after retries. Callers decide whether to `raise_for_status`.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+            failed = response.status_code >= 400
+            return response
+        finally:
+            self._record(endpoint, time.perf_counter() - start, failed)
+
+    def get(self, path: str, endpoint: str = 'other', **kwargs) -> requests.Response:
+        return self.request('GET', path, endpoint=endpoint, **kwargs)
+
+    def post(self, path: str, endpoint: str = 'other', **kwargs) -> requests.Response:
+        return self.request('POST', path, endpoint=endpoint, **kwargs)
+
+    def _record(self, endpoint: str, elapsed: float, failed: bool):
+        with self._lock:
+            stats = self._latency.setdefault(endpoint, {'count': 0, 'errors': 0, 'total_s': 0.0, 'max_s': 0.0})
+            stats['count'] += 1
+            stats['errors'] += failed
+            stats['total_s'] += elapsed
+            stats['max_s'] = max(stats['max_s'], elapsed)
+
+    def metrics(self) -> dict:
+        """Per-endpoint request count, error count and average/max latency in milliseconds."""
+        with self._lock:
+            return {
+                endpoint: {
+                    'count': stats['count'],
+                    'errors': stats['errors'],
+                    'avg_ms': stats['total_s'] / stats['count'] * 1000,
+                    'max_ms': stats['max_s'] * 1000,
+                }
+                for endpoint, stats in self._latency.items()
+            }
@@ -0,0 +1,131 @@
+import base64
+import binascii
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+_HEX_SHA256 = re.compile(r'^[0-9a-fA-F]{64}$')
+
+
+def normalize_sha256(sha256: str) -> Optional[str]:
+    """Returns the lowercase hex form of a hex or base64 sha256, or None if it is neither."""
+    if _HEX_SHA256.match(sha256):
+        return sha256.lower()
+    try:
+        digest = base64.b64decode(sha256, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return digest.hex() if len(digest) == 32 else None
+
+
+class MediaStore:
+    """
+    Content-addressed local store for downloaded WhatsApp media.
+
+    Files are named after the sha256 the webhook already carries, so an athlete
+    re-sending the same ADR export is served from disk without calling the
+    Graph API. The store is bounded by `max_bytes` and evicts the least
+    recently used files first; recency is kept in the file mtime so it survives
+    restarts.
+    """
+
+    def __init__(self, app=None):
+        self.root = None
+        self.max_bytes = 0
+        self._lock = threading.Lock()
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        root = Path(app.config['MEDIA_CACHE_PATH'])
+        if not root.is_absolute():
+            root = Path(app.root_path) / app.config['DOWNLOAD_DATA_PATH'] / root
+        self.max_bytes = app.config['MEDIA_CACHE_MAX_BYTES']
+        self.open(root)
+        app.extensions['media_store'] = self
+
+    def open(self, root: Path):
+        """Indexes the files already in `root`, least recently used first."""
+        root.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in root.iterdir():
+            if path.is_file() and not path.name.startswith('.'):
+                stat = path.stat()
+                files.append((stat.st_mtime, path.stem, path, stat.st_size))
+
+        with self._lock:
+            self.root = root
+            self._index = OrderedDict((key, (path, size)) for _, key, path, size in sorted(files))
+            self._total_bytes = sum(size for _, size in self._index.values())
+            self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def path_for(self, sha256: str, filename: str) -> Optional[Path]:
+        """Where a file with this hash lives in the store, or None if the hash can't be used as a key."""
+        key = normalize_sha256(sha256)
+        if key is None:
+            return None
+        return self.root / f'{key}{Path(filename).suffix.lower()}'
+
+    def get(self, sha256: str) -> Optional[Path]:
+        """Returns the cached file for `sha256` and marks it as recently used, or None."""
+        key = normalize_sha256(sha256)
+        with self._lock:
+            item = self._index.get(key) if key else None
+            if item is None or not item[0].exists():
+                if item is not None:
+                    self._forget(key)
+                self._counters['misses'] += 1
+                return None
+
+            self._index.move_to_end(key)
+            self._counters['hits'] += 1
+            path = item[0]
+
+        os.utime(path)
+        return path
+
+    def add(self, path: Path) -> Path:
+        """Registers a file already written to `path_for(...)` and evicts down to the quota."""
+        key = path.stem
+        size = path.stat().st_size
+        with self._lock:
+            if key in self._index:
+                self._forget(key)
+            self._index[key] = (path, size)
+            self._total_bytes += size
+            self._evict(keep=key)
+        return path
+
+    def _forget(self, key: str):
+        _, size = self._index.pop(key)
+        self._total_bytes -= size
+
+    def _evict(self, keep: str):
+        while self.max_bytes and self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            if key == keep:
+                break
+            path, _ = self._index[key]
+            self._forget(key)
+            self._counters['evictions'] += 1
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            logging.info(f'Evicted {path.name} from the media cache')
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'files': len(self._index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                **self._counters,
+            }
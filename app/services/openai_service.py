@@ -1,13 +1,10 @@
 from openai import OpenAI
-import shelve
 from dotenv import load_dotenv
 import os
-import time
 import logging
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_ASSISTANT_ID = os.getenv("OPENAI_ASSISTANT_ID")
 client = OpenAI(api_key=OPENAI_API_KEY)
 
 
@@ -32,38 +29,25 @@ def create_assistant(file):
     return assistant
 
 
-# Use context manager to ensure the shelf file is closed properly
+# Threads live in the app database, hot conversations are answered from memory
 def check_if_thread_exists(wa_id):
-    with shelve.open("threads_db") as threads_shelf:
-        return threads_shelf.get(wa_id, None)
+    from app import thread_store
+
+    return thread_store.get(wa_id)
 
 
 def store_thread(wa_id, thread_id):
-    with shelve.open("threads_db", writeback=True) as threads_shelf:
-        threads_shelf[wa_id] = thread_id
+    """Stores the conversation's thread unless another worker stored one first. Returns the stored thread id."""
+    from app import thread_store
 
+    return thread_store.set_if_absent(wa_id, thread_id)
 
-def run_assistant(thread, name):
-    # Retrieve the Assistant
-    assistant = client.beta.assistants.retrieve(OPENAI_ASSISTANT_ID)
-
-    # Run the assistant
-    run = client.beta.threads.runs.create(
-        thread_id=thread.id,
-        assistant_id=assistant.id,
-        # instructions=f"You are having a conversation with {name}",
-    )
 
-    # Wait for completion
-    # https://platform.openai.com/docs/assistants/how-it-works/runs-and-run-steps#:~:text=under%20failed_at.-,Polling%20for%20updates,-In%20order%20to
-    while run.status != "completed":
-        # Be nice to the API
-        time.sleep(0.5)
-        run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
+def run_assistant(thread, name):
+    from app import assistant_runner
 
-    # Retrieve the Messages
-    messages = client.beta.threads.messages.list(thread_id=thread.id)
-    new_message = messages.data[0].content[0].text.value
+    # Polls with an adaptive interval and a deadline, raises AssistantRunError if the run fails
+    new_message = assistant_runner.run(thread.id)
     logging.info(f"Generated message: {new_message}")
     return new_message
 
@@ -76,8 +60,11 @@ def generate_response(message_body, wa_id, name):
     if thread_id is None:
         logging.info(f"Creating new thread for {name} with wa_id {wa_id}")
         thread = client.beta.threads.create()
-        store_thread(wa_id, thread.id)
-        thread_id = thread.id
+        thread_id = store_thread(wa_id, thread.id)
+        if thread_id != thread.id:
+            # A concurrent message created the conversation's thread first, use that one
+            client.beta.threads.delete(thread.id)
+            thread = client.beta.threads.retrieve(thread_id)
 
     # Otherwise, retrieve the existing thread
     else:
@@ -95,3 +82,13 @@ def generate_response(message_body, wa_id, name):
     new_message = run_assistant(thread, name)
 
     return new_message
+
+
+def reply_to_conversation(wa_id, message_body, name):
+    """Mailbox handler: generates the reply to the (coalesced) messages and queues it for sending."""
+    from app.utils.broadcast import text_message
+    from app.utils.whatsapp_utils import send_message_async
+
+    new_message = generate_response(message_body, wa_id, name)
+    send_message_async(text_message(wa_id, new_message))
+    return new_message
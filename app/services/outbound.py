@@ -0,0 +1,313 @@
+import heapq
+import itertools
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Union
+
+from app.services.graph_client import GraphAPIError
+from app.services.webhook_queue import QueueFullError
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, up to `capacity` saved
+    up for bursts.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Takes a token if there is one. Returns 0 on success, otherwise the seconds until the next token."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, stop: Optional[threading.Event] = None) -> bool:
+        """Blocks until a token is available. Returns False if `stop` was set while waiting."""
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return True
+            if stop is not None:
+                if stop.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+@dataclass
+class OutboundJob:
+    data: str
+    future: Future = field(default_factory=Future)
+    attempts: int = 0
+
+
+class OutboundDispatcher:
+    """
+    Rate limited, retrying sender for outbound WhatsApp messages.
+
+    `submit` queues a message and returns a Future straight away. Worker
+    threads take a token from a bucket sized to the phone number's throughput
+    tier (OUTBOUND_RATE_PER_SECOND, 80 messages/s by default on the Cloud API)
+    and send it. Rate limits (429) and connections that could not be
+    established, once they outlast the Graph client's own quick retries, are
+    rescheduled with jittered exponential backoff, without holding a worker.
+    Server errors and timeouts are not: Graph may already have delivered the
+    message, and sending it again would deliver it twice. Messages that run
+    out of attempts, or fail with any other error, are stored in a SQLite
+    dead-letter table and their future raises GraphAPIError.
+
+    The send queue lives in memory; messages still queued when the process
+    stops are lost, only dead letters are persisted.
+    """
+
+    def __init__(self, app=None):
+        self.max_attempts = 5
+        self.max_depth = 0
+        self.backoff_base = 0.5
+        self.backoff_max = 30.0
+        self.bucket = TokenBucket(80)
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._stop = threading.Event()
+        self._workers = []
+        self._conn = None
+        self._counters = {'submitted': 0, 'sent': 0, 'retried': 0, 'dead_lettered': 0, 'rejected': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        path = Path(app.config['OUTBOUND_DEAD_LETTER_PATH'])
+        if not path.is_absolute():
+            path = Path(app.instance_path) / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.stop_workers()
+        self.max_attempts = app.config['OUTBOUND_MAX_ATTEMPTS']
+        self.max_depth = app.config['OUTBOUND_QUEUE_MAX_DEPTH']
+        self.backoff_base = app.config['OUTBOUND_BACKOFF_BASE']
+        self.backoff_max = app.config['OUTBOUND_BACKOFF_MAX']
+        self.bucket = TokenBucket(app.config['OUTBOUND_RATE_PER_SECOND'], app.config['OUTBOUND_BURST'])
+        with self._lock:
+            self._heap = []
+            self._in_flight = 0
+            self._counters = {key: 0 for key in self._counters}
+        self.open(path)
+        app.extensions['outbound'] = self
+
+    def open(self, path):
+        """Open (or create) the dead-letter database."""
+        conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS outbound_dead_letters (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                body TEXT NOT NULL,
+                status_code INTEGER,
+                error TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                failed_at REAL NOT NULL
+            )
+            '''
+        )
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = conn
+
+    def close(self):
+        self.stop_workers()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def submit(self, data: Union[str, dict]) -> Future:
+        """
+        Queues a message for sending.
+
+        Args:
+            data (Union[str, dict]): The Graph API message body, as JSON text or a dict.
+
+        Returns:
+            Future: Resolves to the Graph API response JSON, or raises GraphAPIError once the message is dead-lettered.
+
+        Raises:
+            QueueFullError: If `max_depth` messages are already waiting.
+        """
+        job = OutboundJob(data if isinstance(data, str) else json.dumps(data))
+        with self._ready:
+            if self.max_depth and len(self._heap) >= self.max_depth:
+                self._counters['rejected'] += 1
+                raise QueueFullError(f'Outbound queue is full ({self.max_depth} waiting)')
+            self._push(job, time.monotonic())
+            self._counters['submitted'] += 1
+        return job.future
+
+    def _push(self, job: OutboundJob, ready_at: float):
+        heapq.heappush(self._heap, (ready_at, next(self._seq), job))
+        self._ready.notify()
+
+    def _take(self, timeout: Optional[float]) -> Optional[OutboundJob]:
+        """Pops the next message whose backoff has elapsed, waiting up to `timeout` seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ready:
+            while True:
+                now = time.monotonic()
+                if self._heap and self._heap[0][0] <= now:
+                    self._in_flight += 1
+                    return heapq.heappop(self._heap)[2]
+
+                waits = []
+                if self._heap:
+                    waits.append(self._heap[0][0] - now)
+                if deadline is not None:
+                    waits.append(deadline - now)
+                if self._stop.is_set() or (deadline is not None and deadline <= now):
+                    return None
+                self._ready.wait(min(waits) if waits else None)
+
+    def process_one(self, timeout: Optional[float] = 0) -> bool:
+        """
+        Sends a single queued message (must run inside an app context).
+
+        Returns:
+            bool: False if no message was ready within `timeout`.
+        """
+        from app.utils.whatsapp_utils import send_message
+
+        job = self._take(timeout)
+        if job is None:
+            return False
+
+        try:
+            if not self.bucket.acquire(self._stop):
+                # Shutting down, keep the message for whoever drains next
+                with self._ready:
+                    self._push(job, time.monotonic())
+                return True
+
+            job.attempts += 1
+            try:
+                response = send_message(job.data)
+            except GraphAPIError as e:
+                self._failed(job, e)
+            except Exception as e:
+                self._failed(job, GraphAPIError(f'Unexpected error sending message: {e!r}'))
+            else:
+                with self._lock:
+                    self._counters['sent'] += 1
+                try:
+                    result = response.json()
+                except ValueError:
+                    result = {}
+                job.future.set_result(result)
+        finally:
+            with self._ready:
+                self._in_flight -= 1
+                self._ready.notify_all()
+        return True
+
+    def _failed(self, job: OutboundJob, error: GraphAPIError):
+        if error.resendable and job.attempts < self.max_attempts:
+            delay = error.retry_after or min(self.backoff_max, self.backoff_base * 2 ** (job.attempts - 1))
+            delay *= random.uniform(1, 1.25)
+            logging.warning(f'Outbound message failed on attempt {job.attempts} ({error}), retrying in {delay:.2f}s')
+            with self._ready:
+                self._counters['retried'] += 1
+                self._push(job, time.monotonic() + delay)
+            return
+
+        logging.error(f'Outbound message dead-lettered after {job.attempts} attempts: {error}')
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO outbound_dead_letters (body, status_code, error, attempts, failed_at) VALUES (?, ?, ?, ?, ?)',
+                (job.data, error.status_code, error.body or str(error), job.attempts, time.time()),
+            )
+            self._counters['dead_lettered'] += 1
+        job.future.set_exception(error)
+
+    def drain(self, timeout: Optional[float] = None) -> int:
+        """Sends on the calling thread until nothing is queued, including messages waiting out a backoff."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        processed = 0
+        while True:
+            with self._lock:
+                if not self._heap:
+                    return processed
+                wait = self._heap[0][0] - time.monotonic()
+            if deadline is not None and time.monotonic() + max(wait, 0) > deadline:
+                return processed
+            processed += self.process_one(timeout=max(wait, 0) + 0.01)
+
+    def start_workers(self, app, num_workers: int):
+        """Starts `num_workers` daemon threads that send inside an app context."""
+        # These workers' stop signal; stop_workers sets it and hands out a new one
+        stop = self._stop
+
+        def worker():
+            while not stop.is_set():
+                with app.app_context():
+                    self.process_one(timeout=1.0)
+
+        for i in range(num_workers):
+            thread = threading.Thread(target=worker, name=f'outbound-worker-{i}', daemon=True)
+            thread.start()
+            self._workers.append(thread)
+
+    def stop_workers(self, timeout: float = 5.0):
+        self._stop.set()
+        with self._ready:
+            self._ready.notify_all()
+        for thread in self._workers:
+            thread.join(timeout)
+        busy = [thread.name for thread in self._workers if thread.is_alive()]
+        if busy:
+            logging.warning(f'Outbound workers {", ".join(busy)} still busy after {timeout}s, they stop after their current send')
+        self._workers = []
+        # Workers that are still busy keep their own (set) signal, so they exit
+        # even if new workers are started with this one
+        self._stop = threading.Event()
+
+    def dead_letters(self, limit: int = 100) -> list:
+        """Most recent dead-lettered messages first."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, body, status_code, error, attempts, failed_at FROM outbound_dead_letters ORDER BY id DESC LIMIT ?',
+                (limit,),
+            ).fetchall()
+        keys = ('id', 'body', 'status_code', 'error', 'attempts', 'failed_at')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            dead_letters = self._conn.execute('SELECT COUNT(*) FROM outbound_dead_letters').fetchone()[0]
+            return {
+                'queued': len(self._heap),
+                'in_flight': self._in_flight,
+                'dead_letters': dead_letters,
+                'rate_per_second': self.bucket.rate,
+                'workers': len(self._workers),
+                **self._counters,
+            }
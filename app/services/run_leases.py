@@ -0,0 +1,67 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+
+
+class RunLeaseStore:
+    """
+    Leases on WhatsApp conversations in the `assistant_run_leases` table, so
+    processes don't start assistant runs on the same thread at once.
+
+    Acquiring is an INSERT on the wa_id primary key, or an UPDATE that takes
+    over an expired lease, so two processes racing for a conversation can't
+    both win. A lease expires on its own if its owner dies.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['run_leases'] = self
+
+    def acquire(self, wa_id: str, owner: str, seconds: float) -> bool:
+        """
+        Leases the conversation to `owner` for `seconds`.
+
+        Returns:
+            bool: True if `owner` now holds the lease, False if another owner's lease is still live.
+        """
+        from app import db
+        from app.models.models import AssistantRunLease
+
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=seconds)
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    sa.insert(AssistantRunLease).values(wa_id=wa_id, owner=owner, expires_at=expires_at)
+                )
+            return True
+        except sa.exc.IntegrityError:
+            pass
+
+        with db.engine.begin() as connection:
+            # Take over an expired lease, or extend our own
+            return connection.execute(
+                sa.update(AssistantRunLease)
+                .where(AssistantRunLease.wa_id == wa_id)
+                .where(sa.or_(AssistantRunLease.expires_at < now, AssistantRunLease.owner == owner))
+                .values(owner=owner, expires_at=expires_at)
+            ).rowcount == 1
+
+    def release(self, wa_id: str, owner: str):
+        """Gives up `owner`'s lease on the conversation, a lease taken over by someone else is left alone."""
+        from app import db
+        from app.models.models import AssistantRunLease
+
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    sa.delete(AssistantRunLease)
+                    .where(AssistantRunLease.wa_id == wa_id)
+                    .where(AssistantRunLease.owner == owner)
+                )
+        except sa.exc.SQLAlchemyError as e:
+            logging.error(f'Could not release the run lease of {wa_id}: {e}')
@@ -0,0 +1,92 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Tuple
+
+import sqlalchemy as sa
+
+from app.utils.cache import TTLCache
+
+
+class ActiveSessionRegistry:
+    """
+    Open training session per user id, so uploads within the session window
+    don't query `training_sessions` every time.
+
+    Entries are filled lazily on the first upload of a user, expire with the
+    session window (`TRAINING_SESSION_WINDOW_HOURS` after the session was
+    created) and are dropped when the session is closed or deleted. Misses are
+    resolved under a lock, so two threads can't both open a session for the
+    same user.
+    """
+
+    def __init__(self, app=None):
+        self.window = timedelta(hours=3)
+        self.cache = TTLCache(maxsize=10000)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models.models import TrainingSession
+
+        self.window = timedelta(hours=app.config['TRAINING_SESSION_WINDOW_HOURS'])
+        self.cache = TTLCache(maxsize=10000)
+        if not sa.event.contains(TrainingSession, 'after_delete', self._on_delete):
+            sa.event.listen(TrainingSession, 'after_delete', self._on_delete)
+        app.extensions['session_registry'] = self
+
+    def get(self, user_id: int) -> Optional[int]:
+        """The cached open session id for `user_id`, or None."""
+        item = self.cache.get(user_id)
+        if item is None:
+            return None
+        session_id, expires_at = item
+        if expires_at <= datetime.now(timezone.utc):
+            self.cache.pop(user_id)
+            return None
+        return session_id
+
+    def open(self, user_id: int, session_id: int, created_at: datetime):
+        """Registers `session_id` as open until `created_at` plus the window."""
+        if created_at.tzinfo is None:
+            # SQLite hands timezone aware columns back naive, they are stored in UTC
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        expires_at = created_at + self.window
+        ttl = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        if ttl > 0:
+            self.cache.set(user_id, (session_id, expires_at), ttl=ttl)
+
+    def close(self, user_id: int, session_id: Optional[int] = None):
+        """Forgets the open session of `user_id` (only if it is `session_id`, when given)."""
+        item = self.cache.get(user_id)
+        if item is not None and (session_id is None or item[0] == session_id):
+            self.cache.pop(user_id)
+
+    def resolve(self, user_id: int, load: Callable[[], Tuple[int, datetime]]) -> int:
+        """
+        Returns the open session id of `user_id`, calling `load` on a miss.
+
+        Args:
+            user_id (int): The user.
+            load (Callable): Finds or creates the session in the database, returns (id, created_at).
+
+        Returns:
+            int: The session id.
+        """
+        session_id = self.get(user_id)
+        if session_id is not None:
+            return session_id
+
+        with self._lock:
+            # Another thread may have opened it while we waited
+            session_id = self.get(user_id)
+            if session_id is None:
+                session_id, created_at = load()
+                self.open(user_id, session_id, created_at)
+            return session_id
+
+    def _on_delete(self, mapper, connection, target):
+        self.close(target.user_id, target.id)
+
+    def metrics(self) -> dict:
+        return {'window_hours': self.window.total_seconds() / 3600, **self.cache.stats()}
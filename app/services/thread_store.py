@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+import sqlalchemy as sa
+
+from app.utils.cache import TTLCache
+
+
+class ThreadStore:
+    """
+    wa_id -> OpenAI thread id, persisted in the `assistant_threads` table and
+    fronted by an in-process LRU.
+
+    Hot conversations are answered from memory. Misses cost one primary key
+    lookup, and writes are single upserts, so concurrent workers (threads or
+    processes) can store threads without a shared file lock.
+    """
+
+    def __init__(self, app=None):
+        self.cache = TTLCache(maxsize=10000)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.cache = TTLCache(maxsize=app.config['THREAD_STORE_CACHE_SIZE'])
+        app.extensions['thread_store'] = self
+
+    def get(self, wa_id: str) -> Optional[str]:
+        """The thread id of the conversation, or None if it has none yet."""
+        thread_id = self.cache.get(wa_id)
+        if thread_id is not None:
+            return thread_id
+
+        from app import db
+        from app.models.models import AssistantThread
+
+        with db.engine.connect() as connection:
+            thread_id = connection.scalar(
+                sa.select(AssistantThread.thread_id).where(AssistantThread.wa_id == wa_id)
+            )
+        if thread_id is not None:
+            self.cache.set(wa_id, thread_id)
+        return thread_id
+
+    def set(self, wa_id: str, thread_id: str):
+        """Stores (or replaces) the thread of the conversation."""
+        self._write(wa_id, thread_id, replace=True)
+        self.cache.set(wa_id, thread_id)
+
+    def set_if_absent(self, wa_id: str, thread_id: str) -> str:
+        """
+        Stores the thread unless the conversation already has one.
+
+        Two workers that both created a thread for a new conversation end up
+        agreeing on the one that was stored first.
+
+        Returns:
+            str: The thread id the conversation now has.
+        """
+        if not self._write(wa_id, thread_id, replace=False):
+            self.cache.pop(wa_id)
+            return self.get(wa_id)
+        self.cache.set(wa_id, thread_id)
+        return thread_id
+
+    def delete(self, wa_id: str):
+        from app import db
+        from app.models.models import AssistantThread
+
+        with db.engine.begin() as connection:
+            connection.execute(sa.delete(AssistantThread).where(AssistantThread.wa_id == wa_id))
+        self.cache.pop(wa_id)
+
+    def _write(self, wa_id: str, thread_id: str, replace: bool) -> bool:
+        """Upsert on the wa_id primary key. Returns False if the row existed and was kept."""
+        from app import db
+        from app.models.models import AssistantThread
+
+        now = datetime.now(timezone.utc)
+        values = {'wa_id': wa_id, 'thread_id': thread_id, 'created_at': now, 'updated_at': now}
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            insert = None
+
+        with db.engine.begin() as connection:
+            if insert is not None:
+                statement = insert(AssistantThread).values(**values)
+                if replace:
+                    statement = statement.on_conflict_do_update(
+                        index_elements=['wa_id'], set_={'thread_id': thread_id, 'updated_at': now}
+                    )
+                else:
+                    statement = statement.on_conflict_do_nothing(index_elements=['wa_id'])
+                return connection.execute(statement).rowcount == 1
+
+            # No ON CONFLICT: insert, and fall back to an update when the row exists
+            try:
+                with connection.begin_nested():
+                    connection.execute(sa.insert(AssistantThread).values(**values))
+                return True
+            except sa.exc.IntegrityError:
+                if replace:
+                    connection.execute(
+                        sa.update(AssistantThread).where(AssistantThread.wa_id == wa_id)
+                        .values(thread_id=thread_id, updated_at=now)
+                    )
+                    return True
+                return False
+
+    def metrics(self) -> dict:
+        return self.cache.stats()
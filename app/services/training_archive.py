@@ -0,0 +1,127 @@
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# Hive style directories: atleta_id=<id>/month=<YYYY-MM>/part-*.parquet
+PARTITIONING = ds.partitioning(pa.schema([('atleta_id', pa.int64()), ('month', pa.string())]), flavor='hive')
+
+
+class TrainingArchive:
+    """
+    Parquet copy of training_details for analytics, partitioned by athlete
+    and month.
+
+    Uploads are appended next to the DB ingestion, with only the reps the
+    insert actually stored, so a rep is archived once without the archive
+    being read back on every upload. `read` only opens the
+    partitions matching the athlete/date filters and only decodes the
+    requested columns, so looking at one athlete's last months doesn't scan the
+    whole history the way the CSV or a row-wise table read does.
+    """
+
+    def __init__(self, app=None):
+        self.root = None
+        self.enabled = False
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        root = Path(app.config['TRAINING_ARCHIVE_PATH'])
+        if not root.is_absolute():
+            root = Path(app.root_path) / app.config['DOWNLOAD_DATA_PATH'] / root
+        self.root = root
+        self.enabled = app.config['TRAINING_ARCHIVE_ENABLED']
+        app.extensions['training_archive'] = self
+
+    def _dataset(self):
+        if self.root is None or not self.root.exists():
+            return None
+        return ds.dataset(self.root, format='parquet', partitioning=PARTITIONING)
+
+    def append(self, df, atleta_id: int) -> int:
+        """
+        Archives the reps of a preprocessed ADR frame.
+
+        Dedup is the caller's job: pass the rows `insert_training_details` just
+        stored, which are new to the athlete. Duplicates within `df` are dropped.
+
+        Args:
+            df (pd.DataFrame): Rows of `preprocess_adr_data` output (or one of its chunks).
+            atleta_id (int): The athlete the reps belong to.
+
+        Returns:
+            int: Number of rows written.
+        """
+        from app.utils.adr_processor import TRAINING_DETAIL_COLUMNS
+
+        if not self.enabled or df.empty:
+            return 0
+
+        archived = pd.DataFrame({db_col: df[df_col] for df_col, db_col in TRAINING_DETAIL_COLUMNS.items()})
+        if not pd.api.types.is_datetime64_any_dtype(archived['timestamp']):
+            archived['timestamp'] = pd.to_datetime(archived['timestamp'], format='%d-%m-%Y %H:%M')
+        archived['atleta_id'] = atleta_id
+        archived['month'] = archived['timestamp'].dt.strftime('%Y-%m')
+        archived = archived.drop_duplicates('hash_id')
+
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            ds.write_dataset(
+                pa.Table.from_pandas(archived, preserve_index=False),
+                self.root,
+                format='parquet',
+                partitioning=PARTITIONING,
+                basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+                existing_data_behavior='overwrite_or_ignore',
+            )
+        return len(archived)
+
+    def read(self, columns: Optional[List[str]] = None, atleta_id: Optional[int] = None,
+             start: Optional[datetime] = None, end: Optional[datetime] = None,
+             ejercicio: Optional[str] = None, months: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Reads archived reps, pushing the filters and the column selection down to
+        the Parquet scan.
+
+        Args:
+            columns (Optional[List[str]]): training_details column names to load, all by default.
+            atleta_id (Optional[int]): Only this athlete's partitions.
+            start (Optional[datetime]): Only reps with timestamp >= start.
+            end (Optional[datetime]): Only reps with timestamp < end.
+            ejercicio (Optional[str]): Only this exercise.
+            months (Optional[List[str]]): Only these 'YYYY-MM' partitions.
+
+        Returns:
+            pd.DataFrame: The matching rows, with only `columns`.
+        """
+        dataset = self._dataset()
+        if dataset is None:
+            return pd.DataFrame(columns=columns or [])
+
+        conditions = []
+        if atleta_id is not None:
+            conditions.append(ds.field('atleta_id') == atleta_id)
+        if months is not None:
+            conditions.append(ds.field('month').isin(months))
+        if start is not None:
+            # Month bounds prune whole directories, the timestamp bounds the rows inside them
+            conditions.append(ds.field('month') >= start.strftime('%Y-%m'))
+            conditions.append(ds.field('timestamp') >= pa.scalar(start, pa.timestamp('ns')))
+        if end is not None:
+            conditions.append(ds.field('month') <= end.strftime('%Y-%m'))
+            conditions.append(ds.field('timestamp') < pa.scalar(end, pa.timestamp('ns')))
+        if ejercicio is not None:
+            conditions.append(ds.field('ejercicio') == ejercicio)
+
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
@@ -0,0 +1,65 @@
+from typing import Callable, Optional
+
+import sqlalchemy as sa
+
+from app.utils.cache import TTLCache
+
+# Cached for aliases that matched no user, so a typo in an export isn't looked up on every retry
+_UNKNOWN = -1
+
+
+class UserAliasCache:
+    """
+    Alias -> user id, in front of the `users.alias` lookup done for every ADR
+    upload.
+
+    Unknown aliases are cached too, for a shorter `negative_ttl`. Entries are
+    dropped as soon as a user is inserted, updated or deleted through the ORM,
+    for the old and the new alias, so renames and new athletes are seen right
+    away in this process.
+    """
+
+    def __init__(self, app=None):
+        self.cache = TTLCache(maxsize=10000)
+        self.negative_ttl = 60
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models.models import User
+
+        self.cache = TTLCache(maxsize=app.config['USER_ALIAS_CACHE_SIZE'], ttl=app.config['USER_ALIAS_CACHE_TTL'])
+        self.negative_ttl = app.config['USER_ALIAS_NEGATIVE_TTL']
+        for event in ('after_insert', 'after_update', 'after_delete'):
+            if not sa.event.contains(User, event, self._on_change):
+                sa.event.listen(User, event, self._on_change)
+        app.extensions['user_alias_cache'] = self
+
+    def lookup(self, alias: str, load: Callable[[str], Optional[int]]) -> Optional[int]:
+        """
+        Returns the id of the user with `alias`, or None if there is none.
+
+        Args:
+            alias (str): The 'Atleta' value of an ADR export.
+            load (Callable): Queries the database on a miss, returns the user id or None.
+        """
+        user_id = self.cache.get(alias)
+        if user_id is None:
+            user_id = load(alias)
+            if user_id is None:
+                self.cache.set(alias, _UNKNOWN, ttl=self.negative_ttl)
+            else:
+                self.cache.set(alias, user_id)
+        return None if user_id == _UNKNOWN else user_id
+
+    def invalidate(self, alias: Optional[str]):
+        if alias is not None:
+            self.cache.pop(alias)
+
+    def _on_change(self, mapper, connection, target):
+        history = sa.inspect(target).attrs.alias.history
+        for alias in (*history.deleted, *history.added, target.alias):
+            self.invalidate(alias)
+
+    def metrics(self) -> dict:
+        return self.cache.stats()
@@ -0,0 +1,266 @@
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when the queue has reached its configured maximum depth."""
+
+
+class WebhookQueue:
+    """
+    Durable, SQLite-backed queue for raw webhook bodies.
+
+    The request thread only verifies the signature and calls `enqueue`, so Meta
+    gets its 200 back straight away. A pool of worker threads then drains the
+    queue into the regular webhook handlers.
+
+    Claims are a single UPDATE ... RETURNING, so several processes can share the
+    queue file without two of them taking the same row. A claim is a lease:
+    rows left in 'processing' for longer than `lease_seconds` (a crashed
+    worker) are put back to 'pending', or parked as 'failed' once they used up
+    `max_attempts`; rows a live worker is still handling are left alone.
+    """
+
+    def __init__(self, app=None):
+        self._conn = None
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._workers = []
+        self._stop = threading.Event()
+        self.max_depth = 0
+        self.max_attempts = 3
+        self.lease_seconds = 300.0
+        self._recovered_at = 0.0
+        self._counters = {'enqueued': 0, 'processed': 0, 'failed': 0, 'rejected': 0, 'retried': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        path = Path(app.config['WEBHOOK_QUEUE_PATH'])
+        if not path.is_absolute():
+            path = Path(app.instance_path) / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # The queue is a module-level singleton, so a second app takes it over
+        self.stop_workers()
+        self.max_depth = app.config['WEBHOOK_QUEUE_MAX_DEPTH']
+        self.max_attempts = app.config['WEBHOOK_QUEUE_MAX_ATTEMPTS']
+        self.lease_seconds = app.config['WEBHOOK_QUEUE_LEASE_SECONDS']
+        self.open(path)
+        app.extensions['webhook_queue'] = self
+
+    def open(self, path):
+        """Open (or create) the queue database and recover rows whose lease expired."""
+        conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS webhook_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                body BLOB NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                enqueued_at REAL NOT NULL,
+                claimed_at REAL,
+                last_error TEXT
+            )
+            '''
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_webhook_queue_status_id ON webhook_queue (status, id)')
+
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = conn
+            self._recover_expired()
+
+    def _recover_expired(self) -> int:
+        """
+        Puts rows whose claim outlived the lease back to 'pending'. Caller holds the lock.
+
+        A row that already used up its attempts is parked as 'failed' instead, the
+        same as `nack` does, so a payload that crashes or hangs its worker isn't
+        reclaimed forever.
+        """
+        now = time.time()
+        self._recovered_at = now
+        expired_before = now - self.lease_seconds
+        failed = self._conn.execute(
+            "UPDATE webhook_queue SET status = 'failed', claimed_at = NULL, last_error = ? "
+            "WHERE status = 'processing' AND claimed_at < ? AND attempts >= ?",
+            (f'Lease expired after {self.lease_seconds}s', expired_before, self.max_attempts),
+        ).rowcount
+        recovered = self._conn.execute(
+            "UPDATE webhook_queue SET status = 'pending', claimed_at = NULL "
+            "WHERE status = 'processing' AND claimed_at < ?",
+            (expired_before,),
+        ).rowcount
+        if failed:
+            self._counters['failed'] += failed
+            logging.error(f'Parked {failed} webhooks as failed, their worker did not finish within '
+                          f'{self.lease_seconds}s on the last of {self.max_attempts} attempts')
+        if recovered:
+            logging.warning(f'Recovered {recovered} webhooks whose worker did not finish within {self.lease_seconds}s')
+        return recovered
+
+    def close(self):
+        self.stop_workers()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _count(self, status: str) -> int:
+        return self._conn.execute(
+            'SELECT COUNT(*) FROM webhook_queue WHERE status = ?', (status,)
+        ).fetchone()[0]
+
+    def enqueue(self, body: bytes) -> int:
+        """
+        Persists a raw webhook body and wakes up one worker.
+
+        Args:
+            body (bytes): The raw request body, exactly as signed by Meta.
+
+        Returns:
+            int: The id of the queued row.
+
+        Raises:
+            QueueFullError: If the number of pending rows reached `max_depth`.
+        """
+        with self._not_empty:
+            if self.max_depth and self._count('pending') >= self.max_depth:
+                self._counters['rejected'] += 1
+                raise QueueFullError(f'Webhook queue is full ({self.max_depth} pending)')
+
+            cursor = self._conn.execute(
+                'INSERT INTO webhook_queue (body, enqueued_at) VALUES (?, ?)',
+                (sqlite3.Binary(body), time.time()),
+            )
+            self._counters['enqueued'] += 1
+            self._not_empty.notify()
+            return cursor.lastrowid
+
+    def claim(self, timeout: Optional[float] = None):
+        """
+        Claims the oldest pending webhook.
+
+        Returns:
+            Optional[tuple]: `(id, body, attempts)` or None if the queue stayed empty for `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._not_empty:
+            while True:
+                if time.time() - self._recovered_at > self.lease_seconds / 2:
+                    self._recover_expired()
+                # One statement, so another process on the same file can't claim the row in between
+                row = self._conn.execute(
+                    "UPDATE webhook_queue SET status = 'processing', claimed_at = ?, attempts = attempts + 1 "
+                    "WHERE id = (SELECT id FROM webhook_queue WHERE status = 'pending' ORDER BY id LIMIT 1) "
+                    "AND status = 'pending' RETURNING id, body, attempts",
+                    (time.time(),),
+                ).fetchone()
+                if row is not None:
+                    return row[0], bytes(row[1]), row[2]
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if self._stop.is_set() or (remaining is not None and remaining <= 0):
+                    return None
+                # Rows enqueued by other processes don't notify, so poll at least every second
+                self._not_empty.wait(1.0 if remaining is None else min(remaining, 1.0))
+
+    def ack(self, item_id: int):
+        with self._lock:
+            self._conn.execute('DELETE FROM webhook_queue WHERE id = ?', (item_id,))
+            self._counters['processed'] += 1
+
+    def nack(self, item_id: int, attempts: int, error: str):
+        """Returns a webhook to the queue, or parks it as 'failed' once it ran out of attempts."""
+        status = 'failed' if attempts >= self.max_attempts else 'pending'
+        with self._not_empty:
+            self._conn.execute(
+                'UPDATE webhook_queue SET status = ?, claimed_at = NULL, last_error = ? WHERE id = ?',
+                (status, error, item_id),
+            )
+            if status == 'failed':
+                self._counters['failed'] += 1
+            else:
+                self._counters['retried'] += 1
+                self._not_empty.notify()
+
+    def process_one(self, handler: Callable[[bytes], object], timeout: Optional[float] = 0) -> bool:
+        """
+        Claims a single webhook and runs `handler` on its body.
+
+        Returns:
+            bool: False if there was nothing to process.
+        """
+        item = self.claim(timeout=timeout)
+        if item is None:
+            return False
+
+        item_id, body, attempts = item
+        try:
+            handler(body)
+        except Exception as e:
+            logging.exception(f'Webhook {item_id} failed on attempt {attempts}')
+            self.nack(item_id, attempts, repr(e))
+        else:
+            self.ack(item_id)
+        return True
+
+    def drain(self, handler: Callable[[bytes], object]) -> int:
+        """Processes pending webhooks on the calling thread until the queue is empty."""
+        processed = 0
+        while self.process_one(handler, timeout=0):
+            processed += 1
+        return processed
+
+    def start_workers(self, app, handler: Callable[[bytes], object], num_workers: int):
+        """Starts `num_workers` daemon threads that run `handler` inside an app context."""
+        self._stop.clear()
+
+        def worker():
+            while not self._stop.is_set():
+                with app.app_context():
+                    self.process_one(handler, timeout=1.0)
+
+        for i in range(num_workers):
+            thread = threading.Thread(target=worker, name=f'webhook-worker-{i}', daemon=True)
+            thread.start()
+            self._workers.append(thread)
+
+    def stop_workers(self, timeout: float = 5.0):
+        self._stop.set()
+        with self._not_empty:
+            self._not_empty.notify_all()
+        for thread in self._workers:
+            thread.join(timeout)
+        self._workers = []
+
+    def metrics(self) -> dict:
+        """Backpressure metrics: queue depth, in-flight work, lag and lifetime counters."""
+        with self._lock:
+            pending = self._count('pending')
+            in_flight = self._count('processing')
+            failed = self._count('failed')
+            oldest = self._conn.execute(
+                "SELECT MIN(enqueued_at) FROM webhook_queue WHERE status = 'pending'"
+            ).fetchone()[0]
+            counters = dict(self._counters)
+
+        return {
+            'pending': pending,
+            'in_flight': in_flight,
+            'failed': failed,
+            'max_depth': self.max_depth,
+            'utilization': pending / self.max_depth if self.max_depth else None,
+            'oldest_pending_age_s': time.time() - oldest if oldest is not None else 0.0,
+            'workers': len(self._workers),
+            **counters,
+        }
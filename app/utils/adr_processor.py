@@ -1,33 +1,112 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
 import pandas as pd
 from datetime import datetime, timezone,  timedelta
 import hashlib
 from flask import current_app
-from app import db
+from app import db, session_registry, user_alias_cache, training_archive
 import sqlalchemy as sa
 import sqlalchemy.orm as so 
 from app.models.models import User, TrainingSession, TrainingDetail
-from .path_utils import get_download_data_path
+from .vbt_analytics import vbt_report
+
+# 'S3R5' -> ('3', '5') in a single pass over SERIE. Each lookahead captures its
+# number or nothing, so labels missing either part still match, and both find
+# the first occurrence exactly like separate S(\d+) / R(\d+) extractions.
+ADR_SERIE_PATTERN = r'^(?=(?:.*?S(\d+))?)(?=(?:.*?R(\d+))?)'
+
 
 def split_series_column(df):
     try:
-        new_df = df.copy()
-        new_df["REP"] = new_df["SERIE"].str.extract(r'R(\d+)')
-        new_df["SERIE"] = new_df["SERIE"].str.extract(r'S(\d+)')
-
-        return new_df
+        return split_series_inplace(df.copy())
     except Exception as e:
         print(f"Exception: {e}") 
 
 
+def split_series_inplace(df):
+    """Replaces 'SERIE' with its set number and adds 'REP' right after it, in place."""
+    parts = df["SERIE"].str.extract(ADR_SERIE_PATTERN)
+    df["SERIE"] = parts[0]
+    if "REP" in df.columns:
+        df["REP"] = parts[1]
+    else:
+        df.insert(df.columns.get_loc("SERIE") + 1, "REP", parts[1])
+    return df
+
+
 def create_hash_id(row, columns):
-    """Create a hash ID for a row based on selected columns."""
+    """Content hash of a row: the hash_id of its first occurrence in an export."""
     values = [str(row[col]) for col in columns]
     combined = '_'.join(values)
-    return hashlib.md5(combined.encode()).hexdigest()[:8]
+    return hashlib.md5(combined.encode()).hexdigest()
+
+
+# hash_id = md5 hex digest of '_'.join(str(value) for each hashed column), plus
+# '-<k>' for the k-th repetition (k >= 1) of identical values in the same export.
+# An export has no per-rep date, so the occurrence number is what tells two
+# genuinely identical reps apart, and re-uploading an export yields the same ids.
+# Stored rows rely on it for dedup, so changing the scheme means re-hashing
+# training_details.hash_id in a data migration (a71d3c9e5b28 did it for 'md5-8';
+# rows it could not verify keep their legacy id, see `filter_existing_hashes`).
+HASH_ID_SCHEME = 'md5-occurrence'
+
+
+def legacy_hash_id(hash_id: str) -> str:
+    """
+    The id the same rep got under the previous 'md5-8' scheme (first 8 hex
+    chars, duplicates suffixed '-<k>' by the unique index migration), so reps
+    stored before the scheme change still count as duplicates.
+    """
+    return hash_id[:8] + hash_id[32:]
+
+
+def column_as_str(series) -> np.ndarray:
+    """
+    Column values formatted exactly like str(value), as a numpy array.
+    ADR columns repeat a lot (loads, profiles, exercises), so only the distinct
+    values are formatted and then broadcast back with their codes.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    if series.dtype.kind in 'iuf':
+        # numpy formats numbers (including nan and exponents) the same way str() does
+        labels = np.asarray(uniques).astype(str).astype(object)
+    else:
+        labels = np.asarray(uniques, dtype=object).astype(str).astype(object)
+    # Object array of references to the distinct strings, not one string per row
+    formatted = labels[codes]
+    if series.dtype.kind == 'f':
+        # factorize treats -0.0 and 0.0 as one value, str() does not
+        values = series.to_numpy()
+        zeros = values == 0
+        if zeros.any():
+            formatted[zeros] = np.where(np.signbit(values[zeros]), '-0.0', '0.0')
+    return formatted
+
+
+def add_hash_ids(df, columns_to_hash, seen=None):
+    """
+    Adds a 'hash_id' column, column-wise instead of row by row.
 
+    The content hash is the same as `create_hash_id` for every row of a frame
+    with at least one non-numeric column (always the case for ADR exports).
 
-def add_hash_ids(df, columns_to_hash):
-    df["hash_id"] = df.apply(lambda row: create_hash_id(row, columns_to_hash), axis = 1)
+    Args:
+        df (pd.DataFrame): ADR rows, in export order.
+        columns_to_hash (list): Columns the hash is computed over.
+        seen (Optional[dict]): Content hash -> occurrences so far, shared between
+            the chunks of one export so repetitions are numbered across chunks.
+    """
+    seen = {} if seen is None else seen
+    columns = [column_as_str(df[col]).tolist() for col in columns_to_hash]
+    md5 = hashlib.md5
+    hash_ids = []
+    for values in zip(*columns):
+        digest = md5('_'.join(values).encode()).hexdigest()
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        hash_ids.append(f'{digest}-{occurrence}' if occurrence else digest)
+    df["hash_id"] = hash_ids
     return df
 
 
@@ -61,19 +140,24 @@ def change_columns_type(df, columns, type_list):
     # Create a copy to avoid modifying the original DataFrame
     df_converted = df.copy()
 
+    return convert_columns(df_converted, columns, type_list)
+
+
+def convert_columns(df, columns, type_list):
+    """In-place version of `change_columns_type`, without the argument checks."""
     # Iterate over columns and their target types
     for col, target_type in zip(columns, type_list):
         try:
             # Handle specific type conversions if necessary
             if target_type == 'category':
-                df_converted[col] = df_converted[col].astype('category')
+                df[col] = df[col].astype('category')
             elif target_type == 'datetime':
-                df_converted[col] = pd.to_datetime(df_converted[col], errors='coerce')
+                df[col] = pd.to_datetime(df[col], errors='coerce')
             elif target_type == 'numeric':
-                df_converted[col] = pd.to_numeric(df_converted[col], errors='coerce')
+                df[col] = pd.to_numeric(df[col], errors='coerce')
             else:
                 # For standard types like 'int', 'float', 'str', etc.
-                df_converted[col] = df_converted[col].astype(target_type)
+                df[col] = df[col].astype(target_type)
         except ValueError as ve:
             print(f"ValueError: Cannot convert column '{col}' to {target_type}. {ve}")
         except TypeError as te:
@@ -81,7 +165,7 @@ def change_columns_type(df, columns, type_list):
         except Exception as e:
             print(f"An unexpected error occurred while converting column '{col}': {e}")
 
-    return df_converted
+    return df
 
 
 
@@ -129,24 +213,8 @@ def reorder_columns(df):
     Returns:
         pd.DataFrame: DataFrame with reordered columns
     """
-    # Define the desired column order
-    column_order = [
-        'Timestamp',
-        'SERIE',
-        'REP',
-        'KG',
-        'D',
-        'VM',
-        'VMP',
-        'RM',
-        'P(W)',
-        'Perfil',
-        'Ejer.',
-        'Atleta',
-        'Ecuacion',
-        'hash_id'
-    ]
-    
+    column_order = ADR_COLUMN_ORDER
+
     # Verify all columns exist
     missing_cols = [col for col in column_order if col not in df.columns]
     if missing_cols:
@@ -159,170 +227,601 @@ def reorder_columns(df):
 
 
 
+ADR_COLUMNS_TO_HASH = ['SERIE', 'REP', 'KG', 'D', 'VM', 'VMP', 'RM', 'P(W)', 'Perfil', 'Ejer.', 'Atleta', 'Ecuacion']
+
+# Columns to change and their target types
+ADR_COLUMN_TYPES = {
+    'SERIE': 'int',
+    'REP': 'int',
+    'KG': 'float',
+    'D': 'float',
+    'VM': 'float',
+    'VMP': 'float',
+    'RM': 'float',
+    'P(W)': 'float',
+}
+
+ADR_NUMERIC_COLUMNS = ['KG', 'D', 'VM', 'VMP', 'RM', 'P(W)']
+ADR_TEXT_COLUMNS = ['SERIE', 'Perfil', 'Ejer.', 'Atleta', 'Ecuacion']
+
+
+ADR_COLUMN_ORDER = ['Timestamp'] + ADR_COLUMNS_TO_HASH + ['hash_id']
+
+
+class AdrStage(ABC):
+    """
+    One step of the ADR preprocessing pipeline.
+
+    Stages with `inplace = True` mutate the frame they are given. The others
+    return a new frame, which the pipeline carries on with.
+    """
+    inplace = True
+
+    @abstractmethod
+    def __call__(self, df):
+        """Runs the step on `df` and returns the resulting frame."""
+
+
+class DropColumns(AdrStage):
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __call__(self, df):
+        present = [col for col in self.columns if col in df.columns]
+        if present:
+            df.drop(columns=present, inplace=True)
+        return df
+
+
+class SplitSeries(AdrStage):
+    def __call__(self, df):
+        return split_series_inplace(df)
+
+
+class HashIds(AdrStage):
+    """Numbers repeated reps across every frame the stage sees, i.e. all chunks of one export."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.seen = {}
+
+    def __call__(self, df):
+        return add_hash_ids(df, self.columns, self.seen)
+
+
+class ConvertTypes(AdrStage):
+    def __init__(self, types: dict):
+        self.types = types
+
+    def __call__(self, df):
+        return convert_columns(df, list(self.types), list(self.types.values()))
+
+
+class AddTimestamp(AdrStage):
+    def __init__(self, timestamp=None):
+        self.timestamp = timestamp
+
+    def __call__(self, df):
+        timestamp = self.timestamp or datetime.now().strftime('%d-%m-%Y %H:%M')
+        if 'Timestamp' in df.columns:
+            df['Timestamp'] = timestamp
+        else:
+            df.insert(0, 'Timestamp', timestamp)
+        return df
+
+
+class ReorderColumns(AdrStage):
+    """Only selects (and so copies) when the columns are not already in order."""
+    inplace = False
+
+    def __call__(self, df):
+        if list(df.columns) == ADR_COLUMN_ORDER:
+            return df
+        return reorder_columns(df)
+
+
+class AdrPipeline:
+    """
+    Runs a list of stages over one frame.
+
+    The frame is copied at most once, up front, and only if the caller does
+    not own it. In-place stages then all work on that same frame.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+
+    def run(self, df, owned: bool = False):
+        """
+        Args:
+            df (pd.DataFrame): Raw ADR rows.
+            owned (bool): True if `df` can be mutated, e.g. it was just read from disk.
+
+        Returns:
+            pd.DataFrame: The preprocessed frame, `df` itself when owned and already in column order.
+        """
+        if not owned:
+            df = df.copy()
+        for stage in self.stages:
+            result = stage(df)
+            if not stage.inplace:
+                df = result
+        return df
+
+
+def adr_pipeline(timestamp=None) -> AdrPipeline:
+    """The ADR preprocessing steps, all in place. Every row gets `timestamp` (now by default)."""
+    return AdrPipeline([
+        DropColumns(['R']),
+        SplitSeries(),
+        HashIds(ADR_COLUMNS_TO_HASH),
+        ConvertTypes(ADR_COLUMN_TYPES),
+        AddTimestamp(timestamp),
+        ReorderColumns(),
+    ])
+
+
 def preprocess_adr_data(new_adr_path):
-    #Data to csv
-    new_data = pd.read_csv(new_adr_path)
+    # The frame read here is ours, so the pipeline never copies it
+    new_data = pd.read_csv(new_adr_path, usecols=lambda col: col != 'R')
+    return adr_pipeline().run(new_data, owned=True)
 
 
-    new_data_copy = new_data.copy()
-    
-    new_data_copy = new_data.drop(columns = "R")
-    new_data_copy = split_series_column(new_data_copy)
-    
-    
-    columns_to_hash = ['SERIE', 'REP', 'KG', 'D', 'VM', 'VMP', 'RM', 'P(W)', 'Perfil', 'Ejer.', 'Atleta', 'Ecuacion']
+def frame_to_columns(df) -> dict:
+    """
+    Compact columnar form of a preprocessed ADR frame, cheap to pickle between
+    processes. Numeric columns stay numpy arrays; text columns, which repeat a
+    lot, are sent as (codes, distinct values).
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if series.dtype.kind in 'biuf':
+            columns[col] = series.to_numpy()
+        else:
+            codes, uniques = pd.factorize(series, use_na_sentinel=False)
+            columns[col] = (codes.astype(np.int32), np.asarray(uniques, dtype=object))
+    return columns
 
-    new_data_copy = add_hash_ids(new_data_copy, columns_to_hash)
 
+def frame_from_columns(columns: dict):
+    """Inverse of `frame_to_columns`."""
+    return pd.DataFrame({
+        col: values[1][values[0]] if isinstance(values, tuple) else values
+        for col, values in columns.items()
+    })
 
-    
-        # List of columns to change
-    columns = ['SERIE', 'REP', 'KG', 'D', 'VM', 'VMP', 'RM', 'P(W)']
-    
-    # Corresponding list of target types
-    type_list = ['int', 'int', 'float', 'float', 'float', 'float', 'float', 'float']
-    
-    new_data_copy = change_columns_type(new_data_copy, columns, type_list)
 
-    new_data_copy = add_timestamps(new_data_copy)
+def preprocess_adr_columns(new_adr_path) -> dict:
+    """`preprocess_adr_data` for a worker process, returns `frame_to_columns` of the result."""
+    return frame_to_columns(preprocess_adr_data(new_adr_path))
 
-    new_data_copy = reorder_columns(new_data_copy)
 
-    return new_data_copy
+def infer_adr_dtypes(new_adr_path, chunksize: int) -> dict:
+    """
+    Explicit dtypes for reading an ADR export in chunks.
 
-def get_previous_adr_data():
-    file_path = get_download_data_path() / current_app.config.get('TEMPORARY_DATAFRAME_TRAINING')
-    if file_path.exists():
-        adr_dataframe = pd.read_csv(file_path)
-    else:
-        adr_dataframe = pd.DataFrame(columns=[
-                        'Timestamp',
-                        'SERIE',
-                        'REP',
-                        'KG',
-                        'D',
-                        'VM',
-                        'VMP',
-                        'RM',
-                        'P(W)',
-                        'Perfil',
-                        'Ejer.',
-                        'Atleta',
-                        'Ecuacion',
-                        'hash_id'
-                            ])
-        adr_dataframe.to_csv(file_path)
-
-    return adr_dataframe
-
-
-def filter_df_based_on_hash(old_df,new_df):
-    try:
-        existing_hashes = set(old_df['hash_id'])
-    
-        # Define the conditions
-        new_series_condition = ~new_df['hash_id'].isin(existing_hashes)
-        new_series_df = new_df[new_series_condition]
-                
-        return new_series_df
+    Numeric columns get the dtype a whole-file read_csv would have inferred
+    (int64 only if every value in the file is an integer), found with a cheap
+    chunked pass over just those columns. Chunks then hash numbers exactly like
+    `preprocess_adr_data`, whatever chunk a value lands in.
+    """
+    header = pd.read_csv(new_adr_path, nrows=0).columns
+    numeric_columns = [col for col in ADR_NUMERIC_COLUMNS if col in header]
+    dtypes = {col: 'str' for col in ADR_TEXT_COLUMNS if col in header}
+
+    kinds = {col: set() for col in numeric_columns}
+    for chunk in pd.read_csv(new_adr_path, usecols=numeric_columns, chunksize=chunksize):
+        for col in numeric_columns:
+            kinds[col].add(chunk[col].dtype.kind)
+
+    for col, seen in kinds.items():
+        if seen <= {'i'}:
+            dtypes[col] = 'int64'
+        elif seen <= {'i', 'f'}:
+            dtypes[col] = 'float64'
+        # anything else is left to per-chunk inference, like the whole-file reader would
+    return dtypes
+
+
+def iter_adr_chunks(new_adr_path, chunksize=None):
+    """
+    Reads an ADR export `chunksize` rows at a time (ADR_CSV_CHUNK_SIZE by
+    default) and yields each chunk fully preprocessed, so memory stays bounded
+    by the chunk size and not the file size. All chunks share one timestamp.
+    """
+    chunksize = chunksize or current_app.config['ADR_CSV_CHUNK_SIZE']
+    dtypes = infer_adr_dtypes(new_adr_path, chunksize)
+    pipeline = adr_pipeline(datetime.now().strftime('%d-%m-%Y %H:%M'))
+
+    reader = pd.read_csv(
+        new_adr_path,
+        chunksize=chunksize,
+        dtype=dtypes,
+        usecols=lambda col: col != 'R',
+    )
+    with reader:
+        for chunk in reader:
+            yield pipeline.run(chunk, owned=True)
+
+
+def ingest_adr_file(new_adr_path, chunksize=None) -> int:
+    """
+    Streams an ADR export into training_details chunk by chunk.
+
+    Returns:
+        int: Number of new reps stored.
+    """
+    user_id = None
+    session_id = None
+    inserted = 0
+    exercises = set()
+    for chunk in iter_adr_chunks(new_adr_path, chunksize):
+        if user_id is None:
+            user_id = get_user_id_from_df(chunk)
+            session_id = get_active_training_session_id(user_id)
+        stored = insert_training_details(chunk, session_id, atleta_id=user_id)
+        inserted += len(stored)
+        archive_training_data(stored, user_id)
+        exercises.update(chunk['Ejer.'].dropna().unique())
+
+    if user_id is not None:
+        report_training_analytics(user_id, sorted(exercises))
+    return inserted
+
+
+def filter_existing_hashes(df, atleta_id=None, chunk_size=None):
+    """
+    Drops the rows whose (athlete, hash_id) is already stored, plus duplicates
+    within the upload itself.
+
+    Only the hashes of the upload are looked up, through the unique
+    (atleta_id, hash_id) index, so the cost grows with the upload and not with
+    the athlete's history.
+    """
+    atleta_ids = df['Atleta_ID'] if atleta_id is None else pd.Series(atleta_id, index=df.index)
+    keys = pd.MultiIndex.from_arrays([atleta_ids, df['hash_id']])
+    unique = ~keys.duplicated()
+    df = df[unique]
+    keys = keys[unique]
+    atleta_ids = atleta_ids[unique]
+
+    chunk_size = chunk_size or current_app.config['ADR_INSERT_CHUNK_SIZE']
+    # Reps stored before the hash scheme change are found under their legacy id
+    legacy = df['hash_id'].map(legacy_hash_id, na_action='ignore')
+    legacy_keys = pd.MultiIndex.from_arrays([atleta_ids, legacy])
+    hashes = pd.concat([df['hash_id'], legacy]).dropna().unique().tolist()
+    existing = set()
+    for start in range(0, len(hashes), chunk_size):
+        query = sa.select(TrainingDetail.atleta_id, TrainingDetail.hash_id).where(
+            TrainingDetail.atleta_id.in_(atleta_ids.unique().tolist()),
+            TrainingDetail.hash_id.in_(hashes[start:start + chunk_size]),
+        )
+        existing.update(tuple(row) for row in db.session.execute(query))
+
+    return df[~(keys.isin(existing) | legacy_keys.isin(existing))]
+
+
+def load_user_id_by_alias(alias: str):
+    query = sa.select(User.id).where(User.alias == alias).order_by(User.id).limit(1)
+    return db.session.scalar(query)
 
-    except Exception as e:
-        print(f'Exception: {e}')
 
 # Should refactor in the future to use other non-optional column (i.e phone num)
-# Should test error
-def get_user_from_df(df) -> User:
-    atleta_alias = df.loc[1,"Atleta"]
-    query = sa.select(User).where(User.alias == atleta_alias)
-    result = db.session.scalars(query).all()
-    
-    if not result:
+def get_user_id_from_df(df) -> int:
+    """
+    Id of the athlete an ADR export belongs to, looked up by the alias in its
+    first row. Served from the alias cache, only misses query `users`.
+
+    Raises:
+        KeyError: If the export is empty or no user has that alias.
+    """
+    if df.empty:
+        raise KeyError("Empty ADR export, no athlete to look up")
+
+    atleta_alias = df["Atleta"].iloc[0]
+    user_id = user_alias_cache.lookup(atleta_alias, load_user_id_by_alias)
+    if user_id is None:
         raise KeyError("Not found in database")
 
-    return result[0]
+    return user_id
 
 
-# Should do smth like open session and check if there is an open session if not create one
-# and only commit to db when session is done to avoid too much i/o
-# for now I will check always in db
-def add_or_return_training_session(user) -> TrainingSession:
-    
+def get_user_from_df(df) -> User:
+    return db.session.get(User, get_user_id_from_df(df))
+
+
+def open_training_session_query(user_id: int, now: datetime, window: timedelta):
+    """Latest session of the user started within `window` before `now`, served by (user_id, created_at)."""
+    return sa.select(TrainingSession.id, TrainingSession.created_at).where(
+        TrainingSession.user_id == user_id,
+        TrainingSession.created_at >= now - window,
+        TrainingSession.created_at <= now
+    ).order_by(TrainingSession.created_at.desc()).limit(1)
+
+
+def load_or_create_training_session(user_id: int) -> tuple:
+    """
+    Finds the user's latest session started within the session window, or
+    creates one. Always hits the database, see `get_active_training_session_id`.
+
+    Returns:
+        tuple: (session id, created_at).
+    """
     try:
         # Obtener el momento actual en UTC
         time_now = datetime.now(timezone.utc)
-        # Calcular el tiempo límite restando las horas especificadas
-        time_limit = time_now - timedelta(hours=3)
-        
+
         # Construir la consulta
-        query = sa.select(TrainingSession).where(
-            TrainingSession.user_id == user.id,
-            TrainingSession.created_at >= time_limit,
-            TrainingSession.created_at <= time_now
-        )
-        
+        query = open_training_session_query(user_id, time_now, session_registry.window)
+
         # Ejecutar la consulta y obtener los resultados
-        sessions = db.session.scalars(query).all()
+        row = db.session.execute(query).first()
 
-        if not sessions:
-            training_session = TrainingSession(user = user, date=time_now)
+        if row is None:
+            training_session = TrainingSession(user_id=user_id, date=time_now, created_at=time_now)
             db.session.add(training_session)
             db.session.commit()
-            return training_session
-        return sessions[0]
+            return training_session.id, time_now
+        return row.id, row.created_at
 
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error en add_or_return_training_session: {e}")
+        current_app.logger.error(f"Error en load_or_create_training_session: {e}")
         raise
 
-    #Look for training sessions today within 3 hours
-
-
-def add_dataframe_to_training_detail(df, session_id):
-    for _, row in df.iterrows():
-        training_detail = TrainingDetail(
-            session_id=session_id,
-            timestamp=row['Timestamp'],
-            serie=row['SERIE'],
-            rep=row['REP'],
-            kg=row['KG'],
-            d=row['D'],
-            vm=row['VM'],
-            vmp=row['VMP'],
-            rm=row['RM'],
-            p_w=row['P(W)'],
-            perfil=row['Perfil'],
-            ejercicio=row['Ejer.'],
-            ecuacion=row['Ecuacion'],
-            atleta_id=row['Atleta_ID'],  # Assuming you have Atleta_ID in df
-            hash_id=row['hash_id']
-        )
-        db.session.add(training_detail)
-    db.session.commit()
 
-def process_training_data(df):
-    user = get_user_from_df(df)
-    session = add_or_return_training_session(user)
-    add_dataframe_to_training_detail(df, session.id)
+def get_active_training_session_id(user_id: int) -> int:
+    """
+    Id of the user's open training session, creating one if none started in
+    the last TRAINING_SESSION_WINDOW_HOURS. Served from the active session
+    registry, only cache misses query `training_sessions`.
+    """
+    return session_registry.resolve(user_id, lambda: load_or_create_training_session(user_id))
 
 
-def get_training_detail_to_dataframe():
-    details = TrainingDetail.query.all()
-    data = [{
-        'Timestamp': td.timestamp,
-        'SERIE': td.serie,
-        'REP': td.rep,
-        'KG': td.kg,
-        'D': td.d,
-        'VM': td.vm,
-        'VMP': td.vmp,
-        'RM': td.rm,
-        'P(W)': td.p_w,
-        'Perfil': td.perfil,
-        'Ejer.': td.ejercicio,
-        'Atleta': td.atleta.alias if td.atleta else None,
-        'Ecuacion': td.ecuacion,
-        'hash_id': td.hash_id
-    } for td in details]
-    return pd.DataFrame(data)
+def add_or_return_training_session(user) -> TrainingSession:
+    # Primary key lookup, answered from the identity map when the session is already loaded
+    return db.session.get(TrainingSession, get_active_training_session_id(user.id))
+
+
+# ADR dataframe column -> training_details column
+TRAINING_DETAIL_COLUMNS = {
+    'Timestamp': 'timestamp',
+    'SERIE': 'serie',
+    'REP': 'rep',
+    'KG': 'kg',
+    'D': 'd',
+    'VM': 'vm',
+    'VMP': 'vmp',
+    'RM': 'rm',
+    'P(W)': 'p_w',
+    'Perfil': 'perfil',
+    'Ejer.': 'ejercicio',
+    'Ecuacion': 'ecuacion',
+    'hash_id': 'hash_id',
+}
+
+
+def training_detail_column_arrays(df, session_id, atleta_id=None, now=None) -> dict:
+    """
+    Converts an ADR dataframe into one list per training_details column, with
+    plain Python values (None for missing) that the DB driver can bind directly.
+    """
+    columns = {}
+    for df_column, db_column in TRAINING_DETAIL_COLUMNS.items():
+        series = df[df_column]
+        if df_column == 'Timestamp' and not pd.api.types.is_datetime64_any_dtype(series):
+            series = pd.to_datetime(series, format='%d-%m-%Y %H:%M')
+        if pd.api.types.is_datetime64_any_dtype(series):
+            values = series.dt.to_pydatetime().tolist()
+        else:
+            values = series.to_numpy(dtype=object).tolist()
+        if series.hasnans:
+            values = [None if missing else value for value, missing in zip(values, series.isna().tolist())]
+        columns[db_column] = values
+
+    if atleta_id is None:
+        columns['atleta_id'] = df['Atleta_ID'].to_numpy(dtype=object).tolist()
+    else:
+        columns['atleta_id'] = [atleta_id] * len(df)
+    columns['session_id'] = [session_id] * len(df)
+
+    # One timestamp for the whole upload instead of evaluating the column defaults per row
+    now = now or datetime.now(timezone.utc)
+    columns['created_at'] = [now] * len(df)
+    columns['updated_at'] = [now] * len(df)
+    return columns
+
+
+def training_detail_insert(dialect_name: str):
+    """
+    INSERT for training_details that skips rows already stored for the athlete
+    (unique atleta_id + hash_id), or None if the dialect has no ON CONFLICT.
+    """
+    table = TrainingDetail.__table__
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert(table).on_conflict_do_nothing(index_elements=['atleta_id', 'hash_id'])
+
+
+def insert_training_details(df, session_id, atleta_id=None, chunk_size=None):
+    """
+    Bulk inserts an ADR dataframe into training_details, skipping reps that are
+    already stored for the athlete.
+
+    The dataframe is converted and sent one chunk of `chunk_size` rows
+    (ADR_INSERT_CHUNK_SIZE by default) at a time as an executemany Core insert,
+    so no ORM object is built per rep and memory stays flat however big the
+    upload is. Everything is committed once at the end.
 
+    Dedup happens in the database: an anti-join against the upload's own
+    hashes and their legacy ids first (`filter_existing_hashes`), then
+    INSERT ... ON CONFLICT DO NOTHING on the unique (atleta_id, hash_id) index
+    where the dialect supports it, for uploads racing each other.
+
+    Args:
+        df (pd.DataFrame): Output of `preprocess_adr_data`.
+        session_id (int): The TrainingSession the reps belong to.
+        atleta_id (Optional[int]): The athlete. Read from an 'Atleta_ID' column if None.
+        chunk_size (Optional[int]): Rows per executemany batch.
+
+    Returns:
+        pd.DataFrame: The rows of `df` that were actually stored.
+    """
+    if df.empty:
+        return df
+
+    chunk_size = chunk_size or current_app.config['ADR_INSERT_CHUNK_SIZE']
+    # ON CONFLICT only sees the new ids, reps stored under a legacy id are found here
+    df = filter_existing_hashes(df, atleta_id, chunk_size)
+    dialect = db.session.get_bind().dialect
+    statement = training_detail_insert(dialect.name)
+    if statement is None:
+        # A plain insert stores every row of the batch or fails as a whole
+        statement = sa.insert(TrainingDetail.__table__)
+    elif dialect.insert_executemany_returning:
+        # ON CONFLICT may skip rows a concurrent upload just stored, report only ours
+        statement = statement.returning(TrainingDetail.atleta_id, TrainingDetail.hash_id)
+    now = datetime.now(timezone.utc)
+
+    stored = []
+    try:
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            columns = training_detail_column_arrays(chunk, session_id, atleta_id, now)
+            names = list(columns)
+            result = db.session.execute(statement, [dict(zip(names, row)) for row in zip(*columns.values())])
+            if result.returns_rows:
+                returned = set(tuple(row) for row in result)
+                atleta_ids = chunk['Atleta_ID'] if atleta_id is None else pd.Series(atleta_id, index=chunk.index)
+                keys = pd.MultiIndex.from_arrays([atleta_ids, chunk['hash_id']])
+                chunk = chunk[keys.isin(returned)]
+            stored.append(chunk)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error en insert_training_details: {e}")
+        raise
+
+    return pd.concat(stored) if stored else df
+
+
+def add_dataframe_to_training_detail(df, session_id, atleta_id=None, chunk_size=None) -> int:
+    """
+    `insert_training_details` for callers that only need the count.
+
+    Returns:
+        int: Number of rows inserted.
+    """
+    return len(insert_training_details(df, session_id, atleta_id, chunk_size))
+
+
+def process_training_data(df) -> int:
+    user_id = get_user_id_from_df(df)
+    session_id = get_active_training_session_id(user_id)
+    stored = insert_training_details(df, session_id, atleta_id=user_id)
+    archive_training_data(stored, user_id)
+    report_training_analytics(user_id, sorted(df['Ejer.'].dropna().unique()))
+    return len(stored)
+
+
+def archive_training_data(df, user_id: int):
+    """
+    Appends newly stored reps to the Parquet archive. Only rows the insert just
+    added are passed, so the archive holds each rep once without looking up what
+    it already has. The database is the source of truth, so failures are only logged.
+    """
+    try:
+        training_archive.append(df, user_id)
+    except Exception as e:
+        current_app.logger.error(f"Error archiving training data for user {user_id}: {e}")
+
+
+def training_detail_export_query(atleta_id=None, start=None, end=None, ejercicio=None):
+    """
+    SELECT of the ADR columns of training_details, with the athlete alias
+    joined in, so exporting never loads ORM objects or lazy-loads `atleta`.
+
+    Args:
+        atleta_id (Optional[int]): Only this athlete's reps.
+        start (Optional[datetime]): Only reps with timestamp >= start.
+        end (Optional[datetime]): Only reps with timestamp < end.
+        ejercicio (Optional[str | List[str]]): Only this exercise ('Ejer.'), or these exercises.
+    """
+    columns = [
+        User.alias.label(col) if col == 'Atleta' else getattr(TrainingDetail, TRAINING_DETAIL_COLUMNS[col]).label(col)
+        for col in ADR_COLUMN_ORDER
+    ]
+    query = sa.select(*columns).outerjoin(User, TrainingDetail.atleta_id == User.id)
+    if atleta_id is not None:
+        query = query.where(TrainingDetail.atleta_id == atleta_id)
+    if start is not None:
+        query = query.where(TrainingDetail.timestamp >= start)
+    if end is not None:
+        query = query.where(TrainingDetail.timestamp < end)
+    if isinstance(ejercicio, str):
+        query = query.where(TrainingDetail.ejercicio == ejercicio)
+    elif ejercicio is not None:
+        query = query.where(TrainingDetail.ejercicio.in_(list(ejercicio)))
+    return query.order_by(TrainingDetail.id)
+
+
+def export_training_details(atleta_id=None, start=None, end=None, ejercicio=None, batch_size=None):
+    """
+    Exports training_details to a DataFrame with the `preprocess_adr_data`
+    columns, in a single query.
+
+    Rows are streamed `batch_size` at a time (TRAINING_EXPORT_BATCH_SIZE by
+    default) with yield_per and appended column by column, so no per-row dict
+    or ORM object is built. See `training_detail_export_query` for the filters.
+
+    Returns:
+        pd.DataFrame: One row per rep, ordered by insertion.
+    """
+    batch_size = batch_size or current_app.config['TRAINING_EXPORT_BATCH_SIZE']
+    query = training_detail_export_query(atleta_id, start, end, ejercicio).execution_options(yield_per=batch_size)
+
+    columns = [[] for _ in ADR_COLUMN_ORDER]
+    result = db.session.execute(query)
+    for rows in result.partitions():
+        for values, batch in zip(columns, zip(*rows)):
+            values.extend(batch)
+
+    return pd.DataFrame(dict(zip(ADR_COLUMN_ORDER, columns)))
+
+
+def report_training_analytics(user_id: int, ejercicios=None):
+    """
+    Load-velocity profiles, estimated 1RM and velocity loss for the athlete
+    after an upload. Failures are only logged.
+
+    Only the last VBT_ANALYTICS_WINDOW_DAYS of the uploaded exercises are read,
+    in one query on the (atleta_id, ejercicio, timestamp) index, so the cost
+    per upload stays bounded as the athlete's history grows.
+
+    Args:
+        user_id (int): The athlete.
+        ejercicios (Optional[List[str]]): The exercises of the upload, all by default.
+
+    Returns:
+        Optional[dict]: The `vbt_report`, or None if disabled or it failed.
+    """
+    if not current_app.config['VBT_ANALYTICS_ENABLED']:
+        return None
+    start = datetime.now() - timedelta(days=current_app.config['VBT_ANALYTICS_WINDOW_DAYS'])
+    try:
+        report = vbt_report(export_training_details(atleta_id=user_id, start=start, ejercicio=ejercicios))
+    except Exception as e:
+        current_app.logger.error(f"Error computing training analytics for user {user_id}: {e}")
+        return None
+    current_app.logger.info(f"Training analytics for user {user_id}: {report}")
+    return report
+
+
+def get_training_detail_to_dataframe():
+    return export_training_details()
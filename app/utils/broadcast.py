@@ -0,0 +1,199 @@
+"""
+Concurrent broadcast of WhatsApp messages to many recipients with aiohttp.
+
+One `ClientSession` (one keep-alive connection pool) is shared by every send,
+a semaphore bounds how many requests are in flight and the phone number's
+token bucket, shared with the outbound dispatcher, keeps the overall rate
+inside its throughput tier. Each recipient gets its own `BroadcastResult`, a
+failed send never aborts the rest.
+"""
+import asyncio
+import json
+import logging
+import random
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+import aiohttp
+from flask import current_app
+
+from app.services.outbound import TokenBucket
+
+# Errors raised before the request reached Graph, so it can't have been delivered
+CONNECT_ERRORS = (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError)
+
+
+@dataclass
+class BroadcastResult:
+    recipient: str
+    ok: bool
+    status: Optional[int] = None
+    message_id: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+
+def text_message(recipient: str, body: str) -> dict:
+    return {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": recipient,
+        "type": "text",
+        "text": {"preview_url": False, "body": body},
+    }
+
+
+def template_message(recipient: str, name: str, language: str = "en_US", components: Optional[list] = None) -> dict:
+    template = {"name": name, "language": {"code": language}}
+    if components:
+        template["components"] = components
+    return {
+        "messaging_product": "whatsapp",
+        "to": recipient,
+        "type": "template",
+        "template": template,
+    }
+
+
+class Broadcaster:
+    """
+    Sends message payloads concurrently. Use as an async context manager so
+    the session is opened once and closed at the end:
+
+        async with Broadcaster.from_config(current_app.config) as broadcaster:
+            results = await broadcaster.broadcast(payloads)
+
+    Args:
+        url (str): The messages endpoint.
+        access_token (str): Graph API token.
+        concurrency (int): Maximum requests in flight.
+        rate_per_second (Optional[float]): Token bucket rate, None for no rate limit.
+        timeout (float): Per request timeout in seconds.
+        max_retries (int): Retries on 429 and connection errors.
+        backoff_factor (float): Base of the jittered exponential backoff between retries.
+        bucket (Optional[TokenBucket]): An existing token bucket to share, instead of one at `rate_per_second`.
+    """
+
+    def __init__(self, url: str, access_token: str, concurrency: int = 32, rate_per_second: Optional[float] = None,
+                 timeout: float = 10, max_retries: int = 3, backoff_factor: float = 0.5,
+                 bucket: Optional[TokenBucket] = None):
+        self.url = url
+        self.access_token = access_token
+        self.concurrency = concurrency
+        self.bucket = bucket or (TokenBucket(rate_per_second) if rate_per_second else None)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.session = None
+        self._semaphore = None
+
+    @classmethod
+    def from_config(cls, config, bucket: Optional[TokenBucket] = None) -> 'Broadcaster':
+        """Broadcaster for the app's phone number, on the outbound dispatcher's token bucket by default."""
+        from app import outbound
+
+        base_url = config['GRAPH_API_BASE_URL'].rstrip('/')
+        return cls(
+            url=f"{base_url}/{config['VERSION']}/{config['PHONE_NUMBER_ID']}/messages",
+            access_token=config['ACCESS_TOKEN'],
+            concurrency=config['BROADCAST_CONCURRENCY'],
+            timeout=config['GRAPH_API_TIMEOUT'],
+            max_retries=config['GRAPH_API_MAX_RETRIES'],
+            backoff_factor=config['GRAPH_API_BACKOFF_FACTOR'],
+            bucket=bucket or outbound.bucket,
+        )
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            headers={"Authorization": f"Bearer {self.access_token}", "Content-Type": "application/json"},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+        self.session = None
+
+    async def _take_token(self):
+        while self.bucket is not None:
+            wait = self.bucket.try_acquire()
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def send(self, payload: dict) -> BroadcastResult:
+        """
+        Sends one payload. Only rate limits (429, honouring Retry-After) and
+        connections that were never established are retried: after a 5xx or a
+        timeout Graph may already have delivered the message.
+        """
+        result = BroadcastResult(recipient=payload.get("to"), ok=False)
+        data = json.dumps(payload)
+        async with self._semaphore:
+            while True:
+                await self._take_token()
+                result.attempts += 1
+                retry_after = None
+                try:
+                    async with self.session.post(self.url, data=data) as response:
+                        result.status = response.status
+                        retry_after = response.headers.get("Retry-After")
+                        body = await response.text()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    result.status, body = None, None
+                    result.error = f"{type(e).__name__}: {e}"
+                    retryable = isinstance(e, CONNECT_ERRORS)
+                else:
+                    if response.status < 400:
+                        result.ok = True
+                        result.error = None
+                        try:
+                            result.message_id = json.loads(body)["messages"][0]["id"]
+                        except (ValueError, KeyError, IndexError, TypeError):
+                            pass
+                        return result
+                    result.error = body
+                    retryable = result.status == 429
+
+                if not retryable or result.attempts > self.max_retries:
+                    return result
+                if retry_after and retry_after.isdigit():
+                    delay = float(retry_after)
+                else:
+                    delay = self.backoff_factor * 2 ** (result.attempts - 1)
+                await asyncio.sleep(delay * random.uniform(1, 1.25))
+
+    async def broadcast(self, payloads: Iterable[dict]) -> List[BroadcastResult]:
+        """Sends every payload concurrently. Results are in the same order as `payloads`."""
+        return await asyncio.gather(*(self.send(payload) for payload in payloads))
+
+
+async def broadcast_messages(payloads: Iterable[dict], config=None) -> List[BroadcastResult]:
+    """Async broadcast with the app's Graph API settings (the current app's config by default)."""
+    config = config if config is not None else current_app.config
+    async with Broadcaster.from_config(config) as broadcaster:
+        results = await broadcaster.broadcast(payloads)
+
+    failed = sum(not result.ok for result in results)
+    if failed:
+        logging.error(f"Broadcast finished with {failed} of {len(results)} messages failed")
+    return results
+
+
+def broadcast_text(recipients: Iterable[str], body: str) -> List[BroadcastResult]:
+    """
+    Sends the same text to every recipient, e.g. a training summary to a whole
+    squad, and blocks until all sends finished. Runs its own event loop, so it
+    can be called from request handlers and worker threads.
+    """
+    payloads = [text_message(recipient, body) for recipient in recipients]
+    return asyncio.run(broadcast_messages(payloads, current_app.config))
+
+
+def broadcast_template(recipients: Iterable[str], name: str, language: str = "en_US",
+                       components: Optional[list] = None) -> List[BroadcastResult]:
+    """`broadcast_text` for an approved message template."""
+    payloads = [template_message(recipient, name, language, components) for recipient in recipients]
+    return asyncio.run(broadcast_messages(payloads, current_app.config))
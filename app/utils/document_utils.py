@@ -1,9 +1,18 @@
 import logging
+import base64
+import hashlib
+import os
+import tempfile
 from flask import Blueprint, request, jsonify, current_app
 import requests
 from typing import Optional
 from pathlib import Path
-from .adr_processor import preprocess_adr_data
+from .path_utils import get_download_data_path
+from app import graph_client, media_store, adr_pool
+
+
+class MediaDownloadError(Exception):
+    """A webhook's media could not be fetched. Raised so the queue retries the webhook."""
 
 def get_media_url(media_id: str) -> Optional[str]:
     """
@@ -15,15 +24,8 @@ def get_media_url(media_id: str) -> Optional[str]:
     Returns:
         Optional[str]: The URL of the media if successful, else None.
     """
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {current_app.config['ACCESS_TOKEN']}",
-    }
-
-    url = f"https://graph.facebook.com/{current_app.config['VERSION']}/{media_id}/"
-
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = graph_client.get(f"{media_id}/", endpoint="media")
         response.raise_for_status()  # Raises HTTPError for bad responses
     except requests.Timeout:
         logging.error(f"Timeout occurred while fetching media URL for media_id: {media_id}")
@@ -52,47 +54,125 @@ def get_media_url(media_id: str) -> Optional[str]:
     return media_url
 
 
-def download_document_from_webhook(webhook):
-    headers = {
-        "Content-type": "application/json",
-        "Authorization": f"Bearer {current_app.config['ACCESS_TOKEN']}",
-    }
+def sha256_matches(digest: bytes, expected: str) -> bool:
+    """WhatsApp reports media hashes either hex or base64 encoded, accept both."""
+    return expected.lower() == digest.hex() or expected == base64.b64encode(digest).decode("ascii")
 
-    document = webhook.get_document_of_document_message()
-    logging.info(f'Document message {document.filename} received. Will attempt to extract media_url')
-    media_url = get_media_url(document.id)
-    logging.info(f'Media URL: {media_url}')
 
-    # Make the GET request
-    response = requests.get(media_url, headers=headers)
-    output_file = document.filename
-
-    # Define the path to save the file (e.g., app/data/)
-    flask_path = Path(current_app.root_path) / 'data'
-    flask_path.mkdir(parents=True, exist_ok=True)  # Ensure the directory exists
-
-    # Complete file path
-    output_path = flask_path / output_file
-    # Check if the request was successful
-    if response.status_code == 200:
-        # Write the content to the file
-        with open(output_path, 'wb') as file:
-            file.write(response.content)
-        logging.info(f"Media downloaded successfully and saved to '{output_path}'.")
-        return output_path
-    else:
-        logging.error(f"Failed to download media. Status code: {response.status_code}")
-        print(f"Response message: {response.text}")
+def stream_media_to_file(media_url: str, output_path: Path, expected_sha256: Optional[str] = None,
+                         max_bytes: Optional[int] = None) -> Optional[Path]:
+    """
+    Streams a media download to `output_path` without holding it in memory.
+
+    Chunks go to a temporary file next to `output_path` while the sha256 is
+    computed incrementally; the file is only renamed into place (atomically) once
+    the whole body arrived, stayed under `max_bytes` and matched `expected_sha256`.
 
+    Args:
+        media_url (str): The URL returned by `get_media_url`.
+        output_path (Path): Final location of the file.
+        expected_sha256 (Optional[str]): Hash from the webhook, hex or base64. Not checked if None.
+        max_bytes (Optional[int]): Size cutoff. The download is aborted once it is exceeded.
+
+    Returns:
+        Optional[Path]: `output_path` if successful, else None.
+    """
+    chunk_size = current_app.config['MEDIA_DOWNLOAD_CHUNK_SIZE']
+    try:
+        response = graph_client.get(media_url, endpoint="media_download", stream=True)
+    except requests.RequestException as req_err:
+        logging.error(f"Request exception occurred while downloading media: {req_err}")
         return None
 
+    with response:
+        if response.status_code != 200:
+            logging.error(f"Failed to download media. Status code: {response.status_code}")
+            return None
+
+        content_length = int(response.headers.get("Content-Length") or 0)
+        if max_bytes and content_length > max_bytes:
+            logging.error(f"Media is {content_length} bytes, over the {max_bytes} bytes limit")
+            return None
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)  # Ensure the directory exists
+        digest = hashlib.sha256()
+        size = 0
+        tmp = tempfile.NamedTemporaryFile(dir=output_path.parent, prefix=".", suffix=".part", delete=False)
+        tmp_path = Path(tmp.name)
+        try:
+            with tmp:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    size += len(chunk)
+                    if max_bytes and size > max_bytes:
+                        raise ValueError(f"Media exceeded the {max_bytes} bytes limit")
+                    digest.update(chunk)
+                    tmp.write(chunk)
+
+            if expected_sha256 and not sha256_matches(digest.digest(), expected_sha256):
+                raise ValueError(f"sha256 mismatch, expected {expected_sha256} got {digest.hexdigest()}")
+
+            os.replace(tmp_path, output_path)
+        except (ValueError, OSError, requests.RequestException) as e:
+            logging.error(f"Failed to download media to '{output_path}': {e}")
+            tmp_path.unlink(missing_ok=True)
+            return None
+
+    logging.info(f"Media downloaded successfully ({size} bytes) and saved to '{output_path}'.")
+    return output_path
+
+
+def download_document_from_webhook(event) -> Path:
+    """
+    Downloads the document of a webhook event, or reuses the cached copy.
 
-def process_document_webhook(webhook):
-    document_path = download_document_from_webhook(webhook)
-    
-    if 'adr' in document_path.name:
-        adr_dataframe = preprocess_adr_data(document_path)
-        print(adr_dataframe.head())
+    Returns:
+        Path: Where the document is stored.
+
+    Raises:
+        MediaDownloadError: If the media URL or the download failed.
+    """
+    document = event.document
+    cached_path = media_store.get(document.sha256)
+    if cached_path is not None:
+        logging.info(f'Document {document.filename} already downloaded, reusing {cached_path.name}')
+        return cached_path
+
+    logging.info(f'Document message {document.filename} received. Will attempt to extract media_url')
+    media_url = get_media_url(document.id)
+    logging.info(f'Media URL: {media_url}')
+    if media_url is None:
+        raise MediaDownloadError(f"Could not get the media URL of document {document.filename}")
+
+    # Stream straight into the media cache when the hash can be used as a key,
+    # otherwise keep only the file name, the sender controls it
+    output_path = media_store.path_for(document.sha256, document.filename)
+    if output_path is None:
+        output_path = get_download_data_path() / Path(document.filename).name
+
+    document_path = stream_media_to_file(
+        media_url,
+        output_path,
+        expected_sha256=document.sha256,
+        max_bytes=current_app.config['MEDIA_MAX_BYTES'],
+    )
+    if document_path is None:
+        raise MediaDownloadError(f"Could not download document {document.filename}")
+    if document_path.parent == media_store.root:
+        media_store.add(document_path)
+
+    return document_path
+
+
+def process_document_webhook(event):
+    # Raises MediaDownloadError, so the webhook is retried instead of acknowledged
+    document_path = download_document_from_webhook(event)
+
+    # Cached files are named after their hash, the original name is in the webhook
+    if 'adr' in event.document.filename:
+        # Preprocessed in the ADR process pool, written in upload order per sender
+        inserted = adr_pool.ingest(document_path, key=event.message.from_)
+        logging.info(f"{inserted} new reps stored from {event.document.filename}")
+        return inserted
 
     else:
         print("This is not a valid adrcsv!")
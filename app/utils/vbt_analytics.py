@@ -0,0 +1,167 @@
+"""
+Velocity based training analytics on ADR reps.
+
+Everything is computed for many groups (athletes, exercises, sets) at once:
+rows are mapped to integer group codes and the per-group sums come from
+np.bincount / ufunc.reduceat, so there is no Python loop over groups.
+Inputs use the ADR column names, as returned by `preprocess_adr_data` and
+`export_training_details`.
+"""
+import numpy as np
+import pandas as pd
+
+# Mean propulsive velocity (m/s) at 1RM per exercise, used to read the 1RM off the load-velocity line
+MINIMUM_VELOCITY_THRESHOLDS = {
+    'Sentadilla': 0.30,
+    'Press Banca': 0.17,
+    'Peso Muerto': 0.15,
+    'Press Militar': 0.19,
+}
+DEFAULT_MINIMUM_VELOCITY = 0.30
+
+
+def group_codes(df, by):
+    """
+    Integer code per row for the groups of `by` (in order of first appearance),
+    and the group keys as an index.
+
+    Each column is factorized on its own and the codes combined arithmetically,
+    which is much faster than factorizing a MultiIndex of strings.
+    """
+    by = list(by)
+    combined = np.zeros(len(df), dtype=np.int64)
+    for col in by:
+        col_codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+        combined = combined * max(len(uniques), 1) + col_codes
+    codes, uniques = pd.factorize(combined)
+
+    # Row where every group first appears, to read its key values back
+    first = np.empty(len(uniques), dtype=np.int64)
+    first[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+    if len(by) == 1:
+        return codes, pd.Index(df[by[0]].to_numpy()[first], name=by[0])
+    return codes, pd.MultiIndex.from_arrays([df[col].to_numpy()[first] for col in by], names=by)
+
+
+def load_velocity_profiles(df, by=('Atleta', 'Ejer.'), load='KG', velocity='VMP', thresholds=None, min_points=3):
+    """
+    Fits velocity = intercept + slope * load per group by least squares and
+    estimates the 1RM where the line reaches the exercise's minimum velocity
+    threshold.
+
+    Args:
+        df (pd.DataFrame): Reps, one per row.
+        by (tuple): Group columns, e.g. athlete and exercise.
+        load (str): Load column (kg).
+        velocity (str): Velocity column (m/s), VMP by default.
+        thresholds (Optional[dict]): Exercise -> minimum velocity threshold, MINIMUM_VELOCITY_THRESHOLDS by default.
+        min_points (int): Groups with fewer reps get NaN estimates.
+
+    Returns:
+        pd.DataFrame: One row per group with n, slope, intercept, r2, mvt and e1rm.
+    """
+    thresholds = MINIMUM_VELOCITY_THRESHOLDS if thresholds is None else thresholds
+    df = df[[*by, load, velocity]]
+    df = df[df[load].notna() & df[velocity].notna()]
+    codes, keys = group_codes(df, by)
+    groups = len(keys)
+    x = df[load].to_numpy(dtype=float)
+    y = df[velocity].to_numpy(dtype=float)
+
+    n = np.bincount(codes, minlength=groups).astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.bincount(codes, weights=x, minlength=groups) / n
+        mean_y = np.bincount(codes, weights=y, minlength=groups) / n
+        # Centred sums (second pass) keep the fit stable for large loads and many reps
+        dx = x - mean_x[codes]
+        dy = y - mean_y[codes]
+        sxx = np.bincount(codes, weights=dx * dx, minlength=groups)
+        sxy = np.bincount(codes, weights=dx * dy, minlength=groups)
+        syy = np.bincount(codes, weights=dy * dy, minlength=groups)
+
+        valid = (n >= min_points) & (sxx > 0)
+        slope = np.where(valid, sxy / sxx, np.nan)
+        intercept = mean_y - slope * mean_x
+        r2 = np.where(valid & (syy > 0), sxy * sxy / (sxx * syy), np.nan)
+
+        exercises = keys.get_level_values('Ejer.') if 'Ejer.' in keys.names else None
+        if exercises is None:
+            mvt = np.full(groups, DEFAULT_MINIMUM_VELOCITY)
+        else:
+            mvt = np.array([thresholds.get(exercise, DEFAULT_MINIMUM_VELOCITY) for exercise in exercises], dtype=float)
+        # Only a falling line reaches the threshold at a positive load
+        e1rm = np.where(slope < 0, (mvt - intercept) / slope, np.nan)
+
+    return pd.DataFrame({
+        'n': n.astype(int),
+        'slope': slope,
+        'intercept': intercept,
+        'r2': r2,
+        'mvt': mvt,
+        'e1rm': e1rm,
+    }, index=keys)
+
+
+def velocity_loss(df, by=('Atleta', 'Ejer.', 'Timestamp', 'SERIE'), rep='REP', velocity='VMP'):
+    """
+    Fatigue per set: how much slower the last rep was than the fastest one.
+
+    Args:
+        df (pd.DataFrame): Reps, one per row.
+        by (tuple): Columns identifying a set. An upload's Timestamp separates sessions.
+        rep (str): Rep number column, defines the order inside a set.
+        velocity (str): Velocity column (m/s).
+
+    Returns:
+        pd.DataFrame: One row per set with reps, best, first and last velocity and velocity_loss_pct.
+    """
+    df = df[[*by, rep, velocity]]
+    df = df[df[velocity].notna()]
+    codes, keys = group_codes(df, by)
+    order = np.lexsort((df[rep].to_numpy(), codes))
+    codes = codes[order]
+    v = df[velocity].to_numpy(dtype=float)[order]
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)]
+    best = np.maximum.reduceat(v, starts) if len(v) else np.empty(0)
+    last = v[ends - 1]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        loss = np.where(best > 0, (best - last) / best * 100, np.nan)
+
+    return pd.DataFrame({
+        'reps': ends - starts,
+        'best_velocity': best,
+        'first_velocity': v[starts],
+        'last_velocity': last,
+        'velocity_loss_pct': loss,
+    }, index=keys[codes[starts]])
+
+
+def vbt_report(history) -> dict:
+    """
+    Summary for one athlete's history: the load-velocity profile and estimated
+    1RM per exercise, and the velocity loss of every set in the latest upload.
+
+    Args:
+        history (pd.DataFrame): The athlete's reps, e.g. `export_training_details(atleta_id=...)`.
+
+    Returns:
+        dict: {'profiles': {exercise: {...}}, 'velocity_loss': {exercise: {serie: pct}}}, JSON friendly.
+    """
+    if history.empty:
+        return {'profiles': {}, 'velocity_loss': {}}
+
+    profiles = load_velocity_profiles(history, by=('Ejer.',))
+    latest = history[history['Timestamp'] == history['Timestamp'].max()]
+    losses = velocity_loss(latest, by=('Ejer.', 'SERIE'))
+
+    report = {'profiles': {}, 'velocity_loss': {}}
+    for exercise, row in profiles.iterrows():
+        report['profiles'][exercise] = {
+            key: None if pd.isna(value) else round(float(value), 4) for key, value in row.items()
+        }
+    for (exercise, serie), pct in losses['velocity_loss_pct'].items():
+        report['velocity_loss'].setdefault(exercise, {})[int(serie)] = None if pd.isna(pct) else round(float(pct), 1)
+    return report
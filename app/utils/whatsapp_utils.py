@@ -3,6 +3,8 @@ from flask import Blueprint, request, jsonify, current_app
 import json
 import requests
 from typing import Optional
+from app import graph_client
+from app.services.graph_client import GraphAPIError, is_connect_error
 
 # from app.services.openai_service import generate_response
 import re
@@ -20,29 +22,59 @@ def generate_response(response):
 
 
 def send_message(data):
-    headers = {
-        "Content-type": "application/json",
-        "Authorization": f"Bearer {current_app.config['ACCESS_TOKEN']}",
-    }
+    """
+    Sends a message synchronously. Use `send_message_async` to go through the
+    rate limited outbound dispatcher instead.
 
-    url = f"https://graph.facebook.com/{current_app.config['VERSION']}/{current_app.config['PHONE_NUMBER_ID']}/messages"
+    Args:
+        data (str): The JSON message body.
+
+    Returns:
+        requests.Response: The successful Graph API response.
+
+    Raises:
+        GraphAPIError: If the request timed out, could not connect or got an error status.
+    """
+    headers = {"Content-type": "application/json"}
+    path = f"{current_app.config['PHONE_NUMBER_ID']}/messages"
 
     try:
-        response = requests.post(
-            url, data=data, headers=headers, timeout=10
-        )  # 10 seconds timeout as an example
-        response.raise_for_status()  # Raises an HTTPError if the HTTP request returned an unsuccessful status code
-    except requests.Timeout:
+        response = graph_client.post(
+            path, endpoint="messages", data=data, headers=headers
+        )  # pooled session, timeout and retries come from the app config
+    except requests.Timeout as e:
         logging.error("Timeout occurred while sending message")
-        return jsonify({"status": "error", "message": "Request timed out"}), 408
+        raise GraphAPIError("Request timed out", connect_failed=is_connect_error(e)) from e
     except (
         requests.RequestException
     ) as e:  # This will catch any general request exception
         logging.error(f"Request failed due to: {e}")
-        return jsonify({"status": "error", "message": "Failed to send message"}), 500
-    else:
-        # Process the response as normal
-        log_http_response(response)
-        return response
+        raise GraphAPIError(f"Failed to send message: {e}", connect_failed=is_connect_error(e)) from e
+
+    if response.status_code >= 400:
+        logging.error(f"Failed to send message. Status code: {response.status_code}")
+        retry_after = response.headers.get("Retry-After")
+        raise GraphAPIError(
+            f"Failed to send message, Graph API answered {response.status_code}",
+            status_code=response.status_code,
+            body=response.text,
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+        )
+
+    # Process the response as normal
+    log_http_response(response)
+    return response
+
+
+def send_message_async(data):
+    """
+    Queues a message on the outbound dispatcher and returns straight away.
+
+    Returns:
+        concurrent.futures.Future: Resolves to the Graph API response JSON, or raises GraphAPIError.
+    """
+    from app import outbound
+
+    return outbound.submit(data)
 
 
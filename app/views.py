@@ -1,10 +1,15 @@
 import logging
 import json
+from concurrent.futures import Future
+from functools import partial
 from pydantic import ValidationError
 from flask import Blueprint, request, jsonify, current_app
 from .utils.whatsapp_security import verify
-from .decorators.security import signature_required
+from .decorators.security import signature_required, metrics_token_required
 from .utils.document_utils import process_document_webhook
+from .services.webhook_queue import QueueFullError
+from .services.dedup import event_key
+from app import webhook_queue, webhook_dedup, graph_client, media_store, adr_pool, session_registry, user_alias_cache, outbound, thread_store, conversation_mailbox
 webhook_blueprint = Blueprint("webhook", __name__)
 
 from app.models.payload_models import *
@@ -12,40 +17,114 @@ from app.models.payload_models import *
 
 
 def process_raw_payload(request):
-    body = request.get_json()
-    json_str_body = json.dumps(body)
-
-    webhook = parse_webhook_payload(json_str_body)
+    # Validate the raw bytes directly, the same bytes the signature was checked on
+    webhook = parse_webhook_payload(request.get_data())
     logging.info(f'Webhook received: {webhook}')
     return webhook
 
 
-def status_webhook_handler(webhook):
-    phone,status = webhook.get_phone_status()
+def status_webhook_handler(event):
+    phone = event.metadata.display_phone_number
+    status = event.status.status
     print(f'This is the status: {phone},{status}')
 
     return phone,status
 
 
-def text_webhook_handler(webhook):
-    body = webhook.get_body_of_text_message()
+def text_webhook_handler(event):
+    body = event.body
     print(f'This is the body of the message:  {body}')
+    if current_app.config['ASSISTANT_REPLIES_ENABLED'] and event.contact is not None:
+        # Quick successive messages of a conversation are answered together. The
+        # event is only handled once the reply run finished, see dynamic_webhook_handler
+        return conversation_mailbox.post(event.contact.wa_id, body, event.contact.profile.name)
     return body
 
 
+EVENT_HANDLERS = {'status':status_webhook_handler,'text':text_webhook_handler,'document':process_document_webhook}
 
-def dynamic_webhook_handler(webhook):
-
-    function_type_dict = {'status':status_webhook_handler,'text':text_webhook_handler,'document':process_document_webhook}
-    webhook_type = webhook.get_type_of_webhook()
 
-    #Check that we are dealing with managed webhooks
-    if webhook_type not in function_type_dict.keys():
+def dispatch_event(event):
+    #Check that we are dealing with managed events
+    if event.type not in EVENT_HANDLERS:
         raise Exception("This payload model has not been defined yet")
 
-    webhook_func = function_type_dict[webhook_type]
+    return EVENT_HANDLERS[event.type](event)
+
+
+def finish_deferred_event(app, key, future):
+    """Completes the dedup key of an event handled in the background, or releases it if that failed or was dropped."""
+    with app.app_context():
+        if not future.cancelled() and future.exception() is None:
+            webhook_dedup.complete(key)
+        else:
+            webhook_dedup.release(key)
+
+
+def dynamic_webhook_handler(webhook):
+    """
+    Fans every event of a (possibly batched) webhook out to its handler in one pass.
+    Events that were already handled (Meta redeliveries) are skipped.
+    A failing event does not stop the rest of the batch; the failures are raised
+    together at the end so the queue can retry the webhook.
+
+    A handler that returns a Future (a text posted to the assistant mailbox)
+    finishes later: its event stays claimed until the Future is done, so a
+    message dropped before its reply ran is not skipped when redelivered.
+    """
+    dedup_enabled = current_app.config['DEDUP_ENABLED']
+    results = []
+    failures = []
+    for event in webhook.iter_events():
+        key = event_key(event)
+        if dedup_enabled and not webhook_dedup.claim(key):
+            logging.info(f"Skipping duplicate {event.type} event {key}")
+            continue
+
+        try:
+            result = dispatch_event(event)
+        except Exception as e:
+            logging.exception(f"Failed to handle {event.type} event")
+            failures.append(e)
+            if dedup_enabled:
+                webhook_dedup.release(key)
+        else:
+            results.append(result)
+            if dedup_enabled:
+                if isinstance(result, Future):
+                    result.add_done_callback(partial(finish_deferred_event, current_app._get_current_object(), key))
+                else:
+                    webhook_dedup.complete(key)
+
+    if failures:
+        raise Exception(f"{len(failures)} of {len(failures) + len(results)} webhook events failed") from failures[0]
+
+    return results
+
+
+def handle_webhook_body(body: bytes):
+    """
+    Parses and dispatches a raw webhook body. Used by the ingestion queue workers,
+    which run outside of a request.
+    """
+    webhook = parse_webhook_payload(body)
+    if webhook is None:
+        # Not a payload we understand, retrying it would not help
+        logging.error("Dropping queued webhook that is not a WhatsApp API event")
+        return None
+
+    return dynamic_webhook_handler(webhook)
+
+
+def enqueue_webhook():
+    try:
+        webhook_queue.enqueue(request.get_data())
+    except QueueFullError as e:
+        logging.error(f"Webhook rejected: {e}")
+        return jsonify({"status": "error", "message": "Busy, try again later"}), 503
+
+    return jsonify({'status':'ok'}),200
 
-    return webhook_func(webhook)
 
 def new_handle_message():
     try:
@@ -77,6 +156,27 @@ def webhook_get():
 @webhook_blueprint.route("/webhook", methods=["POST"])
 @signature_required
 def webhook_post():
+    if current_app.config['WEBHOOK_QUEUE_ENABLED']:
+        return enqueue_webhook()
     return new_handle_message()
 
 
+@webhook_blueprint.route("/metrics", methods=["GET"])
+@metrics_token_required
+def metrics():
+    data = {}
+    if current_app.config['WEBHOOK_QUEUE_ENABLED']:
+        data['webhook_queue'] = webhook_queue.metrics()
+    if current_app.config['DEDUP_ENABLED']:
+        data['dedup'] = webhook_dedup.metrics()
+    data['graph_api'] = graph_client.metrics()
+    data['media_cache'] = media_store.metrics()
+    data['adr_pool'] = adr_pool.metrics()
+    data['training_sessions'] = session_registry.metrics()
+    data['user_aliases'] = user_alias_cache.metrics()
+    data['outbound'] = outbound.metrics()
+    data['assistant_threads'] = thread_store.metrics()
+    data['conversations'] = conversation_mailbox.metrics()
+    return jsonify(data), 200
+
+
@@ -0,0 +1,92 @@
+"""
+Peak RSS of ADR preprocessing: the original copy-per-step version versus the
+in-place stage pipeline, on a synthetic 500k-row export.
+
+Each variant runs in its own subprocess so the peaks do not mask each other.
+
+Run from the repository root:
+    python -m benchmarks.bench_adr_memory [rows]
+"""
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+VARIANTS = ("legacy", "pipeline")
+
+
+def legacy_preprocess(path):
+    import pandas as pd
+    from app.utils.adr_processor import (
+        ADR_COLUMNS_TO_HASH, ADR_COLUMN_TYPES, add_hash_ids, add_timestamps,
+        change_columns_type, reorder_columns, split_series_column,
+    )
+
+    new_data = pd.read_csv(path)
+    new_data_copy = new_data.copy()
+    new_data_copy = new_data.drop(columns="R")
+    new_data_copy = split_series_column(new_data_copy)
+    new_data_copy = add_hash_ids(new_data_copy, ADR_COLUMNS_TO_HASH)
+    new_data_copy = change_columns_type(new_data_copy, list(ADR_COLUMN_TYPES), list(ADR_COLUMN_TYPES.values()))
+    new_data_copy = add_timestamps(new_data_copy)
+    return reorder_columns(new_data_copy)
+
+
+def peak_rss_mb() -> float:
+    """VmHWM, the peak resident set size since the last `reset_peak_rss`."""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def reset_peak_rss():
+    """Forgets the import-time peak, so only the preprocessing is measured (Linux only)."""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def run_variant(variant: str, path: str):
+    from app.utils.adr_processor import preprocess_adr_data
+
+    reset_peak_rss()
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    df = legacy_preprocess(path) if variant == "legacy" else preprocess_adr_data(path)
+    elapsed = time.perf_counter() - start
+    print(f"{variant} {len(df)} {baseline:.1f} {peak_rss_mb():.1f} {elapsed:.3f}")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+
+    from tests.fixtures.adr import write_adr_csv
+
+    path = Path(tempfile.mkdtemp()) / "adr.csv"
+    write_adr_csv(path, rows)
+    print(f"{rows} rows, {path.stat().st_size / 2**20:.1f} MB on disk")
+
+    print(f"{'variant':>10}{'rows':>10}{'base MB':>10}{'peak MB':>10}{'delta MB':>10}{'s':>8}")
+    for variant in VARIANTS:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_adr_memory", "--run", variant, str(path)],
+            check=True, capture_output=True, text=True,
+        ).stdout.split()
+        name, n, base, peak, elapsed = output[0], int(output[1]), float(output[2]), float(output[3]), float(output[4])
+        print(f"{name:>10}{n:>10}{base:>10.1f}{peak:>10.1f}{peak - base:>10.1f}{elapsed:>8.2f}")
+    path.unlink()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        run_variant(sys.argv[2], sys.argv[3])
+    else:
+        main()
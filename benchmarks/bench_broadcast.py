@@ -0,0 +1,76 @@
+"""
+Blocking one-by-one sends versus the aiohttp broadcast, against a local mock
+messages endpoint that answers after a fixed latency (like graph.facebook.com
+would).
+
+Run from the repository root:
+    python -m benchmarks.bench_broadcast [recipients] [latency_ms] [concurrency]
+"""
+import asyncio
+import json
+import sys
+import threading
+import time
+
+import requests
+from aiohttp import web
+
+from app.utils.broadcast import Broadcaster, text_message
+
+
+def start_mock_endpoint(latency: float) -> str:
+    counter = {"n": 0}
+
+    async def messages(request):
+        await request.read()
+        await asyncio.sleep(latency)
+        counter["n"] += 1
+        return web.json_response({"messages": [{"id": f"wamid.{counter['n']}"}]})
+
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_post("/v21.0/phone/messages", messages)
+    runner = web.AppRunner(app, access_log=None)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}/v21.0/phone/messages"
+
+
+def sequential(url, payloads):
+    with requests.Session() as session:
+        for payload in payloads:
+            session.post(url, data=json.dumps(payload), headers={"Content-Type": "application/json"}, timeout=10).raise_for_status()
+
+
+async def concurrent(url, payloads, concurrency):
+    async with Broadcaster(url, "token", concurrency=concurrency) as broadcaster:
+        results = await broadcaster.broadcast(payloads)
+    assert all(result.ok for result in results)
+
+
+def main():
+    recipients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 100) / 1000
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+    url = start_mock_endpoint(latency)
+    payloads = [text_message(f"1555{i:07d}", "Training summary") for i in range(recipients)]
+
+    start = time.perf_counter()
+    sequential(url, payloads)
+    sequential_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    asyncio.run(concurrent(url, payloads, concurrency))
+    broadcast_s = time.perf_counter() - start
+
+    print(f"{recipients} recipients, {latency * 1000:.0f} ms endpoint latency, concurrency {concurrency}")
+    print(f"{'sequential':>12}: {sequential_s:7.2f}s {recipients / sequential_s:9.1f} msg/s")
+    print(f"{'broadcast':>12}: {broadcast_s:7.2f}s {recipients / broadcast_s:9.1f} msg/s ({sequential_s / broadcast_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
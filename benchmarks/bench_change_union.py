@@ -0,0 +1,87 @@
+"""
+Validation cost of the Change union with and without the callable discriminator,
+over a synthetic corpus of webhooks mixing statuses, text and documents.
+
+Run from the repository root:
+    python -m benchmarks.bench_change_union [corpus_size]
+"""
+import json
+import random
+import sys
+import time
+from typing import List
+
+from pydantic import BaseModel
+
+from app.models.payload_models import Change, WebhookPayload
+from tests.fixtures.payloads import (
+    VALID_STATUS_UPDATE_PAYLOAD,
+    VALID_TEXT_MESSAGE_PAYLOAD,
+    VALID_DOCUMENT_MESSAGE_PAYLOAD,
+)
+
+# Status webhooks are most of the traffic
+MIX = (("status", VALID_STATUS_UPDATE_PAYLOAD, 0.7), ("text", VALID_TEXT_MESSAGE_PAYLOAD, 0.2), ("document", VALID_DOCUMENT_MESSAGE_PAYLOAD, 0.1))
+
+
+class LegacyEntry(BaseModel):
+    id: str
+    changes: List[Change]
+
+
+class LegacyWebhookPayload(BaseModel):
+    object: str
+    entry: List[LegacyEntry]
+
+
+def build_corpus(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    templates = {name: json.loads(payload) for name, payload, _ in MIX}
+    kinds = rng.choices([name for name, _, _ in MIX], weights=[weight for _, _, weight in MIX], k=size)
+
+    corpus = []
+    for i, kind in enumerate(kinds):
+        payload = templates[kind]
+        value = payload["entry"][0]["changes"][0]["value"]
+        if kind == "status":
+            value["statuses"][0]["id"] = f"wamid.status.{i}"
+        else:
+            value["messages"][0]["id"] = f"wamid.message.{i}"
+        corpus.append((kind, json.dumps(payload).encode("utf-8")))
+    return corpus
+
+
+def run(model, corpus):
+    timings = {}
+    for kind, raw in corpus:
+        start = time.perf_counter()
+        model.model_validate_json(raw)
+        timings.setdefault(kind, []).append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    corpus = build_corpus(size)
+
+    results = {}
+    for label, model in (("plain union", LegacyWebhookPayload), ("discriminated", WebhookPayload)):
+        run(model, corpus[:1000])  # warm up
+        results[label] = run(model, corpus)
+
+    print(f"corpus: {size} webhooks")
+    print(f"{'type':<10}{'count':>8}{'plain us':>12}{'discr. us':>12}{'speedup':>10}")
+    for kind in ("status", "text", "document"):
+        plain = results["plain union"][kind]
+        discriminated = results["discriminated"][kind]
+        plain_us = sum(plain) / len(plain) * 1e6
+        discriminated_us = sum(discriminated) / len(discriminated) * 1e6
+        print(f"{kind:<10}{len(plain):>8}{plain_us:>12.2f}{discriminated_us:>12.2f}{plain_us / discriminated_us:>9.2f}x")
+
+    plain_total = sum(sum(t) for t in results["plain union"].values())
+    discriminated_total = sum(sum(t) for t in results["discriminated"].values())
+    print(f"{'total s':<10}{size:>8}{plain_total:>12.3f}{discriminated_total:>12.3f}{plain_total / discriminated_total:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Row-wise (df.apply) versus column-wise hash_id computation on synthetic ADR
+exports of 1k, 100k and 1M rows.
+
+Run from the repository root:
+    python -m benchmarks.bench_hash_ids [rows ...]
+"""
+import sys
+import time
+
+from app.utils.adr_processor import add_hash_ids, create_hash_id, split_series_column
+from tests.fixtures.adr import make_adr_frame
+
+COLUMNS_TO_HASH = ['SERIE', 'REP', 'KG', 'D', 'VM', 'VMP', 'RM', 'P(W)', 'Perfil', 'Ejer.', 'Atleta', 'Ecuacion']
+
+
+def row_wise(df):
+    return df.apply(lambda row: create_hash_id(row, COLUMNS_TO_HASH), axis=1)
+
+
+def column_wise(df):
+    return add_hash_ids(df, COLUMNS_TO_HASH)["hash_id"]
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 100_000, 1_000_000]
+
+    print(f"{'rows':>10}{'row-wise s':>12}{'column-wise s':>15}{'speedup':>10}{'identical':>11}")
+    for size in sizes:
+        df = split_series_column(make_adr_frame(size).drop(columns="R"))
+
+        start = time.perf_counter()
+        expected = row_wise(df)
+        legacy_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = column_wise(df.copy())
+        vectorized_s = time.perf_counter() - start
+
+        identical = expected.tolist() == actual.tolist()
+        print(f"{size:>10}{legacy_s:>12.3f}{vectorized_s:>15.3f}{legacy_s / vectorized_s:>9.1f}x{str(identical):>11}")
+
+
+if __name__ == "__main__":
+    main()
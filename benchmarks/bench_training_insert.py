@@ -0,0 +1,92 @@
+"""
+Legacy iterrows + session.add ingestion versus the chunked Core bulk insert of
+TrainingDetail rows, against a SQLite file database.
+
+Run from the repository root:
+    python -m benchmarks.bench_training_insert [rows ...]
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import sqlalchemy as sa
+
+from app import create_app, db
+from app.config import Config
+from app.models.models import User, TrainingSession, TrainingDetail
+from app.utils.adr_processor import add_dataframe_to_training_detail, preprocess_adr_data
+from tests.fixtures.adr import write_adr_csv
+
+# Throughput the bulk path is expected to sustain on SQLite
+TARGET_ROWS_PER_SECOND = 20_000
+
+
+def legacy_insert(df, session_id, atleta_id):
+    timestamps = pd.to_datetime(df['Timestamp'], format='%d-%m-%Y %H:%M')
+    for i, (_, row) in enumerate(df.iterrows()):
+        db.session.add(TrainingDetail(
+            session_id=session_id,
+            timestamp=timestamps.iloc[i].to_pydatetime(),
+            serie=int(row['SERIE']),
+            rep=int(row['REP']),
+            kg=row['KG'],
+            d=row['D'],
+            vm=row['VM'],
+            vmp=row['VMP'],
+            rm=row['RM'],
+            p_w=row['P(W)'],
+            perfil=None if pd.isna(row['Perfil']) else row['Perfil'],
+            ejercicio=row['Ejer.'],
+            ecuacion=row['Ecuacion'],
+            atleta_id=atleta_id,
+            hash_id=row['hash_id'],
+        ))
+    db.session.commit()
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    workdir = Path(tempfile.mkdtemp())
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{workdir / 'bench.db'}"
+        WEBHOOK_QUEUE_ENABLED = False
+        DOWNLOAD_DATA_PATH = str(workdir / "data")
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(email="bench@example.com", date_of_birth=datetime(1995, 1, 1), gender="F", height=170.0,
+                    initial_weight=65.0, phone_number="0", alias="atleta1")
+        training_session = TrainingSession(user=user, date=datetime.now(timezone.utc))
+        db.session.add(training_session)
+        db.session.commit()
+        session_id, user_id = training_session.id, user.id
+
+        print(f"{'rows':>10}{'legacy rows/s':>15}{'bulk rows/s':>14}{'speedup':>10}{'target':>9}")
+        for size in sizes:
+            df = preprocess_adr_data(write_adr_csv(workdir / f"adr_{size}.csv", size))
+            db.session.execute(sa.delete(TrainingDetail))
+            db.session.commit()
+
+            start = time.perf_counter()
+            legacy_insert(df, session_id, user_id)
+            legacy_rate = size / (time.perf_counter() - start)
+
+            db.session.execute(sa.delete(TrainingDetail))
+            db.session.commit()
+            db.session.expunge_all()
+
+            start = time.perf_counter()
+            add_dataframe_to_training_detail(df, session_id, atleta_id=user_id)
+            bulk_rate = size / (time.perf_counter() - start)
+
+            verdict = "ok" if bulk_rate >= TARGET_ROWS_PER_SECOND else "MISSED"
+            print(f"{size:>10}{legacy_rate:>15,.0f}{bulk_rate:>14,.0f}{bulk_rate / legacy_rate:>9.1f}x{verdict:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Per-group np.polyfit (groupby.apply) versus the batched load-velocity fit, on
+synthetic reps spread over many athletes.
+
+Run from the repository root:
+    python -m benchmarks.bench_vbt_analytics [rows] [athletes]
+"""
+import sys
+import time
+
+import numpy as np
+
+from app.utils.vbt_analytics import load_velocity_profiles
+from tests.fixtures.adr import make_adr_frame
+
+
+def per_group(df):
+    return df.groupby(["Atleta", "Ejer."]).apply(lambda group: np.polyfit(group["KG"], group["VMP"], 1)[0])
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    athletes = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    df = make_adr_frame(rows, athletes=[f"atleta{i}" for i in range(athletes)])
+
+    start = time.perf_counter()
+    expected = per_group(df)
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    profiles = load_velocity_profiles(df)
+    batched_s = time.perf_counter() - start
+
+    identical = np.allclose(profiles["slope"].reindex(expected.index).to_numpy(), expected.to_numpy())
+    print(f"{rows} reps, {len(profiles)} athlete/exercise groups")
+    print(f"groupby + polyfit: {loop_s:.3f}s, batched: {batched_s:.3f}s ({loop_s / batched_s:.1f}x), same slopes: {identical}")
+
+
+if __name__ == "__main__":
+    main()
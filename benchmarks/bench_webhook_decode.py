@@ -0,0 +1,71 @@
+"""
+Per-request CPU time and allocations of webhook decoding, before and after the
+single-pass raw-bytes path.
+
+Run from the repository root:
+    python -m benchmarks.bench_webhook_decode
+"""
+import hashlib
+import hmac
+import json
+import time
+import tracemalloc
+
+from app.models.payload_models import WebhookPayload, parse_webhook_payload
+from tests.fixtures.payloads import (
+    VALID_STATUS_UPDATE_PAYLOAD,
+    VALID_TEXT_MESSAGE_PAYLOAD,
+    VALID_DOCUMENT_MESSAGE_PAYLOAD,
+)
+
+SECRET = b"benchmark_secret"
+ITERATIONS = 20000
+
+
+def legacy_path(raw: bytes):
+    # signature_required: bytes -> str -> bytes
+    hmac.new(SECRET, msg=raw.decode("utf-8").encode("utf-8"), digestmod=hashlib.sha256).hexdigest()
+    # process_raw_payload: get_json -> dumps -> loads -> WebhookPayload(**dict)
+    body = json.loads(raw)
+    json_str_body = json.dumps(body)
+    return WebhookPayload(**json.loads(json_str_body))
+
+
+def raw_bytes_path(raw: bytes):
+    hmac.new(SECRET, msg=raw, digestmod=hashlib.sha256).hexdigest()
+    return parse_webhook_payload(raw)
+
+
+def measure(func, raw: bytes):
+    func(raw)  # warm up the validators
+
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        func(raw)
+    cpu_us = (time.process_time() - start) / ITERATIONS * 1e6
+
+    # Peak bytes allocated while handling a single request
+    tracemalloc.start()
+    func(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return cpu_us, peak
+
+
+def main():
+    payloads = {
+        "status": VALID_STATUS_UPDATE_PAYLOAD.encode("utf-8"),
+        "text": VALID_TEXT_MESSAGE_PAYLOAD.encode("utf-8"),
+        "document": VALID_DOCUMENT_MESSAGE_PAYLOAD.encode("utf-8"),
+    }
+
+    print(f"{'payload':<10}{'path':<12}{'cpu us/req':>12}{'peak bytes/req':>16}")
+    for name, raw in payloads.items():
+        for label, func in (("legacy", legacy_path), ("raw-bytes", raw_bytes_path)):
+            cpu_us, peak = measure(func, raw)
+            print(f"{name:<10}{label:<12}{cpu_us:>12.1f}{peak:>16}")
+
+
+if __name__ == "__main__":
+    main()
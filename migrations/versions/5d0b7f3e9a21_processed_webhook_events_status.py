@@ -0,0 +1,27 @@
+"""Track in-progress webhook events in processed_webhook_events
+
+Revision ID: 5d0b7f3e9a21
+Revises: b52d8e07c4a1
+Create Date: 2026-10-19 09:12:40.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d0b7f3e9a21'
+down_revision = 'b52d8e07c4a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows were handled under the old claim-then-handle scheme, keep them as done
+    with op.batch_alter_table('processed_webhook_events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=16), server_default='done', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('processed_webhook_events', schema=None) as batch_op:
+        batch_op.drop_column('status')
@@ -0,0 +1,120 @@
+"""Re-hash legacy training_details.hash_id to the md5-occurrence scheme
+
+Revision ID: a71d3c9e5b28
+Revises: c3a8e61f4d02
+Create Date: 2026-10-18 18:20:44.930175
+
+"""
+import hashlib
+import itertools
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a71d3c9e5b28'
+down_revision = 'c3a8e61f4d02'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# Legacy ids are the first 8 hex chars of the md5, plus '-<k>' for repeats
+LEGACY_MAX_LENGTH = 31
+BATCH_SIZE = 5000
+
+
+def numeric_variants(value, integer_column=False):
+    """
+    The ways read_csv may have formatted a stored number before it was hashed:
+    a float column prints 60.0, an all-integer column prints 60, and a missing
+    value prints nan.
+    """
+    if value is None:
+        return ['nan']
+    if integer_column:
+        return [str(int(value)), str(float(value))]
+    value = float(value)
+    return [str(value), str(int(value))] if value.is_integer() else [str(value)]
+
+
+def verified_digest(row):
+    """
+    The full md5 of the rep as it was hashed at upload, or None.
+
+    The hashed strings are rebuilt from the stored columns, trying each way
+    the numbers may have been formatted. A digest only counts if it starts with
+    the stored 8 hex chars, so a row whose strings can't be rebuilt exactly
+    keeps its legacy id instead of getting a wrong one.
+    """
+    prefix = row.hash_id.split('-')[0]
+    text = lambda value: 'nan' if value is None else str(value)
+    choices = [
+        [str(row.serie)], [str(row.rep)],
+        numeric_variants(row.kg), numeric_variants(row.d), numeric_variants(row.vm), numeric_variants(row.vmp),
+        numeric_variants(row.rm, integer_column=True), numeric_variants(row.p_w),
+        [text(row.perfil)], [text(row.ejercicio)], [text(row.alias)], [text(row.ecuacion)],
+    ]
+    for values in itertools.product(*choices):
+        digest = hashlib.md5('_'.join(values).encode()).hexdigest()
+        if digest.startswith(prefix):
+            return digest
+    return None
+
+
+def upgrade():
+    # Rows stored under the 'md5-8' scheme get the id a re-upload now computes:
+    # the full md5, and '-<k>' for the k-th repeat of the same rep in upload
+    # order. Ids already taken by reps stored under the new scheme are skipped.
+    connection = op.get_bind()
+    athletes = connection.execute(sa.text(
+        'SELECT DISTINCT atleta_id FROM training_details '
+        'WHERE hash_id IS NOT NULL AND LENGTH(hash_id) <= :max_length'
+    ), {'max_length': LEGACY_MAX_LENGTH}).scalars().all()
+
+    rehashed = unverified = 0
+    for atleta_id in athletes:
+        taken = set(connection.execute(sa.text(
+            'SELECT hash_id FROM training_details WHERE atleta_id = :atleta_id AND LENGTH(hash_id) > :max_length'
+        ), {'atleta_id': atleta_id, 'max_length': LEGACY_MAX_LENGTH}).scalars())
+        rows = connection.execute(sa.text(
+            """
+            SELECT td.id, td.hash_id, td.serie, td.rep, td.kg, td.d, td.vm, td.vmp, td.rm, td.p_w,
+                   td.perfil, td.ejercicio, u.alias, td.ecuacion
+            FROM training_details td LEFT JOIN users u ON u.id = td.atleta_id
+            WHERE td.atleta_id = :atleta_id AND td.hash_id IS NOT NULL AND LENGTH(td.hash_id) <= :max_length
+            ORDER BY td.id
+            """
+        ), {'atleta_id': atleta_id, 'max_length': LEGACY_MAX_LENGTH}).fetchall()
+
+        occurrences = {}
+        updates = []
+        for row in rows:
+            digest = verified_digest(row)
+            if digest is None:
+                unverified += 1
+                continue
+            occurrence = occurrences.get(digest, 0)
+            hash_id = digest if occurrence == 0 else f'{digest}-{occurrence}'
+            while hash_id in taken:
+                occurrence += 1
+                hash_id = f'{digest}-{occurrence}'
+            occurrences[digest] = occurrence + 1
+            taken.add(hash_id)
+            updates.append({'id': row.id, 'hash_id': hash_id})
+
+        update = sa.text('UPDATE training_details SET hash_id = :hash_id WHERE id = :id')
+        for start in range(0, len(updates), BATCH_SIZE):
+            connection.execute(update, updates[start:start + BATCH_SIZE])
+        rehashed += len(updates)
+
+    # Unverified rows keep their legacy id, uploads still look those up
+    logger.info(f'Re-hashed {rehashed} training_details rows, {unverified} kept their legacy hash_id')
+
+
+def downgrade():
+    # The full ids are kept: shortening them back to 8 chars could collide on the
+    # unique (atleta_id, hash_id) index
+    pass
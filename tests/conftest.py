@@ -5,7 +5,8 @@ from .fixtures.payloads import (
     VALID_STATUS_UPDATE_PAYLOAD,
     VALID_TEXT_MESSAGE_PAYLOAD,
     VALID_DOCUMENT_MESSAGE_PAYLOAD,
-    INVALID_MESSAGE_PAYLOAD
+    INVALID_MESSAGE_PAYLOAD,
+    BATCHED_PAYLOAD
 )
 
 @pytest.fixture
@@ -23,3 +24,73 @@ def valid_document_message_payload():
 @pytest.fixture
 def invalid_message_payload():
     return INVALID_MESSAGE_PAYLOAD
+
+@pytest.fixture
+def batched_payload():
+    return BATCHED_PAYLOAD
+
+
+@pytest.fixture
+def graph_server():
+    from .fixtures.graph_server import FakeGraphServer
+
+    server = FakeGraphServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def app(tmp_path, graph_server):
+    from app import create_app, db, webhook_queue, outbound, conversation_mailbox
+    from app.config import Config
+
+    class TestConfig(Config):
+        TESTING = True
+        APP_SECRET = "test_secret"
+        SQLALCHEMY_DATABASE_URI = "sqlite://"
+        WEBHOOK_QUEUE_PATH = str(tmp_path / "webhook_queue.db")
+        WEBHOOK_WORKERS = 0
+        ACCESS_TOKEN = "test_token"
+        VERSION = "v21.0"
+        PHONE_NUMBER_ID = "phone_number_id_1"
+        GRAPH_API_BASE_URL = graph_server.url
+        GRAPH_API_BACKOFF_FACTOR = 0.01
+        DOWNLOAD_DATA_PATH = str(tmp_path / "data")
+        ADR_POOL_WORKERS = 0
+        OUTBOUND_WORKERS = 0
+        OUTBOUND_DEAD_LETTER_PATH = str(tmp_path / "outbound_dead_letters.db")
+        OUTBOUND_BACKOFF_BASE = 0.01
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    yield app
+    webhook_queue.close()
+    outbound.close()
+    conversation_mailbox.close()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def athlete(app):
+    from datetime import datetime, timezone
+    from app import db
+    from app.models.models import User
+
+    with app.app_context():
+        user = User(
+            email="atleta1@example.com",
+            date_of_birth=datetime(1995, 1, 1, tzinfo=timezone.utc),
+            gender="F",
+            height=170.0,
+            initial_weight=65.0,
+            phone_number="15557654321",
+            alias="atleta1",
+        )
+        db.session.add(user)
+        db.session.commit()
+        return user.id
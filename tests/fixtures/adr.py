@@ -0,0 +1,36 @@
+# tests/fixtures/adr.py
+
+import numpy as np
+import pandas as pd
+
+EXERCISES = ["Sentadilla", "Press Banca", "Peso Muerto", "Press Militar"]
+PERFILES = ["Perfil General", "Perfil Fuerza", None]
+
+
+def make_adr_frame(n_rows: int, athletes=("atleta1",), seed: int = 0) -> pd.DataFrame:
+    """Synthetic ADR export, with the same columns read_csv gives for a real one."""
+    rng = np.random.default_rng(seed)
+    serie = rng.integers(1, 8, n_rows)
+    rep = rng.integers(1, 10, n_rows)
+    kg = rng.choice(np.arange(20, 200, 2.5), n_rows)
+    vmp = np.round(1.6 - kg / 160 + rng.normal(0, 0.05, n_rows), 2)
+
+    return pd.DataFrame({
+        "SERIE": [f"S{s}R{r}" for s, r in zip(serie, rep)],
+        "KG": kg,
+        "D": np.round(rng.uniform(0.3, 0.7, n_rows), 3),
+        "VM": np.round(vmp * 1.15, 2),
+        "VMP": vmp,
+        "RM": rng.integers(50, 100, n_rows),
+        "P(W)": np.round(kg * vmp * 9.81, 1),
+        "Perfil": rng.choice(np.array(PERFILES, dtype=object), n_rows),
+        "Ejer.": rng.choice(EXERCISES, n_rows),
+        "Atleta": rng.choice(list(athletes), n_rows),
+        "Ecuacion": "y = -0.0066x + 1.6",
+        "R": rng.integers(0, 2, n_rows),
+    })
+
+
+def write_adr_csv(path, n_rows: int, **kwargs):
+    make_adr_frame(n_rows, **kwargs).to_csv(path, index=False)
+    return path
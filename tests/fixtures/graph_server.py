@@ -0,0 +1,76 @@
+# tests/fixtures/graph_server.py
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGraphServer:
+    """
+    Local stand-in for graph.facebook.com.
+
+    Responses are scripted per path with `script(path, [(status, body), ...])`;
+    the last scripted response repeats. Unscripted paths answer 200 with a
+    WhatsApp-style message id. Every request is recorded in `requests`.
+    Setting `delay` holds every response back that many seconds.
+    """
+
+    def __init__(self):
+        self.responses = {}
+        self.delay = 0
+        self.requests = []
+        self.client_ports = set()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, payload, headers = server._next_response(self.path)
+                with server._lock:
+                    server.requests.append((self.command, self.path, dict(self.headers), body))
+                    server.client_ports.add(self.client_address[1])
+                if server.delay:
+                    time.sleep(server.delay)
+
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _handle
+            do_POST = _handle
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    def script(self, path, responses):
+        with self._lock:
+            self.responses[path] = [r if len(r) == 3 else (r[0], r[1], {}) for r in responses]
+
+    def _next_response(self, path):
+        with self._lock:
+            scripted = self.responses.get(path)
+            if not scripted:
+                return 200, {"messages": [{"id": f"wamid.{len(self.requests)}"}]}, {}
+            return scripted.pop(0) if len(scripted) > 1 else scripted[0]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -168,3 +168,83 @@ INVALID_MESSAGE_PAYLOAD = json.dumps({
         }
     ]
 })
+
+# Batched Payload: two entries, a message change with two messages and a status change with two statuses
+BATCHED_PAYLOAD = json.dumps({
+    "object": "whatsapp_business_account",
+    "entry": [
+        {
+            "id": "entry_id_5",
+            "changes": [
+                {
+                    "field": "messages",
+                    "value": {
+                        "messaging_product": "whatsapp",
+                        "metadata": {
+                            "display_phone_number": "15550000000",
+                            "phone_number_id": "phone_number_id_1"
+                        },
+                        "contacts": [
+                            {"profile": {"name": "Alice"}, "wa_id": "15551234567"},
+                            {"profile": {"name": "Bob"}, "wa_id": "15557654321"}
+                        ],
+                        "messages": [
+                            {
+                                "from": "15551234567",
+                                "id": "message_id_4",
+                                "timestamp": "1627771715",
+                                "text": {"body": "First message"},
+                                "type": "text"
+                            },
+                            {
+                                "from": "15557654321",
+                                "id": "message_id_5",
+                                "timestamp": "1627771716",
+                                "type": "document",
+                                "document": {
+                                    "filename": "adr_export.csv",
+                                    "mime_type": "text/csv",
+                                    "sha256": "fake_sha256_hash_value",
+                                    "id": "document_id_2"
+                                }
+                            }
+                        ]
+                    }
+                }
+            ]
+        },
+        {
+            "id": "entry_id_6",
+            "changes": [
+                {
+                    "field": "messages",
+                    "value": {
+                        "messaging_product": "whatsapp",
+                        "metadata": {
+                            "display_phone_number": "15550000000",
+                            "phone_number_id": "phone_number_id_1"
+                        },
+                        "statuses": [
+                            {
+                                "id": "status_id_2",
+                                "status": "sent",
+                                "timestamp": "1627773291",
+                                "recipient_id": "15551234567",
+                                "conversation": {"id": "conversation_id_2", "origin": {"type": "service"}},
+                                "pricing": {"billable": True, "pricing_model": "CBP", "category": "service"}
+                            },
+                            {
+                                "id": "status_id_3",
+                                "status": "read",
+                                "timestamp": "1627773292",
+                                "recipient_id": "15551234567",
+                                "conversation": {"id": "conversation_id_2", "origin": {"type": "service"}},
+                                "pricing": {"billable": True, "pricing_model": "CBP", "category": "service"}
+                            }
+                        ]
+                    }
+                }
+            ]
+        }
+    ]
+})
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.adr_pool import OrderedTurns
+from app.utils.adr_processor import frame_from_columns, frame_to_columns, preprocess_adr_data
+from tests.fixtures.adr import write_adr_csv
+
+
+def test_turns_run_in_ticket_order_per_key():
+    turns = OrderedTurns()
+    tickets = [turns.take("alice") for _ in range(4)]
+    other = turns.take("bob")
+    ran = []
+
+    def hold(key, ticket):
+        with turns.turn(key, ticket):
+            ran.append((key, ticket))
+
+    # Started last-ticket-first, still run first-ticket-first
+    threads = [threading.Thread(target=hold, args=("alice", t)) for t in reversed(tickets)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    hold("bob", other)  # a different key does not wait for alice
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert ("bob", 0) in ran
+    assert [ticket for key, ticket in ran if key == "alice"] == [0, 1, 2, 3]
+
+
+def test_failed_turn_still_lets_the_next_one_run():
+    turns = OrderedTurns()
+    first, second = turns.take("alice"), turns.take("alice")
+
+    with pytest.raises(RuntimeError):
+        with turns.turn("alice", first):
+            raise RuntimeError("preprocessing failed")
+
+    done = threading.Event()
+
+    def run_second():
+        with turns.turn("alice", second):
+            done.set()
+
+    threading.Thread(target=run_second).start()
+    assert done.wait(timeout=5)
+
+
+def test_columnar_payload_round_trip(tmp_path):
+    df = preprocess_adr_data(write_adr_csv(tmp_path / "adr.csv", 200))
+    columns = frame_to_columns(df)
+
+    assert isinstance(columns["KG"], np.ndarray)
+    codes, uniques = columns["Ejer."]
+    assert codes.dtype == np.int32 and len(uniques) < 10
+
+    pd.testing.assert_frame_equal(frame_from_columns(columns), df, check_dtype=False)
+
+
+def test_pool_preprocesses_in_worker_processes(app, athlete, tmp_path):
+    import sqlalchemy as sa
+    from app import adr_pool, db
+    from app.models.models import TrainingDetail, TrainingSession
+
+    app.config["ADR_POOL_WORKERS"] = 2
+    adr_pool.init_app(app)
+    first = write_adr_csv(tmp_path / "adr_1.csv", 300, seed=1)
+    second = write_adr_csv(tmp_path / "adr_2.csv", 300, seed=2)
+    try:
+        with app.app_context():
+            inserted = adr_pool.ingest(first, key="15551234567") + adr_pool.ingest(second, key="15551234567")
+            assert inserted == db.session.scalar(sa.select(sa.func.count()).select_from(TrainingDetail))
+            assert adr_pool.ingest(first, key="15551234567") == 0
+            assert db.session.scalar(sa.select(sa.func.count()).select_from(TrainingSession)) == 1
+        assert adr_pool.metrics()["completed"] == 3
+    finally:
+        adr_pool.close()
+
+
+def test_failure_before_the_turn_still_serves_the_ticket(app, tmp_path):
+    from app import adr_pool
+
+    with app.app_context():
+        # The file is gone (e.g. evicted from the media cache) before its size is checked
+        with pytest.raises(FileNotFoundError):
+            adr_pool.ingest(tmp_path / "missing.csv", key="15551234567")
+
+        done = threading.Event()
+
+        def next_upload():
+            with adr_pool._turns.turn("15551234567", adr_pool._turns.take("15551234567")):
+                done.set()
+
+        threading.Thread(target=next_upload, daemon=True).start()
+        assert done.wait(timeout=5)
+    assert adr_pool.metrics()["failed"] == 1
+
+
+def test_broken_pool_is_replaced(app):
+    from concurrent.futures.process import BrokenProcessPool
+    from app import adr_pool
+
+    class BrokenExecutor:
+        def submit(self, fn, *args):
+            raise BrokenProcessPool("a worker died")
+
+        def shutdown(self, **kwargs):
+            pass
+
+    app.config["ADR_POOL_WORKERS"] = 1
+    adr_pool.init_app(app)
+    try:
+        adr_pool._executor = BrokenExecutor()
+        future, executor = adr_pool._submit(sum, [1, 2])
+        assert future.result(timeout=30) == 3
+        assert adr_pool._executor is executor
+    finally:
+        adr_pool.close()
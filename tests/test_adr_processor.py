@@ -0,0 +1,123 @@
+import numpy as np
+
+from app.utils.adr_processor import add_hash_ids, create_hash_id, split_series_column, preprocess_adr_data
+from tests.fixtures.adr import make_adr_frame, write_adr_csv
+
+COLUMNS_TO_HASH = ['SERIE', 'REP', 'KG', 'D', 'VM', 'VMP', 'RM', 'P(W)', 'Perfil', 'Ejer.', 'Atleta', 'Ecuacion']
+
+
+def test_vectorized_hash_ids_match_row_wise_scheme():
+    df = split_series_column(make_adr_frame(500).drop(columns="R"))
+    df.loc[3, "KG"] = np.nan
+    df.loc[4, "VMP"] = 1e16
+    df.loc[5, "D"] = -0.0
+    df.loc[6, "D"] = 0.0
+
+    expected = df.apply(lambda row: create_hash_id(row, COLUMNS_TO_HASH), axis=1).tolist()
+
+    assert add_hash_ids(df, COLUMNS_TO_HASH)["hash_id"].tolist() == expected
+
+
+def test_signed_zero_only_column_keeps_its_sign():
+    import pandas as pd
+
+    df = pd.DataFrame({"D": [0.0, -0.0], "Perfil": ["a", "b"]})
+    expected = df.apply(lambda row: create_hash_id(row, ["D"]), axis=1).tolist()
+
+    assert add_hash_ids(df, ["D"])["hash_id"].tolist() == expected
+
+
+def test_identical_reps_are_numbered_across_chunks():
+    import pandas as pd
+    from app.utils.adr_processor import legacy_hash_id
+
+    rep = {"SERIE": "1", "REP": "1", "KG": 100.0, "Atleta": "atleta1"}
+    columns = list(rep)
+    seen = {}
+    first = add_hash_ids(pd.DataFrame([rep, rep]), columns, seen)["hash_id"].tolist()
+    second = add_hash_ids(pd.DataFrame([rep]), columns, seen)["hash_id"].tolist()
+
+    digest = create_hash_id(pd.Series(rep), columns)
+    assert first + second == [digest, f"{digest}-1", f"{digest}-2"]
+    assert legacy_hash_id(second[0]) == f"{digest[:8]}-2"
+
+
+def test_preprocess_adr_data(tmp_path):
+    df = preprocess_adr_data(write_adr_csv(tmp_path / "adr.csv", 50))
+
+    assert len(df) == 50
+    assert df["hash_id"].str.len().eq(32).all()
+    assert df.columns[0] == "Timestamp"
+
+
+def test_chunked_reader_matches_whole_file(app, tmp_path):
+    import pandas as pd
+    from app.utils.adr_processor import iter_adr_chunks
+
+    df = make_adr_frame(1000)
+    # Integral loads in the first chunk only: per-chunk inference would hash them as ints
+    df["KG"] = df["KG"].round().astype(int).astype(object)
+    df.loc[900, "KG"] = 62.5
+    df.loc[10, "VMP"] = np.nan
+    path = tmp_path / "adr.csv"
+    df.to_csv(path, index=False)
+
+    expected = preprocess_adr_data(path)
+    with app.app_context():
+        chunks = list(iter_adr_chunks(path, chunksize=300))
+
+    assert len(chunks) == 4
+    streamed = pd.concat(chunks)
+    assert streamed["hash_id"].tolist() == expected["hash_id"].tolist()
+    assert list(streamed.columns) == list(expected.columns)
+    assert streamed["SERIE"].tolist() == expected["SERIE"].tolist()
+
+
+def test_ingest_adr_file_streams_into_the_database(app, athlete, tmp_path):
+    import sqlalchemy as sa
+    from app import db
+    from app.models.models import TrainingDetail
+    from app.utils.adr_processor import ingest_adr_file
+
+    path = write_adr_csv(tmp_path / "adr.csv", 500)
+    with app.app_context():
+        inserted = ingest_adr_file(path, chunksize=120)
+        assert inserted == db.session.scalar(sa.select(sa.func.count()).select_from(TrainingDetail))
+        assert inserted > 0
+        assert ingest_adr_file(path, chunksize=120) == 0
+
+
+def test_fused_serie_extraction_matches_separate_patterns():
+    import pandas as pd
+
+    labels = pd.Series(["S1R2", "R3S2", "S10", "R5", "", "S1R2R3", "xS4yR7", None, "SR"])
+    df = split_series_column(pd.DataFrame({"SERIE": labels}))
+
+    assert df["SERIE"].equals(labels.str.extract(r"S(\d+)", expand=False))
+    assert df["REP"].equals(labels.str.extract(r"R(\d+)", expand=False))
+
+
+def test_pipeline_matches_copying_steps():
+    from app.utils.adr_processor import (
+        ADR_COLUMN_TYPES, adr_pipeline, change_columns_type, reorder_columns,
+    )
+
+    raw = make_adr_frame(300)
+    legacy = split_series_column(raw.drop(columns="R"))
+    legacy = add_hash_ids(legacy, COLUMNS_TO_HASH)
+    legacy = change_columns_type(legacy, list(ADR_COLUMN_TYPES), list(ADR_COLUMN_TYPES.values()))
+    legacy["Timestamp"] = "01-01-2025 10:00"
+    legacy = reorder_columns(legacy)
+
+    result = adr_pipeline("01-01-2025 10:00").run(raw)
+
+    assert result.equals(legacy)
+    assert "R" in raw.columns and raw["SERIE"].str.startswith("S").all()  # caller's frame untouched
+
+
+def test_pipeline_works_on_the_owned_frame():
+    from app.utils.adr_processor import adr_pipeline
+
+    df = make_adr_frame(100)
+    assert adr_pipeline().run(df, owned=True) is df
+    assert df.columns[0] == "Timestamp" and "R" not in df.columns
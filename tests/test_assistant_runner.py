@@ -0,0 +1,137 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.assistant_runner import AssistantRunError, AssistantRunner, AssistantRunTimeout
+
+
+def make_run(status, **fields):
+    return SimpleNamespace(**{"id": "run_1", "status": status, "last_error": None, "required_action": None, **fields})
+
+
+def requires_tools(*call_ids):
+    tool_calls = [SimpleNamespace(id=call_id, function=SimpleNamespace(name="lookup", arguments="{}")) for call_id in call_ids]
+    return make_run("requires_action", required_action=SimpleNamespace(submit_tool_outputs=SimpleNamespace(tool_calls=tool_calls)))
+
+
+class FakeRuns:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.retrieved = 0
+        self.cancelled = []
+        self.tool_outputs = []
+
+    def create(self, thread_id, assistant_id, **kwargs):
+        return make_run("queued")
+
+    def retrieve(self, run_id, *, thread_id):
+        self.retrieved += 1
+        status = self.statuses.pop(0) if self.statuses else "in_progress"
+        return status if isinstance(status, SimpleNamespace) else make_run(status)
+
+    def cancel(self, run_id, *, thread_id):
+        self.cancelled.append(run_id)
+        return make_run("cancelling")
+
+    def submit_tool_outputs(self, run_id, *, thread_id, tool_outputs):
+        self.tool_outputs.append(tool_outputs)
+        return make_run("queued")
+
+
+class FakeClient:
+    def __init__(self, statuses):
+        self.assistant_lookups = 0
+        self.runs = FakeRuns(statuses)
+        self.messages = SimpleNamespace(
+            create=lambda **kwargs: None,
+            list=lambda **kwargs: SimpleNamespace(
+                data=[SimpleNamespace(content=[SimpleNamespace(text=SimpleNamespace(value="Hola!"))])]
+            ),
+        )
+        self.beta = SimpleNamespace(
+            assistants=SimpleNamespace(retrieve=self._retrieve_assistant),
+            threads=SimpleNamespace(runs=self.runs, messages=self.messages),
+        )
+
+    def _retrieve_assistant(self, assistant_id):
+        self.assistant_lookups += 1
+        return SimpleNamespace(id=assistant_id)
+
+
+def make_runner(client, **kwargs):
+    options = {"run_timeout": 5, "initial_interval": 0.001, "max_interval": 0.01}
+    options.update(kwargs)
+    return AssistantRunner(client, "asst_1", **options)
+
+
+def test_completed_run_returns_the_reply():
+    client = FakeClient(["in_progress", "in_progress", "completed"])
+    runner = make_runner(client)
+    assert runner.reply("thread_1", "hello") == "Hola!"
+    assert client.runs.retrieved == 3
+
+
+def test_assistant_is_retrieved_once():
+    client = FakeClient([])
+    runner = make_runner(client)
+    for _ in range(3):
+        client.runs.statuses = ["completed"]
+        runner.run("thread_1")
+    assert client.assistant_lookups == 1
+
+
+@pytest.mark.parametrize("status", ["failed", "cancelled", "expired", "incomplete"])
+def test_terminal_failures_raise(status):
+    failed = make_run(status)
+    failed.last_error = SimpleNamespace(code="server_error", message="boom") if status == "failed" else None
+    runner = make_runner(FakeClient(["queued", failed]))
+    with pytest.raises(AssistantRunError) as excinfo:
+        runner.run("thread_1")
+    assert excinfo.value.status == status
+
+
+def test_deadline_cancels_the_run():
+    client = FakeClient([])
+    runner = make_runner(client, run_timeout=0.05)
+    with pytest.raises(AssistantRunTimeout):
+        runner.run("thread_1")
+    assert client.runs.cancelled == ["run_1"]
+
+
+def test_requires_action_without_handler_cancels():
+    client = FakeClient([requires_tools("call_1")])
+    runner = make_runner(client)
+    with pytest.raises(AssistantRunError) as excinfo:
+        runner.run("thread_1")
+    assert excinfo.value.status == "requires_action"
+    assert client.runs.cancelled == ["run_1"]
+
+
+def test_requires_action_submits_tool_outputs():
+    client = FakeClient([requires_tools("call_1", "call_2"), "in_progress", "completed"])
+    handler = lambda tool_calls: [{"tool_call_id": call.id, "output": "42"} for call in tool_calls]
+    runner = make_runner(client, tool_handler=handler)
+    assert runner.run("thread_1") == "Hola!"
+    assert client.runs.tool_outputs == [
+        [{"tool_call_id": "call_1", "output": "42"}, {"tool_call_id": "call_2", "output": "42"}]
+    ]
+
+
+def test_completed_run_without_a_reply_raises():
+    client = FakeClient(["completed"])
+    client.messages.list = lambda **kwargs: SimpleNamespace(data=[])
+    runner = make_runner(client)
+    with pytest.raises(AssistantRunError, match="without a reply") as excinfo:
+        runner.run("thread_1")
+    assert excinfo.value.status == "completed"
+
+
+def test_init_app_reads_the_app_config(app):
+    app.config.update(OPENAI_ASSISTANT_ID="asst_cfg", OPENAI_RUN_TIMEOUT=7, OPENAI_POLL_MAX_INTERVAL=0.5)
+    client = FakeClient(["completed"])
+    runner = AssistantRunner()
+    runner.init_app(app, client)
+
+    assert (runner.client, runner.assistant_id, runner.run_timeout, runner.max_interval) == (client, "asst_cfg", 7, 0.5)
+    assert runner.run("thread_1") == "Hola!"
+    assert app.extensions["assistant_runner"] is runner
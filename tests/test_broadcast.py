@@ -0,0 +1,101 @@
+import asyncio
+import json
+import time
+
+from app.utils.broadcast import Broadcaster, broadcast_messages, broadcast_template, broadcast_text, text_message
+
+MESSAGES_PATH = "/v21.0/phone_number_id_1/messages"
+
+
+def test_broadcast_text_to_a_squad(app, graph_server):
+    recipients = [f"1555000{i:04d}" for i in range(40)]
+
+    with app.app_context():
+        results = broadcast_text(recipients, "Great session today")
+
+    assert [result.recipient for result in results] == recipients
+    assert all(result.ok and result.message_id.startswith("wamid.") for result in results)
+    assert len(graph_server.requests) == 40
+    # One shared session: far fewer connections than messages
+    assert len(graph_server.client_ports) <= app.config["BROADCAST_CONCURRENCY"]
+    method, path, headers, body = graph_server.requests[0]
+    assert (method, path) == ("POST", MESSAGES_PATH)
+    assert headers["Authorization"] == "Bearer test_token"
+    assert json.loads(body)["text"]["body"] == "Great session today"
+
+
+def test_template_payload(app, graph_server):
+    with app.app_context():
+        [result] = broadcast_template(["15551234567"], "hello_world")
+
+    assert result.ok
+    payload = json.loads(graph_server.requests[0][3])
+    assert payload["type"] == "template"
+    assert payload["template"] == {"name": "hello_world", "language": {"code": "en_US"}}
+
+
+def test_failures_are_reported_per_recipient(app, graph_server):
+    graph_server.script(MESSAGES_PATH, [(400, {"error": {"message": "Recipient not in allowed list"}})])
+
+    with app.app_context():
+        results = asyncio.run(broadcast_messages([text_message("1", "hi"), text_message("2", "hi")]))
+
+    assert [result.ok for result in results] == [False, False]
+    assert results[0].status == 400 and results[0].attempts == 1
+    assert "Recipient not in allowed list" in results[0].error
+
+
+def send_one(url, **kwargs):
+    async def send():
+        async with Broadcaster(url, "test_token", concurrency=1, backoff_factor=0.01, **kwargs) as broadcaster:
+            return await broadcaster.send(text_message("15551234567", "hi"))
+
+    return asyncio.run(send())
+
+
+def test_rate_limits_are_retried(app, graph_server):
+    graph_server.script(MESSAGES_PATH, [(429, {}), (429, {}), (200, {"messages": [{"id": "wamid.late"}]})])
+
+    result = send_one(f"{graph_server.url}{MESSAGES_PATH}")
+    assert result.ok and result.attempts == 3
+    assert result.message_id == "wamid.late"
+
+
+def test_retry_after_is_honoured(app, graph_server):
+    graph_server.script(MESSAGES_PATH, [(429, {}, {"Retry-After": "1"}), (200, {"messages": [{"id": "wamid.late"}]})])
+
+    start = time.monotonic()
+    result = send_one(f"{graph_server.url}{MESSAGES_PATH}")
+    assert result.ok and result.attempts == 2
+    assert time.monotonic() - start >= 1
+
+
+def test_server_errors_and_timeouts_are_not_resent(app, graph_server):
+    # Graph may have delivered the message before failing
+    graph_server.script(MESSAGES_PATH, [(503, {}), (200, {})])
+    result = send_one(f"{graph_server.url}{MESSAGES_PATH}")
+    assert not result.ok and result.status == 503 and result.attempts == 1
+
+    graph_server.delay = 0.3
+    result = send_one(f"{graph_server.url}{MESSAGES_PATH}", timeout=0.1)
+    assert not result.ok and result.status is None and result.attempts == 1
+    assert len(graph_server.requests) == 2
+
+
+def test_broadcasts_share_the_dispatcher_rate_limit(app, graph_server):
+    from app import outbound
+
+    with app.app_context():
+        broadcaster = Broadcaster.from_config(app.config)
+    assert broadcaster.bucket is outbound.bucket
+
+
+def test_unreachable_endpoint(app):
+    async def send_one():
+        async with Broadcaster("http://127.0.0.1:9/messages", "token", max_retries=1, backoff_factor=0.01) as broadcaster:
+            return await broadcaster.send(text_message("15551234567", "hi"))
+
+    result = asyncio.run(send_one())
+    assert not result.ok and result.status is None
+    assert result.attempts == 2
+    assert "Client" in result.error
@@ -0,0 +1,185 @@
+import threading
+import time
+
+import pytest
+
+from app import conversation_mailbox, run_leases
+from app.services.conversation_mailbox import ConversationMailbox
+
+
+class RecordingHandler:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.active = {}
+        self.max_active = {}
+        self.max_total = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, wa_id, text, name):
+        with self._lock:
+            self.calls.append((wa_id, text, name))
+            self.active[wa_id] = self.active.get(wa_id, 0) + 1
+            self.max_active[wa_id] = max(self.max_active.get(wa_id, 0), self.active[wa_id])
+            self.max_total = max(self.max_total, sum(self.active.values()))
+        time.sleep(self.delay)
+        with self._lock:
+            self.active[wa_id] -= 1
+        return f"reply to {text!r}"
+
+
+@pytest.fixture
+def mailbox(app):
+    app.config.update(ASSISTANT_DEBOUNCE_SECONDS=0.05, ASSISTANT_MAX_DELAY_SECONDS=1.0)
+    mailbox = ConversationMailbox(app)
+    yield mailbox
+    mailbox.close()
+
+
+def test_quick_messages_are_coalesced(mailbox):
+    mailbox.handler = handler = RecordingHandler()
+    futures = [mailbox.post("15551234567", text, "Alice") for text in ("hola", "tengo una duda", "sobre la sentadilla")]
+
+    replies = {future.result(timeout=5) for future in futures}
+    assert handler.calls == [("15551234567", "hola\ntengo una duda\nsobre la sentadilla", "Alice")]
+    assert len(replies) == 1
+    assert mailbox.metrics()["coalesced"] == 2
+
+
+def test_messages_during_a_run_wait_for_the_next_one(mailbox):
+    mailbox.handler = handler = RecordingHandler(delay=0.2)
+    first = mailbox.post("15551234567", "uno")
+    time.sleep(0.1)  # the first run is in progress
+    second = mailbox.post("15551234567", "dos")
+    third = mailbox.post("15551234567", "tres")
+
+    assert first.result(timeout=5) == "reply to 'uno'"
+    assert second.result(timeout=5) == third.result(timeout=5) == "reply to 'dos\\ntres'"
+    assert handler.max_active["15551234567"] == 1
+
+
+def test_conversations_run_in_parallel(mailbox):
+    mailbox.handler = handler = RecordingHandler(delay=0.2)
+    futures = [mailbox.post(f"1555000000{i}", "hola") for i in range(4)]
+    for future in futures:
+        future.result(timeout=5)
+    assert len(handler.calls) == 4
+    assert handler.max_total > 1
+
+
+def test_max_delay_caps_the_window(mailbox):
+    mailbox.max_delay = 0.15
+    mailbox.handler = handler = RecordingHandler()
+    futures = []
+    deadline = time.monotonic() + 0.5
+    while time.monotonic() < deadline:
+        futures.append(mailbox.post("15551234567", "."))
+        time.sleep(0.02)
+    for future in futures:
+        future.result(timeout=5)
+    assert len(handler.calls) > 1
+
+
+def test_handler_errors_fail_the_batch(mailbox):
+    def handler(wa_id, text, name):
+        raise RuntimeError("run failed")
+
+    mailbox.handler = handler
+    futures = [mailbox.post("15551234567", "hola"), mailbox.post("15551234567", "?")]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+    assert mailbox.metrics()["failed"] == 1
+
+    # The conversation isn't stuck after a failure
+    mailbox.handler = RecordingHandler()
+    assert mailbox.post("15551234567", "otra vez").result(timeout=5) == "reply to 'otra vez'"
+
+
+@pytest.fixture
+def leased_mailbox(app):
+    app.config.update(ASSISTANT_DEBOUNCE_SECONDS=0.05, ASSISTANT_MAX_DELAY_SECONDS=1.0)
+    mailbox = ConversationMailbox(app, leases=run_leases)
+    yield mailbox
+    mailbox.close()
+
+
+def test_conversation_leased_elsewhere_waits_for_the_lease(app, leased_mailbox):
+    leased_mailbox.handler = handler = RecordingHandler()
+    with app.app_context():
+        assert run_leases.acquire("15551234567", "other_process", 60)
+
+    first = leased_mailbox.post("15551234567", "hola")
+    time.sleep(0.2)
+    assert handler.calls == []
+    assert leased_mailbox.metrics()["deferred"] >= 1
+
+    second = leased_mailbox.post("15551234567", "sigo aqui")
+    with app.app_context():
+        run_leases.release("15551234567", "other_process")
+
+    assert first.result(timeout=5) == second.result(timeout=5)
+    assert handler.calls == [("15551234567", "hola\nsigo aqui", None)]
+
+
+def test_runs_release_their_lease(app, leased_mailbox):
+    def failing(wa_id, text, name):
+        raise RuntimeError("run failed")
+
+    leased_mailbox.handler = RecordingHandler()
+    leased_mailbox.post("15551234567", "hola").result(timeout=5)
+    leased_mailbox.handler = failing
+    with pytest.raises(RuntimeError):
+        leased_mailbox.post("15551234568", "hola").result(timeout=5)
+
+    with app.app_context():
+        assert run_leases.acquire("15551234567", "other_process", 60)
+        assert run_leases.acquire("15551234568", "other_process", 60)
+
+
+def test_text_messages_are_posted_when_enabled(app, monkeypatch, valid_text_message_payload):
+    from app.views import dynamic_webhook_handler
+    from app.models.payload_models import parse_webhook_payload
+
+    posted = []
+    monkeypatch.setattr(conversation_mailbox, "post", lambda *args: posted.append(args))
+    webhook = parse_webhook_payload(valid_text_message_payload)
+
+    with app.app_context():
+        dynamic_webhook_handler(webhook)
+        assert posted == []
+
+        app.config["ASSISTANT_REPLIES_ENABLED"] = True
+        app.config["DEDUP_ENABLED"] = False
+        dynamic_webhook_handler(webhook)
+    assert posted == [("15551234567", "Hello, this is a test message.", "Alice")]
+
+
+@pytest.mark.parametrize("outcome", ["reply", "failure", "dropped"])
+def test_text_events_stay_claimed_until_the_reply_ran(app, monkeypatch, valid_text_message_payload, outcome):
+    from concurrent.futures import Future
+    from app import webhook_dedup
+    from app.services.dedup import event_key
+    from app.views import dynamic_webhook_handler
+    from app.models.payload_models import parse_webhook_payload
+
+    future = Future()
+    monkeypatch.setattr(conversation_mailbox, "post", lambda *args: future)
+    webhook = parse_webhook_payload(valid_text_message_payload)
+    [event] = webhook.iter_events()
+    app.config["ASSISTANT_REPLIES_ENABLED"] = True
+
+    with app.app_context():
+        dynamic_webhook_handler(webhook)
+        assert not webhook_dedup.claim(event_key(event))  # in progress
+
+    if outcome == "reply":
+        future.set_result("hola")
+    elif outcome == "failure":
+        future.set_exception(RuntimeError("run failed"))
+    else:
+        future.cancel()  # the mailbox was closed before the run
+
+    with app.app_context():
+        # Only a reply makes a redelivery a duplicate
+        assert webhook_dedup.claim(event_key(event)) == (outcome != "reply")
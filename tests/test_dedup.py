@@ -0,0 +1,88 @@
+from app.models.payload_models import parse_webhook_payload
+from app.utils.cache import TTLCache
+
+
+def test_ttl_cache_evicts_lru_and_expired():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+
+    cache.set("short", 1, ttl=-1)
+    assert cache.get("short") is None
+
+
+def test_redelivered_events_are_skipped(app, monkeypatch, batched_payload):
+    from app import views, webhook_dedup
+
+    seen = []
+    for event_type in ("text", "document", "status"):
+        monkeypatch.setitem(views.EVENT_HANDLERS, event_type, lambda event: seen.append(event.type))
+
+    with app.app_context():
+        views.dynamic_webhook_handler(parse_webhook_payload(batched_payload))
+        views.dynamic_webhook_handler(parse_webhook_payload(batched_payload))
+
+    assert seen == ["text", "document", "status", "status"]
+    assert webhook_dedup.metrics()["duplicates"] == 4
+
+
+def test_dedup_survives_a_cold_cache(app):
+    from app import webhook_dedup
+
+    with app.app_context():
+        assert webhook_dedup.claim("wamid.1") is True
+        webhook_dedup.complete("wamid.1")
+        webhook_dedup.cache.clear()
+        assert webhook_dedup.claim("wamid.1") is False
+
+
+def test_failed_event_is_released(app):
+    from app import webhook_dedup
+
+    with app.app_context():
+        assert webhook_dedup.claim("wamid.2") is True
+        webhook_dedup.release("wamid.2")
+        assert webhook_dedup.claim("wamid.2") is True
+
+
+def test_in_progress_claim_is_not_a_done_event(app):
+    from app import webhook_dedup
+
+    with app.app_context():
+        assert webhook_dedup.claim("wamid.3") is True
+        # Another worker is handling it: skipped, but not remembered as done
+        assert webhook_dedup.claim("wamid.3") is False
+        assert "wamid.3" not in webhook_dedup.cache
+
+
+def test_stale_claim_of_a_crashed_worker_is_taken_over(app):
+    from datetime import timedelta
+    from app import webhook_dedup
+
+    with app.app_context():
+        assert webhook_dedup.claim("wamid.4") is True
+        # The worker died mid-handle; once the claim is stale the queue's retry gets it
+        webhook_dedup.claim_timeout = timedelta(seconds=0)
+        assert webhook_dedup.claim("wamid.4") is True
+        webhook_dedup.complete("wamid.4")
+        assert webhook_dedup.claim("wamid.4") is False
+
+
+def test_old_keys_are_pruned(app):
+    import sqlalchemy as sa
+    from datetime import timedelta
+    from app import db, webhook_dedup
+    from app.models.models import ProcessedWebhookEvent
+
+    with app.app_context():
+        webhook_dedup.claim("wamid.5")
+        webhook_dedup.complete("wamid.5")
+        webhook_dedup.retention = timedelta(seconds=-1)
+        webhook_dedup.prune_interval = 0
+        webhook_dedup.claim("wamid.6")
+        keys = db.session.scalars(sa.select(ProcessedWebhookEvent.event_key)).all()
+    assert keys == ["wamid.6"]
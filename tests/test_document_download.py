@@ -0,0 +1,129 @@
+import base64
+import hashlib
+
+import pytest
+
+from app.models.payload_models import parse_webhook_payload
+
+CONTENT = b"SERIE,KG\nS1R1,100\n" * 1000
+
+
+def script_media(graph_server, sha256):
+    graph_server.script("/v21.0/document_id_1/", [(200, {"url": f"{graph_server.url}/media/document_id_1"})])
+    graph_server.script("/media/document_id_1", [(200, CONTENT)])
+    return sha256
+
+
+def document_event(valid_document_message_payload, sha256):
+    payload = valid_document_message_payload.replace("fake_sha256_hash_value", sha256)
+    return next(parse_webhook_payload(payload).iter_events())
+
+
+def test_download_is_streamed_and_verified(app, graph_server, valid_document_message_payload):
+    from app.utils.document_utils import download_document_from_webhook
+
+    sha256 = script_media(graph_server, hashlib.sha256(CONTENT).hexdigest())
+    with app.app_context():
+        path = download_document_from_webhook(document_event(valid_document_message_payload, sha256))
+
+    assert path.read_bytes() == CONTENT
+    assert path.name == f"{sha256}.pdf"
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
+
+
+def test_base64_sha256_is_accepted(app, graph_server, valid_document_message_payload):
+    from app.utils.document_utils import download_document_from_webhook
+
+    sha256 = script_media(graph_server, base64.b64encode(hashlib.sha256(CONTENT).digest()).decode("ascii"))
+    with app.app_context():
+        assert download_document_from_webhook(document_event(valid_document_message_payload, sha256)) is not None
+
+
+def test_sha256_mismatch_leaves_no_file(app, graph_server, valid_document_message_payload, tmp_path):
+    from app.utils.document_utils import download_document_from_webhook, MediaDownloadError
+
+    script_media(graph_server, "0" * 64)
+    with app.app_context():
+        with pytest.raises(MediaDownloadError):
+            download_document_from_webhook(document_event(valid_document_message_payload, "0" * 64))
+
+    assert list((tmp_path / "data" / "media_cache").iterdir()) == []
+
+
+def test_download_over_the_size_limit_is_aborted(app, graph_server, valid_document_message_payload, tmp_path):
+    from app.utils.document_utils import download_document_from_webhook, MediaDownloadError
+
+    app.config["MEDIA_MAX_BYTES"] = 1024
+    sha256 = script_media(graph_server, hashlib.sha256(CONTENT).hexdigest())
+    with app.app_context():
+        with pytest.raises(MediaDownloadError):
+            download_document_from_webhook(document_event(valid_document_message_payload, sha256))
+
+    # Rejected on Content-Length, before anything was written
+    assert list((tmp_path / "data" / "media_cache").iterdir()) == []
+
+
+def test_resent_document_is_served_from_the_cache(app, graph_server, valid_document_message_payload):
+    from app import media_store
+    from app.utils.document_utils import download_document_from_webhook
+
+    sha256 = script_media(graph_server, hashlib.sha256(CONTENT).hexdigest())
+    event = document_event(valid_document_message_payload, sha256)
+    with app.app_context():
+        first = download_document_from_webhook(event)
+        second = download_document_from_webhook(event)
+
+    assert first == second
+    assert len(graph_server.requests) == 2  # media url + download, only for the first upload
+    assert media_store.metrics()["hits"] == 1
+
+
+def test_media_store_evicts_least_recently_used(tmp_path):
+    from app.services.media_store import MediaStore
+
+    store = MediaStore()
+    store.max_bytes = 25
+    store.open(tmp_path)
+
+    hashes = [hashlib.sha256(bytes([i])).hexdigest() for i in range(3)]
+    for sha256 in hashes[:2]:
+        store.path_for(sha256, "adr.csv").write_bytes(b"x" * 10)
+        store.add(store.path_for(sha256, "adr.csv"))
+    store.get(hashes[0])
+
+    store.path_for(hashes[2], "adr.csv").write_bytes(b"x" * 10)
+    store.add(store.path_for(hashes[2], "adr.csv"))
+
+    assert store.get(hashes[1]) is None
+    assert store.get(hashes[0]) is not None
+    assert store.metrics()["bytes"] == 20
+    assert store.metrics()["evictions"] == 1
+
+
+def test_failed_media_url_fails_the_webhook(app, graph_server, valid_document_message_payload):
+    from app import views, webhook_dedup
+    from app.models.payload_models import parse_webhook_payload
+
+    graph_server.script("/v21.0/document_id_1/", [(503, {})])
+    webhook = parse_webhook_payload(valid_document_message_payload)
+    with app.app_context():
+        # The queue retries the webhook and the event isn't remembered as handled
+        with pytest.raises(Exception, match="1 of 1 webhook events failed"):
+            views.dynamic_webhook_handler(webhook)
+        assert webhook_dedup.claim(views.event_key(next(webhook.iter_events()))) is True
+
+
+def test_adr_upload_without_contacts_is_keyed_by_sender(app, graph_server, valid_document_message_payload, monkeypatch):
+    import dataclasses
+    from app import adr_pool
+    from app.utils.document_utils import process_document_webhook
+
+    sha256 = script_media(graph_server, hashlib.sha256(CONTENT).hexdigest())
+    event = document_event(valid_document_message_payload.replace("test_document.pdf", "adr_export.csv"), sha256)
+    event = dataclasses.replace(event, contact=None)
+    keys = []
+    monkeypatch.setattr(adr_pool, "ingest", lambda path, key: keys.append(key) or 0)
+
+    with app.app_context():
+        process_document_webhook(event)
+    assert keys == [event.message.from_]
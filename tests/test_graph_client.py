@@ -0,0 +1,81 @@
+import json
+
+
+def test_requests_share_one_keep_alive_connection(app, graph_server):
+    from app import graph_client
+
+    for _ in range(3):
+        assert graph_client.get("media_id/", endpoint="media").status_code == 200
+
+    assert len(graph_server.client_ports) == 1
+    method, path, headers, _ = graph_server.requests[0]
+    assert (method, path) == ("GET", "/v21.0/media_id/")
+    assert headers["Authorization"] == "Bearer test_token"
+    assert graph_client.metrics()["media"]["count"] == 3
+
+
+def test_retries_on_rate_limit_and_server_errors(app, graph_server):
+    from app import graph_client
+
+    graph_server.script("/v21.0/media_id/", [(429, {}), (503, {}), (200, {"url": "https://example.com/media"})])
+
+    response = graph_client.get("media_id/", endpoint="media")
+
+    assert response.status_code == 200
+    assert len(graph_server.requests) == 3
+
+
+def test_post_is_retried_on_rate_limit_only(app, graph_server):
+    from app import graph_client
+
+    path = "/v21.0/phone_number_id_1/messages"
+    graph_server.script(path, [(429, {}), (200, {"messages": [{"id": "wamid.1"}]})])
+    assert graph_client.post("phone_number_id_1/messages", endpoint="messages", json={}).status_code == 200
+    assert len(graph_server.requests) == 2
+
+    # Graph may have accepted the send before the 5xx, a retry could deliver it twice
+    graph_server.script(path, [(503, {}), (200, {"messages": [{"id": "wamid.2"}]})])
+    assert graph_client.post("phone_number_id_1/messages", endpoint="messages", json={}).status_code == 503
+    assert len(graph_server.requests) == 3
+
+
+def test_post_is_not_retried_on_read_timeout(app, graph_server):
+    import pytest
+    import requests
+    from app import graph_client
+
+    graph_server.delay = 0.3
+    with pytest.raises(requests.Timeout):
+        graph_client.post("phone_number_id_1/messages", endpoint="messages", json={}, timeout=0.1)
+    assert len(graph_server.requests) == 1
+
+
+def test_gives_up_after_max_retries(app, graph_server):
+    from app import graph_client
+
+    graph_server.script("/v21.0/broken/", [(500, {"error": "boom"})])
+
+    response = graph_client.get("broken/", endpoint="media")
+
+    assert response.status_code == 500
+    assert len(graph_server.requests) == app.config["GRAPH_API_MAX_RETRIES"] + 1
+    assert graph_client.metrics()["media"]["errors"] == 1
+
+
+def test_get_media_url_uses_shared_client(app, graph_server):
+    from app.utils.document_utils import get_media_url
+
+    graph_server.script("/v21.0/document_id_1/", [(200, {"url": f"{graph_server.url}/media/document_id_1"})])
+
+    with app.app_context():
+        assert get_media_url("document_id_1") == f"{graph_server.url}/media/document_id_1"
+
+
+def test_send_message_uses_shared_client(app, graph_server):
+    from app.utils.whatsapp_utils import send_message
+
+    with app.app_context():
+        response = send_message(json.dumps({"messaging_product": "whatsapp", "to": "15551234567", "type": "text", "text": {"body": "hi"}}))
+
+    assert response.status_code == 200
+    assert graph_server.requests[0][1] == "/v21.0/phone_number_id_1/messages"
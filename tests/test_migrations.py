@@ -0,0 +1,79 @@
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+from flask_migrate import upgrade
+
+from app import db
+from app.models.models import TrainingDetail, TrainingSession, User
+from app.utils.adr_processor import add_dataframe_to_training_detail, legacy_hash_id, preprocess_adr_data
+from tests.fixtures.adr import make_adr_frame
+
+MIGRATIONS = str(Path(__file__).resolve().parent.parent / "migrations")
+
+
+@pytest.fixture
+def unmigrated_app(tmp_path, graph_server):
+    """App on an empty SQLite file, for running the migrations on."""
+    from app import create_app, webhook_queue, outbound, conversation_mailbox
+    from app.config import Config
+
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+        WEBHOOK_QUEUE_PATH = str(tmp_path / "webhook_queue.db")
+        WEBHOOK_WORKERS = 0
+        GRAPH_API_BASE_URL = graph_server.url
+        DOWNLOAD_DATA_PATH = str(tmp_path / "data")
+        ADR_POOL_WORKERS = 0
+        OUTBOUND_WORKERS = 0
+        OUTBOUND_DEAD_LETTER_PATH = str(tmp_path / "outbound_dead_letters.db")
+
+    loggers = {name: logger.disabled for name, logger in logging.root.manager.loggerDict.items()
+               if isinstance(logger, logging.Logger)}
+    app = create_app(TestConfig)
+    yield app
+    webhook_queue.close()
+    outbound.close()
+    conversation_mailbox.close()
+    # alembic.ini's logging config disables every logger that existed before it
+    for name, disabled in loggers.items():
+        logging.getLogger(name).disabled = disabled
+
+
+def test_legacy_hash_ids_are_rehashed(unmigrated_app, tmp_path):
+    # One export with float loads and one with integer loads, which read_csv hashes as '60' and stores as 60.0
+    make_adr_frame(40, seed=1).to_csv(tmp_path / "float.csv", index=False)
+    integer_loads = make_adr_frame(40, seed=2)
+    integer_loads["KG"] = integer_loads["KG"].round().astype(int)
+    integer_loads.to_csv(tmp_path / "int.csv", index=False)
+    uploads = [preprocess_adr_data(tmp_path / "float.csv"), preprocess_adr_data(tmp_path / "int.csv")]
+
+    with unmigrated_app.app_context():
+        upgrade(directory=MIGRATIONS, revision="c3a8e61f4d02")
+        user = User(email="atleta1@example.com", date_of_birth=datetime(1995, 1, 1, tzinfo=timezone.utc), gender="F",
+                    height=170.0, initial_weight=65.0, phone_number="15557654321", alias="atleta1")
+        db.session.add(user)
+        db.session.commit()
+        session = TrainingSession(user_id=user.id, date=datetime.now(timezone.utc))
+        db.session.add(session)
+        db.session.commit()
+        user_id, session_id = user.id, session.id
+
+        for df in uploads:
+            legacy = df.copy()
+            legacy["hash_id"] = legacy["hash_id"].map(legacy_hash_id)
+            add_dataframe_to_training_detail(legacy, session_id, atleta_id=user_id)
+        # A row whose hashed values can't be rebuilt keeps its legacy id
+        unknown = uploads[0].iloc[:1].copy()
+        unknown["hash_id"] = "deadbeef"
+        add_dataframe_to_training_detail(unknown, session_id, atleta_id=user_id)
+        db.session.remove()
+
+        upgrade(directory=MIGRATIONS, revision="a71d3c9e5b28")
+
+        stored = db.session.scalars(sa.select(TrainingDetail.hash_id).order_by(TrainingDetail.id)).all()
+        assert stored == uploads[0]["hash_id"].tolist() + uploads[1]["hash_id"].tolist() + ["deadbeef"]
+        assert all(add_dataframe_to_training_detail(df, session_id, atleta_id=user_id) == 0 for df in uploads)
@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+
+import pytest
+
+from app import outbound
+from app.services.graph_client import GraphAPIError
+from app.services.outbound import TokenBucket
+from app.services.webhook_queue import QueueFullError
+
+MESSAGES_PATH = "/v21.0/phone_number_id_1/messages"
+
+
+def text_message(body, to="15551234567"):
+    return {"messaging_product": "whatsapp", "to": to, "type": "text", "text": {"body": body}}
+
+
+def test_send_message_raises_on_error_status(app, graph_server):
+    from app.utils.whatsapp_utils import send_message
+
+    graph_server.script(MESSAGES_PATH, [(400, {"error": {"message": "Invalid parameter"}})])
+
+    with app.app_context(), pytest.raises(GraphAPIError) as excinfo:
+        send_message(json.dumps(text_message("hi")))
+
+    assert excinfo.value.status_code == 400
+    assert not excinfo.value.retryable
+    assert "Invalid parameter" in excinfo.value.body
+
+
+def test_submit_returns_a_future(app, graph_server):
+    from app.utils.whatsapp_utils import send_message_async
+
+    future = send_message_async(text_message("hi"))
+    assert not future.done()
+
+    with app.app_context():
+        assert outbound.drain() == 1
+
+    assert future.result(timeout=1)["messages"][0]["id"].startswith("wamid.")
+    assert json.loads(graph_server.requests[0][3])["text"]["body"] == "hi"
+
+
+def test_rate_limit_is_retried_with_backoff(app, graph_server):
+    retries = app.config["GRAPH_API_MAX_RETRIES"]
+    # The client's own retries run out first, then the dispatcher reschedules the message
+    graph_server.script(MESSAGES_PATH, [(429, {})] * (retries + 1) + [(200, {"messages": [{"id": "wamid.ok"}]})])
+
+    future = outbound.submit(text_message("hi"))
+    with app.app_context():
+        outbound.drain(timeout=10)
+
+    assert future.result(timeout=1) == {"messages": [{"id": "wamid.ok"}]}
+    assert outbound.metrics()["retried"] == 1
+    assert outbound.metrics()["dead_letters"] == 0
+
+
+def test_server_errors_go_to_the_dead_letter_store_unsent(app, graph_server):
+    # Graph may have delivered the message before failing, so it is not sent again
+    graph_server.script(MESSAGES_PATH, [(500, {"error": "boom"})])
+
+    future = outbound.submit(text_message("lost"))
+    with app.app_context():
+        outbound.drain(timeout=10)
+
+    with pytest.raises(GraphAPIError):
+        future.result(timeout=1)
+    [dead] = outbound.dead_letters()
+    assert dead["status_code"] == 500
+    assert dead["attempts"] == 1
+    assert len(graph_server.requests) == 1
+    assert json.loads(dead["body"])["text"]["body"] == "lost"
+
+
+def test_timeouts_are_not_sent_again(app, graph_server):
+    from app import graph_client
+
+    graph_server.delay = 0.3
+    graph_client.timeout = 0.1
+    future = outbound.submit(text_message("slow"))
+    with app.app_context():
+        outbound.drain(timeout=10)
+
+    assert isinstance(future.exception(timeout=1), GraphAPIError)
+    assert outbound.dead_letters()[0]["attempts"] == 1
+    assert len(graph_server.requests) == 1
+
+
+def test_connection_failures_are_retried_until_dead_lettered(app):
+    from app import graph_client
+
+    graph_client.base_url = "http://127.0.0.1:9"  # nothing listens on the discard port
+    future = outbound.submit(text_message("unreachable"))
+    with app.app_context():
+        outbound.drain(timeout=10)
+
+    error = future.exception(timeout=1)
+    assert isinstance(error, GraphAPIError) and error.connect_failed
+    [dead] = outbound.dead_letters()
+    assert dead["status_code"] is None
+    assert dead["attempts"] == app.config["OUTBOUND_MAX_ATTEMPTS"]
+
+
+def test_client_errors_are_not_retried(app, graph_server):
+    graph_server.script(MESSAGES_PATH, [(400, {"error": "bad"})])
+
+    future = outbound.submit(text_message("bad"))
+    with app.app_context():
+        outbound.drain()
+
+    assert isinstance(future.exception(timeout=1), GraphAPIError)
+    assert len(graph_server.requests) == 1
+    assert outbound.dead_letters()[0]["attempts"] == 1
+
+
+def test_workers_respect_the_rate_limit(app, graph_server):
+    outbound.bucket = TokenBucket(rate=50, capacity=1)
+    outbound.start_workers(app, 4)
+    try:
+        start = time.monotonic()
+        futures = [outbound.submit(text_message(f"msg {i}")) for i in range(11)]
+        for future in futures:
+            future.result(timeout=5)
+        elapsed = time.monotonic() - start
+    finally:
+        outbound.stop_workers()
+
+    # 1 token up front, then 10 more at 50/s
+    assert elapsed >= 0.19
+    assert len(graph_server.requests) == 11
+
+
+def test_workers_stuck_in_a_send_exit_after_a_restart(app, graph_server):
+    graph_server.delay = 0.5
+    outbound.submit(text_message("slow"))
+    outbound.start_workers(app, 1)
+    [busy] = outbound._workers
+    time.sleep(0.1)  # blocked in send_message
+
+    outbound.stop_workers(timeout=0.05)
+    assert busy.is_alive()
+    outbound.start_workers(app, 1)
+    try:
+        busy.join(timeout=5)
+        assert not busy.is_alive()
+        assert outbound.metrics()["workers"] == 1
+    finally:
+        outbound.stop_workers()
+
+
+def test_queue_depth_is_bounded(app):
+    outbound.max_depth = 2
+    outbound.submit(text_message("1"))
+    outbound.submit(text_message("2"))
+
+    with pytest.raises(QueueFullError):
+        outbound.submit(text_message("3"))
+    assert outbound.metrics()["rejected"] == 1
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=100, capacity=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert 0 < bucket.try_acquire() <= 0.01
+
+    stop = threading.Event()
+    stop.set()
+    bucket._tokens = 0
+    assert bucket.acquire(stop) is False
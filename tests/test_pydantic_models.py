@@ -118,4 +118,26 @@ def test_get_phone_status(valid_status_update_payload):
     phone,status = webhook.get_phone_status()
 
     assert status == "delivered"
-    assert phone == "15550000000"
\ No newline at end of file
+    assert phone == "15550000000"
+
+def test_parse_raw_bytes(valid_text_message_payload):
+    webhook = parse_webhook_payload(valid_text_message_payload.encode("utf-8"))
+    assert isinstance(webhook, WebhookPayload)
+    assert webhook.get_body_of_text_message() == "Hello, this is a test message."
+
+
+def test_parse_invalid_json_returns_none():
+    assert parse_webhook_payload(b"{not json") is None
+
+
+def test_change_discriminator(valid_status_update_payload, valid_text_message_payload):
+    from app.models.payload_models import change_discriminator
+    import json
+
+    status_change = json.loads(valid_status_update_payload)["entry"][0]["changes"][0]
+    text_change = json.loads(valid_text_message_payload)["entry"][0]["changes"][0]
+    assert change_discriminator(status_change) == "statuses"
+    assert change_discriminator(text_change) == "messages"
+
+    webhook = parse_webhook_payload(valid_status_update_payload)
+    assert change_discriminator(webhook.get_changes()) == "statuses"
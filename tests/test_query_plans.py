@@ -0,0 +1,48 @@
+"""EXPLAIN QUERY PLAN checks that the hot training queries stay on their indexes (SQLite)."""
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+
+from app import db
+from app.models.models import TrainingDetail
+from app.utils.adr_processor import open_training_session_query, training_detail_export_query
+
+
+def query_plan(query) -> str:
+    compiled = query.compile(dialect=db.engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def test_open_session_lookup_uses_user_and_created_at(app):
+    from app import session_registry
+
+    # The statement load_or_create_training_session runs
+    query = open_training_session_query(1, datetime.now(timezone.utc), session_registry.window)
+
+    with app.app_context():
+        plan = query_plan(query)
+    assert "ix_training_sessions_user_id_created_at (user_id=? AND created_at>? AND created_at<?)" in plan
+
+
+def test_session_details_use_session_id(app):
+    with app.app_context():
+        plan = query_plan(sa.select(TrainingDetail).where(TrainingDetail.session_id == 1))
+    assert "ix_training_details_session_id (session_id=?)" in plan
+
+
+def test_athlete_exercise_history_uses_composite_index(app):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    query = training_detail_export_query(atleta_id=1, ejercicio="Sentadilla", start=start, end=start + timedelta(days=30))
+
+    with app.app_context():
+        plan = query_plan(query)
+    assert "ix_training_details_atleta_id_ejercicio_timestamp (atleta_id=? AND ejercicio=? AND timestamp>? AND timestamp<?)" in plan
+
+
+def test_hash_lookup_uses_hash_index(app):
+    with app.app_context():
+        plan = query_plan(sa.select(TrainingDetail.id).where(TrainingDetail.hash_id == "abcdef12"))
+    assert "ix_training_details_hash_id (hash_id=?)" in plan
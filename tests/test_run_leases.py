@@ -0,0 +1,21 @@
+from app import run_leases
+
+
+def test_lease_has_one_owner_at_a_time(app):
+    with app.app_context():
+        assert run_leases.acquire("15551234567", "worker_a", 60)
+        assert not run_leases.acquire("15551234567", "worker_b", 60)
+        assert run_leases.acquire("15551234567", "worker_a", 60)  # extends its own lease
+
+        run_leases.release("15551234567", "worker_b")  # not the owner, ignored
+        assert not run_leases.acquire("15551234567", "worker_b", 60)
+
+        run_leases.release("15551234567", "worker_a")
+        assert run_leases.acquire("15551234567", "worker_b", 60)
+
+
+def test_expired_lease_is_taken_over(app):
+    with app.app_context():
+        assert run_leases.acquire("15551234567", "dead_worker", -1)
+        assert run_leases.acquire("15551234567", "worker_b", 60)
+        assert not run_leases.acquire("15551234567", "worker_c", 60)
@@ -0,0 +1,92 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+
+from app import db, session_registry
+from app.models.models import TrainingSession
+from app.services.session_registry import ActiveSessionRegistry
+from app.utils.adr_processor import get_active_training_session_id
+
+
+def record_session_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if "training_sessions" in statement:
+            statements.append(statement)
+
+    sa.event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def test_only_cache_misses_hit_the_database(app, athlete):
+    with app.app_context():
+        statements = record_session_queries()
+
+        session_id = get_active_training_session_id(athlete)
+        queries_on_miss = len(statements)
+        assert queries_on_miss > 0
+        for _ in range(5):
+            assert get_active_training_session_id(athlete) == session_id
+        assert len(statements) == queries_on_miss
+        assert db.session.scalar(sa.select(sa.func.count()).select_from(TrainingSession)) == 1
+
+
+def test_existing_session_in_the_window_is_reused(app, athlete):
+    with app.app_context():
+        started = datetime.now(timezone.utc) - timedelta(hours=1)
+        existing = TrainingSession(user_id=athlete, date=started, created_at=started)
+        db.session.add(existing)
+        db.session.commit()
+
+        assert get_active_training_session_id(athlete) == existing.id
+        _, expires_at = session_registry.cache.get(athlete)
+        assert abs((expires_at - (started + timedelta(hours=3))).total_seconds()) < 1
+
+
+def test_deleted_session_is_invalidated(app, athlete):
+    with app.app_context():
+        session_id = get_active_training_session_id(athlete)
+
+        db.session.delete(db.session.get(TrainingSession, session_id))
+        db.session.commit()
+
+        assert session_registry.get(athlete) is None
+        new_id = get_active_training_session_id(athlete)
+        assert db.session.get(TrainingSession, new_id) is not None
+
+
+def test_entries_expire_with_the_window():
+    registry = ActiveSessionRegistry()
+    registry.window = timedelta(seconds=0.2)
+
+    registry.open(1, 10, datetime.now(timezone.utc))
+    assert registry.get(1) == 10
+    time.sleep(0.25)
+    assert registry.get(1) is None
+
+    # Sessions older than the window are not cached at all
+    registry.open(2, 20, datetime.now(timezone.utc) - timedelta(seconds=1))
+    assert registry.get(2) is None
+
+
+def test_concurrent_misses_load_once():
+    registry = ActiveSessionRegistry()
+    loads = []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.05)
+        return 42, datetime.now(timezone.utc)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.resolve(7, load))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [42] * 8
+    assert len(loads) == 1
@@ -0,0 +1,129 @@
+import threading
+
+import pytest
+import sqlalchemy as sa
+
+from app import db, thread_store
+from app.models.models import AssistantThread
+
+
+def record_thread_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if "assistant_threads" in statement:
+            statements.append(statement)
+
+    sa.event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+@pytest.fixture
+def file_app(tmp_path, graph_server):
+    """App on a SQLite file, so concurrent writers use their own connections."""
+    from app import create_app, webhook_queue, outbound
+    from app.config import Config
+
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+        WEBHOOK_QUEUE_PATH = str(tmp_path / "webhook_queue.db")
+        WEBHOOK_WORKERS = 0
+        GRAPH_API_BASE_URL = graph_server.url
+        DOWNLOAD_DATA_PATH = str(tmp_path / "data")
+        ADR_POOL_WORKERS = 0
+        OUTBOUND_WORKERS = 0
+        OUTBOUND_DEAD_LETTER_PATH = str(tmp_path / "outbound_dead_letters.db")
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    yield app
+    webhook_queue.close()
+    outbound.close()
+
+
+def test_unknown_conversation(app):
+    with app.app_context():
+        assert thread_store.get("15550000000") is None
+
+
+def test_hits_skip_the_database(app):
+    with app.app_context():
+        thread_store.set("15551234567", "thread_a")
+        statements = record_thread_queries()
+        for _ in range(5):
+            assert thread_store.get("15551234567") == "thread_a"
+        assert statements == []
+
+
+def test_misses_read_through(app):
+    with app.app_context():
+        thread_store.set("15551234567", "thread_a")
+        thread_store.cache.clear()
+        statements = record_thread_queries()
+        assert thread_store.get("15551234567") == "thread_a"
+        assert thread_store.get("15551234567") == "thread_a"
+        assert len(statements) == 1
+
+
+def test_set_replaces_the_thread(app):
+    with app.app_context():
+        thread_store.set("15551234567", "thread_a")
+        thread_store.set("15551234567", "thread_b")
+        thread_store.cache.clear()
+        assert thread_store.get("15551234567") == "thread_b"
+        assert db.session.scalar(sa.select(sa.func.count()).select_from(AssistantThread)) == 1
+
+
+def test_set_if_absent_keeps_the_first_thread(app):
+    with app.app_context():
+        assert thread_store.set_if_absent("15551234567", "thread_a") == "thread_a"
+        assert thread_store.set_if_absent("15551234567", "thread_b") == "thread_a"
+        assert thread_store.get("15551234567") == "thread_a"
+
+
+def test_delete(app):
+    with app.app_context():
+        thread_store.set("15551234567", "thread_a")
+        thread_store.delete("15551234567")
+        assert thread_store.get("15551234567") is None
+
+
+def test_concurrent_writers_agree_on_one_thread(file_app):
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker(i):
+        with file_app.app_context():
+            barrier.wait()
+            results.append(thread_store.set_if_absent("15551234567", f"thread_{i}"))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8
+    assert len(set(results)) == 1
+    with file_app.app_context():
+        thread_store.cache.clear()
+        assert thread_store.get("15551234567") == results[0]
+
+
+def test_concurrent_writers_for_many_conversations(file_app):
+    def worker(i):
+        with file_app.app_context():
+            for j in range(20):
+                thread_store.set(f"1555{i:03d}{j:04d}", f"thread_{i}_{j}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with file_app.app_context():
+        assert db.session.scalar(sa.select(sa.func.count()).select_from(AssistantThread)) == 80
+
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pandas as pd
+
+from app import training_archive
+from app.utils.adr_processor import ingest_adr_file, preprocess_adr_data, process_training_data
+from tests.fixtures.adr import write_adr_csv
+
+
+def two_month_upload(tmp_path, n_rows=200):
+    df = preprocess_adr_data(write_adr_csv(tmp_path / "adr.csv", n_rows))
+    df["Timestamp"] = ["28-02-2025 10:00"] * (n_rows // 2) + ["03-03-2025 18:30"] * (n_rows - n_rows // 2)
+    return df
+
+
+def test_ingestion_writes_the_archive(app, athlete, tmp_path):
+    path = write_adr_csv(tmp_path / "adr.csv", 300)
+    with app.app_context():
+        inserted = ingest_adr_file(path, chunksize=100)
+        ingest_adr_file(path, chunksize=100)  # re-upload, nothing new to archive
+
+    archived = training_archive.read(atleta_id=athlete)
+    assert len(archived) == inserted
+    month = datetime.now().strftime("%Y-%m")
+    assert (training_archive.root / f"atleta_id={athlete}" / f"month={month}").is_dir()
+
+
+def test_read_prunes_partitions_and_columns(app, tmp_path):
+    df = two_month_upload(tmp_path)
+    assert training_archive.append(df, atleta_id=1) == 200
+    assert training_archive.append(df, atleta_id=2) == 200
+
+    # A broken file in a partition the filters exclude is never opened
+    (training_archive.root / "atleta_id=2" / "month=2025-02" / "part-broken-0.parquet").write_bytes(b"not parquet")
+
+    march = training_archive.read(columns=["hash_id", "kg"], atleta_id=1, start=datetime(2025, 3, 1))
+    assert list(march.columns) == ["hash_id", "kg"]
+    assert march["hash_id"].tolist() == df["hash_id"].iloc[100:].tolist()
+
+    february = training_archive.read(atleta_id=1, end=datetime(2025, 3, 1), ejercicio="Sentadilla")
+    expected = df.iloc[:100]
+    assert len(february) == (expected["Ejer."] == "Sentadilla").sum()
+    assert (february["timestamp"] == pd.Timestamp("2025-02-28 10:00")).all()
+
+
+def test_read_without_archive(app):
+    assert training_archive.read(columns=["hash_id"]).empty
+
+
+def test_only_newly_stored_reps_are_archived(app, athlete, tmp_path, monkeypatch):
+    df = two_month_upload(tmp_path)
+    later = df.copy()
+    later["Timestamp"] = "15-04-2025 09:00"  # a re-upload lands in another month's partition
+    later.loc[later.index[-10:], "hash_id"] = [f"new-{i}" for i in range(10)]
+
+    reads = []
+    monkeypatch.setattr(training_archive, "read", lambda *args, **kwargs: reads.append(kwargs))
+    with app.app_context():
+        process_training_data(df)
+        process_training_data(later)
+
+    monkeypatch.undo()
+    archived = training_archive.read(atleta_id=athlete)
+    assert len(archived) == 210
+    assert sorted(archived.loc[archived["month"] == "2025-04", "hash_id"]) == sorted(f"new-{i}" for i in range(10))
+    assert reads == []  # appending never reads the archive back
@@ -0,0 +1,157 @@
+import pandas as pd
+import sqlalchemy as sa
+
+from app import db
+from app.models.models import TrainingDetail, TrainingSession
+from app.utils.adr_processor import add_dataframe_to_training_detail, preprocess_adr_data
+from tests.fixtures.adr import write_adr_csv
+
+
+def make_session(user_id):
+    from datetime import datetime, timezone
+
+    session = TrainingSession(user_id=user_id, date=datetime.now(timezone.utc))
+    db.session.add(session)
+    db.session.commit()
+    return session.id
+
+
+def test_bulk_insert_in_chunks(app, athlete, tmp_path):
+    df = preprocess_adr_data(write_adr_csv(tmp_path / "adr.csv", 250))
+
+    with app.app_context():
+        session_id = make_session(athlete)
+        assert add_dataframe_to_training_detail(df, session_id, atleta_id=athlete, chunk_size=100) == 250
+
+        details = db.session.scalars(sa.select(TrainingDetail).order_by(TrainingDetail.id)).all()
+        assert len(details) == 250
+        first = details[0]
+        assert first.hash_id == df["hash_id"].iloc[0]
+        assert first.kg == df["KG"].iloc[0]
+        assert first.serie == df["SERIE"].iloc[0]
+        assert first.created_at is not None
+        assert first.timestamp.strftime('%d-%m-%Y %H:%M') == df["Timestamp"].iloc[0]
+        assert {d.perfil for d in details} >= {None}
+
+
+def test_bulk_insert_empty_frame(app, athlete, tmp_path):
+    df = preprocess_adr_data(write_adr_csv(tmp_path / "adr.csv", 5)).iloc[0:0]
+
+    with app.app_context():
+        assert add_dataframe_to_training_detail(df, make_session(athlete), atleta_id=athlete) == 0
+
+
+def test_reupload_is_deduplicated_in_the_database(app, athlete, tmp_path):
+    df = preprocess_adr_data(write_adr_csv(tmp_path / "adr.csv", 200))
+
+    with app.app_context():
+        session_id = make_session(athlete)
+        assert add_dataframe_to_training_detail(df.iloc[:120], session_id, atleta_id=athlete) == 120
+        assert add_dataframe_to_training_detail(df, session_id, atleta_id=athlete, chunk_size=50) == 80
+        assert add_dataframe_to_training_detail(df, session_id, atleta_id=athlete) == 0
+        assert db.session.scalar(sa.select(sa.func.count()).select_from(TrainingDetail)) == 200
+
+
+def test_filter_existing_hashes_anti_join(app, athlete, tmp_path):
+    from app.utils.adr_processor import filter_existing_hashes
+
+    df = preprocess_adr_data(write_adr_csv(tmp_path / "adr.csv", 100))
+    upload = pd.concat([df, df.iloc[:10]])
+
+    with app.app_context():
+        add_dataframe_to_training_detail(df.iloc[:30], make_session(athlete), atleta_id=athlete)
+
+        new_rows = filter_existing_hashes(upload, atleta_id=athlete, chunk_size=25)
+        assert new_rows["hash_id"].tolist() == df["hash_id"].iloc[30:].tolist()
+        # Another athlete may have the same reps
+        assert len(filter_existing_hashes(df, atleta_id=athlete + 1)) == 100
+
+
+def test_reps_stored_under_the_legacy_hash_are_skipped(app, athlete, tmp_path):
+    from app.utils.adr_processor import filter_existing_hashes, legacy_hash_id
+
+    df = preprocess_adr_data(write_adr_csv(tmp_path / "adr.csv", 50))
+    legacy = df.iloc[:20].copy()
+    legacy["hash_id"] = legacy["hash_id"].map(legacy_hash_id)
+
+    with app.app_context():
+        add_dataframe_to_training_detail(legacy, make_session(athlete), atleta_id=athlete)
+        assert filter_existing_hashes(df, atleta_id=athlete)["hash_id"].tolist() == df["hash_id"].iloc[20:].tolist()
+
+
+def test_reupload_over_legacy_hashes_inserts_only_new_reps(app, athlete, tmp_path):
+    from app.utils.adr_processor import legacy_hash_id
+
+    df = preprocess_adr_data(write_adr_csv(tmp_path / "adr.csv", 50))
+    legacy = df.copy()
+    legacy["hash_id"] = legacy["hash_id"].map(legacy_hash_id)
+
+    with app.app_context():
+        assert db.session.get_bind().dialect.name == "sqlite"  # the ON CONFLICT path
+        session_id = make_session(athlete)
+        assert add_dataframe_to_training_detail(legacy.iloc[:30], session_id, atleta_id=athlete) == 30
+        assert add_dataframe_to_training_detail(df, session_id, atleta_id=athlete) == 20
+        assert db.session.scalar(sa.select(sa.func.count()).select_from(TrainingDetail)) == 50
+
+
+def test_identical_reps_of_an_export_are_all_stored(app, athlete, tmp_path):
+    path = tmp_path / "adr.csv"
+    rows = write_adr_csv(tmp_path / "one.csv", 1).read_text().splitlines()
+    path.write_text("\n".join([rows[0]] + [rows[1]] * 3) + "\n")
+
+    df = preprocess_adr_data(path)
+    with app.app_context():
+        session_id = make_session(athlete)
+        assert add_dataframe_to_training_detail(df, session_id, atleta_id=athlete) == 3
+        assert add_dataframe_to_training_detail(preprocess_adr_data(path), session_id, atleta_id=athlete) == 0
+
+
+def test_export_is_one_query_with_filters(app, athlete, tmp_path):
+    from datetime import datetime, timedelta
+    from app.utils.adr_processor import export_training_details
+
+    df = preprocess_adr_data(write_adr_csv(tmp_path / "adr.csv", 300))
+
+    with app.app_context():
+        add_dataframe_to_training_detail(df, make_session(athlete), atleta_id=athlete)
+
+        statements = []
+        sa.event.listen(db.engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+        exported = export_training_details(atleta_id=athlete, batch_size=64)
+        assert len(statements) == 1
+
+        assert list(exported.columns) == list(df.columns)
+        assert exported["hash_id"].tolist() == df["hash_id"].tolist()
+        assert (exported["Atleta"] == "atleta1").all()
+        assert exported["KG"].tolist() == df["KG"].tolist()
+
+        squats = export_training_details(ejercicio="Sentadilla")
+        assert len(squats) == (df["Ejer."] == "Sentadilla").sum()
+        assert len(export_training_details(atleta_id=athlete + 1)) == 0
+
+        rep_time = datetime.strptime(df["Timestamp"].iloc[0], '%d-%m-%Y %H:%M')
+        assert len(export_training_details(start=rep_time, end=rep_time + timedelta(minutes=1))) == 300
+        assert len(export_training_details(start=rep_time + timedelta(minutes=1))) == 0
+
+
+def test_empty_export_keeps_the_columns(app):
+    from app.utils.adr_processor import get_training_detail_to_dataframe
+
+    with app.app_context():
+        exported = get_training_detail_to_dataframe()
+    assert exported.empty
+    assert exported.columns[0] == "Timestamp"
+
+
+def test_insert_reports_only_the_rows_it_stored(app, athlete, tmp_path, monkeypatch):
+    from app.utils import adr_processor
+
+    df = preprocess_adr_data(write_adr_csv(tmp_path / "adr.csv", 50))
+    with app.app_context():
+        session_id = make_session(athlete)
+        add_dataframe_to_training_detail(df.iloc[:20], session_id, atleta_id=athlete)
+
+        # A concurrent upload stored the first 20 after the lookup, ON CONFLICT skips them
+        monkeypatch.setattr(adr_processor, "filter_existing_hashes", lambda df, *args: df)
+        stored = adr_processor.insert_training_details(df, session_id, atleta_id=athlete, chunk_size=15)
+    assert stored["hash_id"].tolist() == df["hash_id"].iloc[20:].tolist()
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+
+from app import db, user_alias_cache
+from app.models.models import User
+from app.utils.adr_processor import get_user_id_from_df
+
+
+def record_user_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if statement.lstrip().startswith("SELECT") and "FROM users" in statement:
+            statements.append(statement)
+
+    sa.event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def test_single_row_export(app, athlete):
+    with app.app_context():
+        assert get_user_id_from_df(pd.DataFrame({"Atleta": ["atleta1"]})) == athlete
+
+
+def test_hits_skip_the_database(app, athlete):
+    df = pd.DataFrame({"Atleta": ["atleta1"] * 3})
+    with app.app_context():
+        statements = record_user_queries()
+        for _ in range(4):
+            assert get_user_id_from_df(df) == athlete
+        assert len(statements) == 1
+
+
+def test_unknown_alias_is_cached_until_the_user_exists(app, athlete):
+    df = pd.DataFrame({"Atleta": ["atleta2"]})
+    with app.app_context():
+        statements = record_user_queries()
+        for _ in range(3):
+            with pytest.raises(KeyError):
+                get_user_id_from_df(df)
+        assert len(statements) == 1
+
+        # Renaming a user drops both the old alias and the negative entry for the new one
+        user = db.session.get(User, athlete)
+        user.alias = "atleta2"
+        db.session.commit()
+        assert get_user_id_from_df(df) == athlete
+        with pytest.raises(KeyError):
+            get_user_id_from_df(pd.DataFrame({"Atleta": ["atleta1"]}))
+
+
+def test_empty_export_raises(app):
+    with app.app_context(), pytest.raises(KeyError):
+        get_user_id_from_df(pd.DataFrame({"Atleta": []}))
+
+
+def test_deleted_user_is_forgotten(app, athlete):
+    df = pd.DataFrame({"Atleta": ["atleta1"]})
+    with app.app_context():
+        assert get_user_id_from_df(df) == athlete
+        db.session.delete(db.session.get(User, athlete))
+        db.session.commit()
+
+        assert "atleta1" not in user_alias_cache.cache
+        with pytest.raises(KeyError):
+            get_user_id_from_df(df)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.vbt_analytics import load_velocity_profiles, velocity_loss, vbt_report
+from tests.fixtures.adr import make_adr_frame
+
+
+def test_profiles_match_per_group_polyfit():
+    df = make_adr_frame(2000, athletes=("atleta1", "atleta2", "atleta3"))
+    df.loc[5, "VMP"] = np.nan
+
+    profiles = load_velocity_profiles(df)
+
+    assert len(profiles) == 12
+    for (athlete, exercise), group in df.dropna(subset=["VMP"]).groupby(["Atleta", "Ejer."]):
+        slope, intercept = np.polyfit(group["KG"], group["VMP"], 1)
+        row = profiles.loc[(athlete, exercise)]
+        assert row["n"] == len(group)
+        assert row["slope"] == pytest.approx(slope)
+        assert row["intercept"] == pytest.approx(intercept)
+        assert row["r2"] == pytest.approx(np.corrcoef(group["KG"], group["VMP"])[0, 1] ** 2)
+
+
+def test_one_rep_max_at_the_minimum_velocity_threshold():
+    kg = np.array([60.0, 80.0, 100.0, 120.0] * 2)
+    df = pd.DataFrame({
+        "Atleta": "atleta1",
+        "Ejer.": ["Sentadilla"] * 4 + ["Press Banca"] * 4,
+        "KG": kg,
+        "VMP": 1.6 - kg / 160,
+    })
+
+    profiles = load_velocity_profiles(df)
+
+    assert profiles.loc[("atleta1", "Sentadilla"), "e1rm"] == pytest.approx((1.6 - 0.30) * 160)
+    assert profiles.loc[("atleta1", "Press Banca"), "e1rm"] == pytest.approx((1.6 - 0.17) * 160)
+
+
+def test_too_few_points_or_a_single_load_give_no_estimate():
+    df = pd.DataFrame({"Atleta": "a", "Ejer.": ["Sentadilla"] * 2 + ["Press Banca"] * 3,
+                       "KG": [60.0, 80.0, 70.0, 70.0, 70.0], "VMP": [1.0, 0.8, 0.9, 0.85, 0.8]})
+
+    profiles = load_velocity_profiles(df)
+
+    assert profiles["e1rm"].isna().all()
+    assert profiles["n"].tolist() == [2, 3]
+
+
+def test_velocity_loss_per_set():
+    df = pd.DataFrame({
+        "Atleta": "a", "Ejer.": "Sentadilla", "Timestamp": "01-01-2025 10:00",
+        "SERIE": [1, 1, 1, 1, 2, 2, 2],
+        "REP": [3, 1, 4, 2, 2, 1, 3],
+        "VMP": [0.80, 0.90, 0.72, 1.00, 0.70, 0.75, 0.60],
+    })
+
+    sets = velocity_loss(df)
+
+    first, second = sets.iloc[0], sets.iloc[1]
+    assert first["reps"] == 4 and first["best_velocity"] == 1.00
+    assert first["first_velocity"] == 0.90 and first["last_velocity"] == 0.72
+    assert first["velocity_loss_pct"] == pytest.approx(28.0)
+    assert second["velocity_loss_pct"] == pytest.approx(20.0)
+
+
+def test_report_after_an_upload(app, athlete, tmp_path):
+    from app.utils.adr_processor import ingest_adr_file, report_training_analytics
+    from tests.fixtures.adr import write_adr_csv
+
+    with app.app_context():
+        ingest_adr_file(write_adr_csv(tmp_path / "adr.csv", 400))
+        report = report_training_analytics(athlete)
+
+    assert set(report["profiles"]) == {"Sentadilla", "Press Banca", "Peso Muerto", "Press Militar"}
+    squat = report["profiles"]["Sentadilla"]
+    assert squat["slope"] < 0 and squat["e1rm"] > 0
+    assert set(report["velocity_loss"]["Sentadilla"]) <= set(range(1, 8))
+    assert vbt_report(pd.DataFrame()) == {"profiles": {}, "velocity_loss": {}}
+
+
+def test_report_reads_only_recent_reps_of_the_uploaded_exercises(app, athlete, tmp_path):
+    from datetime import datetime, timedelta
+    from app.utils.adr_processor import (
+        add_dataframe_to_training_detail, get_active_training_session_id, preprocess_adr_data, report_training_analytics,
+    )
+    from tests.fixtures.adr import write_adr_csv
+
+    df = preprocess_adr_data(write_adr_csv(tmp_path / "adr.csv", 400))
+    old = df.copy()
+    old["Timestamp"] = (datetime.now() - timedelta(days=365)).strftime("%d-%m-%Y %H:%M")
+    old["hash_id"] = old["hash_id"] + "-old"
+
+    with app.app_context():
+        session_id = get_active_training_session_id(athlete)
+        add_dataframe_to_training_detail(old, session_id, atleta_id=athlete)
+        assert report_training_analytics(athlete) == {"profiles": {}, "velocity_loss": {}}
+
+        add_dataframe_to_training_detail(df, session_id, atleta_id=athlete)
+        report = report_training_analytics(athlete, ["Sentadilla"])
+
+    assert set(report["profiles"]) == {"Sentadilla"}
+    assert report["profiles"]["Sentadilla"]["n"] == (df["Ejer."] == "Sentadilla").sum()
@@ -0,0 +1,56 @@
+import pytest
+from app.models.payload_models import parse_webhook_payload, TextEvent, DocumentEvent, StatusEvent
+
+
+def test_iter_events_covers_the_whole_batch(batched_payload):
+    webhook = parse_webhook_payload(batched_payload)
+    events = list(webhook.iter_events())
+
+    assert [type(event) for event in events] == [TextEvent, DocumentEvent, StatusEvent, StatusEvent]
+    assert [event.entry_id for event in events] == ["entry_id_5", "entry_id_5", "entry_id_6", "entry_id_6"]
+
+    text, document, sent, read = events
+    assert text.body == "First message"
+    assert text.contact.profile.name == "Alice"
+    assert document.document.filename == "adr_export.csv"
+    assert document.contact.wa_id == "15557654321"
+    assert (sent.status.status, read.status.status) == ("sent", "read")
+
+
+def test_iter_events_single_status(valid_status_update_payload):
+    events = list(parse_webhook_payload(valid_status_update_payload).iter_events())
+
+    assert len(events) == 1
+    assert events[0].type == "status"
+    assert events[0].metadata.display_phone_number == "15550000000"
+
+
+def test_dispatcher_fans_out_every_event(app, monkeypatch, batched_payload):
+    from app import views
+
+    seen = []
+    monkeypatch.setitem(views.EVENT_HANDLERS, "text", lambda event: seen.append(event.message.id))
+    monkeypatch.setitem(views.EVENT_HANDLERS, "document", lambda event: seen.append(event.message.id))
+    monkeypatch.setitem(views.EVENT_HANDLERS, "status", lambda event: seen.append(event.status.id))
+
+    with app.app_context():
+        views.dynamic_webhook_handler(parse_webhook_payload(batched_payload))
+
+    assert seen == ["message_id_4", "message_id_5", "status_id_2", "status_id_3"]
+
+
+def test_dispatcher_keeps_going_after_a_failure(app, monkeypatch, batched_payload):
+    from app import views
+
+    seen = []
+
+    def failing_document_handler(event):
+        raise RuntimeError("download failed")
+
+    monkeypatch.setitem(views.EVENT_HANDLERS, "text", lambda event: seen.append(event.type))
+    monkeypatch.setitem(views.EVENT_HANDLERS, "document", failing_document_handler)
+    monkeypatch.setitem(views.EVENT_HANDLERS, "status", lambda event: seen.append(event.type))
+
+    with app.app_context(), pytest.raises(Exception, match="1 of 4 webhook events failed"):
+        views.dynamic_webhook_handler(parse_webhook_payload(batched_payload))
+    assert seen == ["text", "status", "status"]
@@ -0,0 +1,170 @@
+import hashlib
+import hmac
+
+import pytest
+from app.services.webhook_queue import WebhookQueue, QueueFullError
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WebhookQueue()
+    queue.open(tmp_path / "queue.db")
+    yield queue
+    queue.close()
+
+
+def sign(body: bytes, secret: str = "test_secret") -> str:
+    return "sha256=" + hmac.new(secret.encode("latin-1"), body, hashlib.sha256).hexdigest()
+
+
+def test_enqueue_and_drain_in_order(queue):
+    queue.enqueue(b"first")
+    queue.enqueue(b"second")
+
+    seen = []
+    assert queue.drain(seen.append) == 2
+    assert seen == [b"first", b"second"]
+    assert queue.metrics()["pending"] == 0
+    assert queue.metrics()["processed"] == 2
+
+
+def test_failed_handler_is_retried_then_parked(queue):
+    queue.max_attempts = 2
+    queue.enqueue(b"boom")
+
+    def handler(body):
+        raise RuntimeError("handler failed")
+
+    queue.drain(handler)
+    metrics = queue.metrics()
+    assert metrics["retried"] == 1
+    assert metrics["failed"] == 1
+    assert metrics["pending"] == 0
+
+
+def test_max_depth_rejects(queue):
+    queue.max_depth = 1
+    queue.enqueue(b"one")
+    with pytest.raises(QueueFullError):
+        queue.enqueue(b"two")
+    assert queue.metrics()["rejected"] == 1
+
+
+def test_expired_claims_are_recovered_on_reopen(tmp_path):
+    path = tmp_path / "queue.db"
+    queue = WebhookQueue()
+    queue.open(path)
+    queue.enqueue(b"crashed")
+    assert queue.claim(timeout=0) is not None
+    queue.close()
+
+    queue = WebhookQueue()
+    queue.lease_seconds = 0
+    queue.open(path)
+    item_id, body, attempts = queue.claim(timeout=0)
+    assert body == b"crashed"
+    assert attempts == 2
+    queue.close()
+
+
+def test_expired_claims_out_of_attempts_are_parked(tmp_path):
+    path = tmp_path / "queue.db"
+    queue = WebhookQueue()
+    queue.open(path)
+    queue.enqueue(b"hangs its worker")
+    assert queue.claim(timeout=0) is not None
+    queue.close()
+
+    queue = WebhookQueue()
+    queue.max_attempts = 1
+    queue.lease_seconds = 0
+    queue.open(path)
+    assert queue.claim(timeout=0) is None
+    metrics = queue.metrics()
+    assert metrics["failed"] == 1
+    assert metrics["pending"] == 0
+    assert metrics["in_flight"] == 0
+    queue.close()
+
+
+def test_live_claims_are_not_stolen_by_another_process(tmp_path):
+    path = tmp_path / "queue.db"
+    first = WebhookQueue()
+    first.open(path)
+    first.enqueue(b"in progress")
+    assert first.claim(timeout=0) is not None
+
+    # A second process opening the same file must not take the row back
+    second = WebhookQueue()
+    second.open(path)
+    assert second.claim(timeout=0) is None
+    first.close()
+    second.close()
+
+
+def test_concurrent_claims_take_each_row_once(tmp_path):
+    import threading
+
+    path = tmp_path / "queue.db"
+    queues = [WebhookQueue() for _ in range(4)]
+    for queue in queues:
+        queue.open(path)
+    for i in range(50):
+        queues[0].enqueue(str(i).encode())
+
+    claimed = []
+
+    def worker(queue):
+        while (item := queue.claim(timeout=0)) is not None:
+            claimed.append(item[1])
+
+    threads = [threading.Thread(target=worker, args=(queue,)) for queue in queues]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for queue in queues:
+        queue.close()
+
+    assert sorted(claimed) == sorted(str(i).encode() for i in range(50))
+
+
+def test_webhook_post_is_queued_and_acknowledged(app, client, valid_text_message_payload):
+    from app import webhook_queue
+
+    body = valid_text_message_payload.encode("utf-8")
+    response = client.post(
+        "/webhook",
+        data=body,
+        headers={"X-Hub-Signature-256": sign(body), "Content-Type": "application/json"},
+    )
+
+    assert response.status_code == 200
+    assert webhook_queue.metrics()["pending"] == 1
+
+    from app.views import handle_webhook_body
+    with app.app_context():
+        assert webhook_queue.drain(handle_webhook_body) == 1
+    app.config["METRICS_TOKEN"] = "metrics_secret"
+    response = client.get("/metrics", headers={"Authorization": "Bearer metrics_secret"})
+    assert response.get_json()["webhook_queue"]["processed"] == 1
+
+
+@pytest.mark.parametrize("token, headers, status", [
+    (None, {"Authorization": "Bearer anything"}, 403),
+    ("metrics_secret", {}, 401),
+    ("metrics_secret", {"Authorization": "Bearer wrong"}, 401),
+    ("metrics_secret", {"Authorization": "Bearer metrics_secret"}, 200),
+])
+def test_metrics_requires_the_bearer_token(app, token, headers, status):
+    app.config["METRICS_TOKEN"] = token
+    assert app.test_client().get("/metrics", headers=headers).status_code == status
+
+
+def test_webhook_post_with_bad_signature_is_not_queued(client, valid_text_message_payload):
+    from app import webhook_queue
+
+    response = client.post("/webhook", data=valid_text_message_payload, headers={"X-Hub-Signature-256": "sha256=bad"})
+
+    assert response.status_code == 403
+    assert webhook_queue.metrics()["pending"] == 0